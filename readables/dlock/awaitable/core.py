@@ -1,7 +1,40 @@
-from typing import Dict
+import asyncio
+from time import perf_counter
+from typing import Awaitable, Callable, Dict, Optional, Iterable, Sequence, Tuple, Union
 
 from readables.annotations import experimental
 from readables.dlock.awaitable.state_manager import AwaitableDLockStateManager
+from readables.dlock.blocking.state_manager import canonical_order
+from readables.dlock.instrumentation import DLockListener
+
+
+async def _observe_acquisition(listener: DLockListener,
+                               ids: Sequence[str],
+                               acquire: Callable[[], Awaitable[bool]]) -> bool:
+    for id in ids:
+        listener.on_wait(id)
+
+    started_at = perf_counter()
+
+    try:
+        acquired = await acquire()
+    except BaseException:
+        wait_time = perf_counter() - started_at
+
+        for id in ids:
+            listener.on_give_up(id, wait_time)
+
+        raise
+
+    wait_time = perf_counter() - started_at
+
+    for id in ids:
+        if acquired:
+            listener.on_acquire(id, wait_time)
+        else:
+            listener.on_give_up(id, wait_time)
+
+    return acquired
 
 
 @experimental
@@ -9,28 +42,241 @@ class AwaitableDLock:
     """
     Awaitable Distributed Lock
 
+    With a ``ttl``, the lock is acquired as a lease and renewed by a background task while held. See
+    :class:`readables.dlock.blocking.core.DLock`.
+
     :param DLockStateManager manager: The state manager
     :param str id: The ID of the lock
+    :param DLockListener listener: The listener of the lock events
+    :param float ttl: The number of seconds for the lease to expire, if the lock is a lease
     """
 
     def __init__(self,
                  manager: AwaitableDLockStateManager,
-                 id: str):
+                 id: str,
+                 listener: Optional[DLockListener] = None,
+                 ttl: Optional[float] = None):
         self.__id = id
         self.__manager = manager
+        self.__listener = listener
+        self.__acquired_at: Optional[float] = None  # While held by this instance, with a listener
+        self.__ttl = ttl
+        self.__token: Optional[int] = None
+        self.__renewal: Optional[asyncio.Task] = None
+        self.__lost = False
 
     @property
     def id(self):
         return self.__id
 
-    async def acquire(self):
-        await self.__manager.acquire(self.id)
+    @property
+    def manager(self) -> AwaitableDLockStateManager:
+        return self.__manager
+
+    @property
+    def token(self) -> Optional[int]:
+        """ The fencing token of the lease while it is held """
+        return self.__token
+
+    @property
+    def lost(self) -> bool:
+        """ Whether the lease has been lost while held, i.e., another worker may hold the lock now """
+        return self.__lost
+
+    async def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> Union[bool, int]:
+        """ Acquire the lock. See :meth:`AwaitableDLockStateManager.acquire`.
+
+            :return: ``False`` if the lock is not acquired. Otherwise, ``True``, or the fencing token
+                     (a positive integer) if the lock has a TTL.
+        """
+        if self.__listener is None:
+            return await self._acquire(blocking, timeout)
+
+        acquired = await _observe_acquisition(self.__listener, (self.id,), lambda: self._acquire(blocking, timeout))
+
+        if acquired:
+            self.__acquired_at = perf_counter()
+
+        return acquired
+
+    async def _acquire(self, blocking: bool, timeout: Optional[float]) -> Union[bool, int]:
+        if self.__ttl is None:
+            return await self.__manager.acquire(self.id, blocking=blocking, timeout=timeout)
+
+        token = await self.__manager.acquire_lease(self.id, self.__ttl, blocking=blocking, timeout=timeout)
+
+        if token is None:
+            return False
+
+        self.__token = token
+        self.__lost = False
+        self.__renewal = asyncio.ensure_future(self._renew(token, self.__ttl))
+
+        return token
+
+    async def _renew(self, token: int, ttl: float):
+        """ Renew the lease every third of its TTL until cancelled, or until the lease is lost. """
+        while True:
+            await asyncio.sleep(ttl / 3)
+
+            try:
+                renewed = await self.__manager.renew_lease(self.id, token, ttl)
+            except Exception:
+                # Try again on the next tick. If the backend stays unreachable, the lease expires and
+                # the renewal fails then.
+                continue
+
+            if not renewed:
+                self.__lost = True
+                return
 
     async def locked(self):
         return await self.__manager.is_actively_locked(self.id)
 
     async def release(self):
-        await self.__manager.release(self.id)
+        acquired_at, self.__acquired_at = self.__acquired_at, None
+
+        if self.__listener is not None and acquired_at is not None:
+            self.__listener.on_release(self.id, perf_counter() - acquired_at)
+
+        await self._release()
+
+    async def _release(self):
+        if self.__token is None:
+            await self.__manager.release(self.id)
+            return
+
+        self.__renewal.cancel()
+        await asyncio.gather(self.__renewal, return_exceptions=True)
+        self.__renewal = None
+        self.__lost = False
+        token, self.__token = self.__token, None
+        await self.__manager.release_lease(self.id, token)
+
+    async def __aenter__(self):
+        await self.acquire()
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        await self.release()
+        # NOTE: Intentionally not handling error.
+        return
+
+
+@experimental
+class AwaitableDSharedLock(AwaitableDLock):
+    """
+    Awaitable Distributed Lock in the shared mode
+
+    See :class:`readables.dlock.blocking.core.DSharedLock`.
+
+    :param AwaitableDLockStateManager manager: The state manager
+    :param str id: The ID of the lock
+    :param DLockListener listener: The listener of the lock events
+    """
+
+    def __init__(self,
+                 manager: AwaitableDLockStateManager,
+                 id: str,
+                 listener: Optional[DLockListener] = None):
+        super().__init__(manager=manager, id=id, listener=listener)
+
+    async def _acquire(self, blocking: bool, timeout: Optional[float]) -> bool:
+        """ Acquire the lock as a reader. See :meth:`AwaitableDLockStateManager.acquire_shared`. """
+        return await self.manager.acquire_shared(self.id, blocking=blocking, timeout=timeout)
+
+    async def _release(self):
+        await self.manager.release_shared(self.id)
+
+
+@experimental
+class AwaitableDSemaphore(AwaitableDLock):
+    """
+    Awaitable Distributed Semaphore
+
+    :param AwaitableDLockStateManager manager: The state manager
+    :param str id: The ID of the semaphore
+    :param int permits: The number of holders allowed at the same time
+    :param DLockListener listener: The listener of the lock events
+    """
+
+    def __init__(self,
+                 manager: AwaitableDLockStateManager,
+                 id: str,
+                 permits: int,
+                 listener: Optional[DLockListener] = None):
+        super().__init__(manager=manager, id=id, listener=listener)
+        self.__permits = permits
+
+    @property
+    def permits(self) -> int:
+        return self.__permits
+
+    async def _acquire(self, blocking: bool, timeout: Optional[float]) -> bool:
+        """ Acquire a permit. See :meth:`AwaitableDLockStateManager.acquire_permit`. """
+        return await self.manager.acquire_permit(self.id, self.permits, blocking=blocking, timeout=timeout)
+
+    async def _release(self):
+        await self.manager.release_permit(self.id)
+
+
+@experimental
+class AwaitableDLockSet:
+    """
+    A set of awaitable distributed locks, acquired and released all at once
+
+    :param AwaitableDLockStateManager manager: The state manager
+    :param ids: The IDs of the locks
+    :param DLockListener listener: The listener of the lock events, notified for each lock of the set
+    """
+
+    def __init__(self,
+                 manager: AwaitableDLockStateManager,
+                 ids: Iterable[str],
+                 listener: Optional[DLockListener] = None):
+        self.__ids = tuple(canonical_order(ids))
+        self.__manager = manager
+        self.__listener = listener
+        self.__acquired_at: Optional[float] = None  # While held by this instance, with a listener
+
+    @property
+    def ids(self) -> Tuple[str, ...]:
+        """ The IDs of the locks in the order of acquisition """
+        return self.__ids
+
+    async def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """ Acquire all the locks or none of them. See :meth:`AwaitableDLockStateManager.acquire_many`. """
+        if self.__listener is None:
+            return await self.__manager.acquire_many(self.ids, blocking=blocking, timeout=timeout)
+
+        acquired = await _observe_acquisition(
+            self.__listener,
+            self.ids,
+            lambda: self.__manager.acquire_many(self.ids, blocking=blocking, timeout=timeout),
+        )
+
+        if acquired:
+            self.__acquired_at = perf_counter()
+
+        return acquired
+
+    async def locked(self):
+        for id in self.ids:
+            if not await self.__manager.is_actively_locked(id):
+                return False
+
+        return True
+
+    async def release(self):
+        acquired_at, self.__acquired_at = self.__acquired_at, None
+
+        if self.__listener is not None and acquired_at is not None:
+            hold_time = perf_counter() - acquired_at
+
+            for id in self.ids:
+                self.__listener.on_release(id, hold_time)
+
+        await self.__manager.release_many(self.ids)
 
     async def __aenter__(self):
         await self.acquire()
@@ -44,11 +290,39 @@ class AwaitableDLock:
 
 @experimental
 class AwaitableDLockFactory:
+    """
+    Awaitable Distributed Lock Factory
+
+    :param AwaitableDLockStateManager manager: The state manager
+    :param DLockListener listener: The listener of the events of the locks made by this factory,
+                                   e.g., :class:`readables.dlock.instrumentation.DLockMetrics`
+    """
     def __init__(self,
-                 manager: AwaitableDLockStateManager):
+                 manager: AwaitableDLockStateManager,
+                 listener: Optional[DLockListener] = None):
         self.__manager = manager
+        self.__listener = listener
         self.__locks: Dict[str, AwaitableDLock] = dict()
 
-    def lock(self, id: str) -> AwaitableDLock:
+    def lock(self, id: str, ttl: Optional[float] = None) -> AwaitableDLock:
+        """ Make a lock, which is a lease renewed in the background if ``ttl`` is defined. """
         return AwaitableDLock(manager=self.__manager,
-                              id=id)
+                              id=id,
+                              listener=self.__listener,
+                              ttl=ttl)
+
+    def shared_lock(self, id: str) -> AwaitableDSharedLock:
+        return AwaitableDSharedLock(manager=self.__manager,
+                                    id=id,
+                                    listener=self.__listener)
+
+    def semaphore(self, id: str, permits: int) -> AwaitableDSemaphore:
+        return AwaitableDSemaphore(manager=self.__manager,
+                                   id=id,
+                                   permits=permits,
+                                   listener=self.__listener)
+
+    def lock_many(self, ids: Iterable[str]) -> AwaitableDLockSet:
+        return AwaitableDLockSet(manager=self.__manager,
+                                 ids=ids,
+                                 listener=self.__listener)
@@ -1,8 +1,13 @@
+import sys
 from abc import ABC, abstractmethod
-from asyncio import Lock
-from typing import Dict
+from asyncio import Future, TimeoutError, get_running_loop, wait_for
+from collections import deque
+from itertools import count
+from time import monotonic
+from typing import Dict, Optional, Deque, Iterable, List
 
 from readables.annotations import experimental
+from readables.dlock.blocking.state_manager import canonical_order
 
 
 @experimental
@@ -11,7 +16,8 @@ class AwaitableDLockStateManager(ABC):
     An interface of the lock state manager
     """
     @abstractmethod
-    async def acquire(self, lock_id: str):
+    async def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """ Acquire the lock. See :meth:`readables.dlock.blocking.state_manager.DLockStateManager.acquire`. """
         raise NotImplemented()
 
     @abstractmethod
@@ -22,37 +28,286 @@ class AwaitableDLockStateManager(ABC):
     async def release(self, lock_id: str):
         raise NotImplemented()
 
+    async def acquire_many(self,
+                           lock_ids: Iterable[str],
+                           blocking: bool = True,
+                           timeout: Optional[float] = None) -> bool:
+        """ Acquire all the locks or none of them.
+
+            See :meth:`readables.dlock.blocking.state_manager.DLockStateManager.acquire_many`.
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        acquired: List[str] = []
+
+        try:
+            for lock_id in canonical_order(lock_ids):
+                remaining = None if deadline is None else max(deadline - monotonic(), 0)
+
+                if not await self.acquire(lock_id, blocking=blocking, timeout=remaining):
+                    await self.release_many(acquired)
+                    return False
+
+                acquired.append(lock_id)
+        except BaseException:
+            await self.release_many(acquired)
+            raise
+
+        return True
+
+    async def release_many(self, lock_ids: Iterable[str]):
+        """ Release the locks, in the reverse canonical order. """
+        for lock_id in reversed(canonical_order(lock_ids)):
+            await self.release(lock_id)
+
+    async def acquire_shared(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """ Acquire the lock in the shared mode (as a reader).
+
+            See :meth:`readables.dlock.blocking.state_manager.DLockStateManager.acquire_shared`.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support shared locks.')
+
+    async def release_shared(self, lock_id: str):
+        raise NotImplementedError(f'{type(self).__name__} does not support shared locks.')
+
+    async def acquire_permit(self,
+                             semaphore_id: str,
+                             permits: int,
+                             blocking: bool = True,
+                             timeout: Optional[float] = None) -> bool:
+        """ Acquire one of the ``permits`` of the semaphore.
+
+            See :meth:`readables.dlock.blocking.state_manager.DLockStateManager.acquire_permit`.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support semaphores.')
+
+    async def release_permit(self, semaphore_id: str):
+        raise NotImplementedError(f'{type(self).__name__} does not support semaphores.')
+
+    async def acquire_lease(self,
+                            lock_id: str,
+                            ttl: float,
+                            blocking: bool = True,
+                            timeout: Optional[float] = None) -> Optional[int]:
+        """ Acquire the lock as a lease, which expires after ``ttl`` seconds unless renewed.
+
+            See :meth:`readables.dlock.blocking.state_manager.DLockStateManager.acquire_lease`.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support leases.')
+
+    async def renew_lease(self, lock_id: str, token: int, ttl: float) -> bool:
+        """ Extend the lease by ``ttl`` seconds from now.
+
+            :return: ``False`` if the lease has been lost (expired, or taken over by another holder)
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support leases.')
+
+    async def release_lease(self, lock_id: str, token: int):
+        raise NotImplementedError(f'{type(self).__name__} does not support leases.')
+
+
+class _AwaitableWaiter:
+    __slots__ = ('future', 'limit')
+
+    def __init__(self, limit: Optional[int]):
+        self.future: Future = get_running_loop().create_future()
+        self.limit = limit
+
+
+class _AwaitableLockEntry:
+    __slots__ = ('held', 'shared', 'waiters')
+
+    def __init__(self):
+        self.held = False  # Whether the lock is held exclusively
+        self.shared = 0  # The number of shared holders (readers or permits)
+        self.waiters: Deque[_AwaitableWaiter] = deque()  # The waiters in the order of arrival
+
+    def grantable(self, limit: Optional[int]) -> bool:
+        """ Whether the lock can be taken, exclusively without ``limit``, or shared by up to ``limit`` holders """
+        if self.held:
+            return False
+
+        return self.shared == 0 if limit is None else self.shared < limit
+
+    def take(self, limit: Optional[int]):
+        if limit is None:
+            self.held = True
+        else:
+            self.shared += 1
+
+    def grant(self):
+        """ Hand the lock over to the waiters at the front of the queue, as long as they can share it. """
+        while self.waiters:
+            waiter = self.waiters[0]
+
+            if waiter.future.done():
+                self.waiters.popleft()
+            elif self.grantable(waiter.limit):
+                self.waiters.popleft()
+                self.take(waiter.limit)
+                waiter.future.set_result(True)
+            else:
+                break
+
+    @property
+    def idle(self) -> bool:
+        return not self.held and not self.shared and not self.waiters
+
 
 @experimental
 class AwaitableLocalLockStateManager(AwaitableDLockStateManager):
     """
     Local Lock State Manager
+
+    An entry is only kept while a task holds or waits for its lock, so the memory usage is bounded by
+    the number of active locks. As the table is only accessed from the event loop, and never across an
+    ``await``, it needs neither a mutex nor striping.
+
+    The waiters are served in the order of arrival. Each waiter awaits its own future, which the
+    releasing task hands the ownership over with. Consecutive shared waiters are woken up together,
+    while a waiting writer holds back the readers arriving after it.
+
+    As the holders live in this process, a lease never expires, and its fencing token only orders the
+    leases of this manager.
     """
     def __init__(self):
-        self.__access_lock = Lock()
-        self.__locks: Dict[str, Lock] = dict()
+        self.__locks: Dict[str, _AwaitableLockEntry] = dict()
+        self.__tokens = count(1)
+
+    async def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        return await self._acquire(lock_id, None, blocking, timeout)
+
+    async def acquire_shared(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        return await self._acquire(lock_id, sys.maxsize, blocking, timeout)
+
+    async def acquire_permit(self,
+                             semaphore_id: str,
+                             permits: int,
+                             blocking: bool = True,
+                             timeout: Optional[float] = None) -> bool:
+        return await self._acquire(semaphore_id, max(permits, 1), blocking, timeout)
+
+    async def acquire_lease(self,
+                            lock_id: str,
+                            ttl: float,
+                            blocking: bool = True,
+                            timeout: Optional[float] = None) -> Optional[int]:
+        return next(self.__tokens) if await self._acquire(lock_id, None, blocking, timeout) else None
+
+    async def renew_lease(self, lock_id: str, token: int, ttl: float) -> bool:
+        return True
+
+    async def release_lease(self, lock_id: str, token: int):
+        self._release(lock_id, None)
+
+    async def _acquire(self, lock_id: str, limit: Optional[int], blocking: bool, timeout: Optional[float]) -> bool:
+        entry = self.__locks.get(lock_id)
+
+        if entry is None:
+            entry = self.__locks[lock_id] = _AwaitableLockEntry()
+
+        if not entry.waiters and entry.grantable(limit):
+            entry.take(limit)
+            return True
+
+        if not blocking:
+            return False
+
+        waiter = _AwaitableWaiter(limit)
+        entry.waiters.append(waiter)
+
+        # Wait for the ownership to be handed over.
+        try:
+            await (waiter.future if timeout is None else wait_for(waiter.future, max(timeout, 0)))
+            return True
+        except TimeoutError:
+            return self._abandon(lock_id, entry, waiter)
+        except BaseException:
+            if self._abandon(lock_id, entry, waiter):
+                self._release(lock_id, limit)
+            raise
+
+    def _abandon(self, lock_id: str, entry: _AwaitableLockEntry, waiter: _AwaitableWaiter) -> bool:
+        """ Stop waiting.
+
+            :return: ``True`` if the ownership has been handed over in the meantime.
+        """
+        if waiter.future.done() and not waiter.future.cancelled():
+            return True
+
+        try:
+            entry.waiters.remove(waiter)
+        except ValueError:
+            pass
 
-    async def acquire(self, lock_id: str):
-        async with self.__access_lock:
-            if lock_id not in self.__locks:
-                self.__locks[lock_id] = Lock()
-        # End of accessing to the lock map
+        # The waiters held back by this one may go ahead now.
+        entry.grant()
 
-        # Acquire the lock.
-        await self.__locks.get(lock_id).acquire()
+        if entry.idle and self.__locks.get(lock_id) is entry:
+            del self.__locks[lock_id]
+
+        return False
 
     async def is_actively_locked(self, lock_id: str) -> bool:
-        async with self.__access_lock:
-            return lock_id in self.__locks or self.__locks.get(lock_id).locked()
-        # End of access to the lock map
+        entry = self.__locks.get(lock_id)
+        return entry is not None and (entry.held or entry.shared > 0)
+
+    def waiting(self, lock_id: str) -> int:
+        """ The number of tasks waiting for the lock """
+        entry = self.__locks.get(lock_id)
+        return 0 if entry is None else sum(1 for waiter in entry.waiters if not waiter.future.done())
 
     async def release(self, lock_id: str):
-        async with self.__access_lock:
-            if lock_id not in self.__locks:
+        self._release(lock_id, None)
+
+    async def release_shared(self, lock_id: str):
+        self._release(lock_id, sys.maxsize)
+
+    async def release_permit(self, semaphore_id: str):
+        self._release(semaphore_id, 1)
+
+    def handover(self, lock_id: str) -> bool:
+        """ Release the exclusive lock only if a waiter takes it over right away.
+
+            :return: ``False`` if nobody waits for the lock, which is then still held
+        """
+        entry = self.__locks.get(lock_id)
+
+        if entry is None or not entry.held or not entry.waiters:
+            return False
+
+        entry.held = False
+        entry.grant()
+
+        if entry.held or entry.shared:
+            return True
+
+        # Nobody was still waiting, so keep the lock.
+        entry.held = True
+        return False
+
+    def _release(self, lock_id: str, limit: Optional[int]):
+        entry = self.__locks.get(lock_id)
+
+        if entry is None:
+            return
+        elif limit is None:
+            if not entry.held:
                 return
 
-            lock = self.__locks.get(lock_id)
+            entry.held = False
+        else:
+            if not entry.shared:
+                return
+
+            entry.shared -= 1
+
+        # Hand the ownership over to the next waiters still waiting.
+        entry.grant()
+
+        if entry.idle:
+            # Evict the entry as nobody holds or waits for the lock.
+            del self.__locks[lock_id]
 
-            if lock.locked():
-                lock.release()
-        # End of access to the lock map
\ No newline at end of file
+    def __len__(self) -> int:
+        """ The number of lock entries in the table """
+        return len(self.__locks)
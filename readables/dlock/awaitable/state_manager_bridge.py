@@ -0,0 +1,158 @@
+"""
+Awaitable Bridge Lock State Manager
+
+Serve a blocking state manager to asyncio code. See also
+:mod:`readables.dlock.blocking.state_manager_bridge` for the other way around.
+"""
+import asyncio
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from time import monotonic
+from typing import Any, Callable, Iterable, Optional
+
+from readables.annotations import experimental
+from readables.dlock.awaitable.state_manager import AwaitableDLockStateManager
+from readables.dlock.blocking.state_manager import DLockStateManager
+
+
+@experimental
+class AwaitableBridgeLockStateManager(AwaitableDLockStateManager):
+    """
+    Awaitable Bridge Lock State Manager
+
+    Every call to the blocking state manager runs on a dedicated executor of up to ``max_workers``
+    threads, so it never blocks the event loop, nor starves the default executor.
+
+    A blocking acquisition waits in slices of up to ``poll_interval`` seconds, each one a separate call
+    on the executor, so that:
+
+    * a cancelled acquisition stops waiting within one slice (and gives the lock back if the last
+      slice got it), and
+    * the releases are never stuck behind the waiting acquisitions on a busy executor.
+
+    As a waiter joins the queue of the wrapped state manager again on each slice, the order of arrival
+    is only kept within a slice.
+
+    :param DLockStateManager manager: The blocking state manager
+    :param int max_workers: The number of threads of the executor
+    :param float poll_interval: The longest wait in a thread, in seconds
+    """
+    def __init__(self, manager: DLockStateManager, max_workers: int = 8, poll_interval: float = 0.05):
+        self.__manager = manager
+        self.__poll_interval = poll_interval
+        self.__executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='dlock-bridge')
+
+    async def _run(self, fn: Callable, *args):
+        return await asyncio.get_running_loop().run_in_executor(self.__executor, partial(fn, *args))
+
+    async def _acquire(self,
+                       acquire: Callable[[bool, Optional[float]], Any],
+                       release: Callable[[Any], None],
+                       blocking: bool,
+                       timeout: Optional[float]) -> Any:
+        """ Acquire in slices.
+
+            :param acquire: The acquisition, whose result is truthy if it succeeded
+            :param release: Give back what the result of a successful acquisition holds
+            :return: The result of the last attempt
+        """
+        if not blocking:
+            return await self._run(acquire, False, None)
+
+        deadline = None if timeout is None else monotonic() + timeout
+
+        while True:
+            remaining = None if deadline is None else max(deadline - monotonic(), 0)
+            wait = self.__poll_interval if remaining is None else min(self.__poll_interval, remaining)
+            attempt = asyncio.get_running_loop().run_in_executor(self.__executor, acquire, True, wait)
+
+            try:
+                acquired = await asyncio.shield(attempt)
+            except asyncio.CancelledError:
+                attempt.add_done_callback(partial(self._release_if_acquired, release))
+                raise
+
+            if acquired or (remaining is not None and remaining <= wait):
+                return acquired
+
+    def _release_if_acquired(self, release: Callable[[Any], None], attempt: Future):
+        """ Give the lock back when an attempt got it after the acquisition was cancelled. """
+        if not attempt.cancelled() and attempt.exception() is None and attempt.result():
+            self.__executor.submit(release, attempt.result())
+
+    async def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        return await self._acquire(partial(self._acquire_one, self.__manager.acquire, lock_id),
+                                   lambda _: self.__manager.release(lock_id),
+                                   blocking,
+                                   timeout)
+
+    @staticmethod
+    def _acquire_one(acquire: Callable[..., bool], lock_id: str, blocking: bool, timeout: Optional[float]) -> bool:
+        return acquire(lock_id, blocking=blocking, timeout=timeout)
+
+    async def is_actively_locked(self, lock_id: str) -> bool:
+        return await self._run(self.__manager.is_actively_locked, lock_id)
+
+    async def release(self, lock_id: str):
+        await self._run(self.__manager.release, lock_id)
+
+    async def acquire_many(self,
+                           lock_ids: Iterable[str],
+                           blocking: bool = True,
+                           timeout: Optional[float] = None) -> bool:
+        lock_ids = list(lock_ids)
+        return await self._acquire(partial(self._acquire_one, self.__manager.acquire_many, lock_ids),
+                                   lambda _: self.__manager.release_many(lock_ids),
+                                   blocking,
+                                   timeout)
+
+    async def release_many(self, lock_ids: Iterable[str]):
+        await self._run(self.__manager.release_many, list(lock_ids))
+
+    async def acquire_shared(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        return await self._acquire(partial(self._acquire_one, self.__manager.acquire_shared, lock_id),
+                                   lambda _: self.__manager.release_shared(lock_id),
+                                   blocking,
+                                   timeout)
+
+    async def release_shared(self, lock_id: str):
+        await self._run(self.__manager.release_shared, lock_id)
+
+    async def acquire_permit(self,
+                             semaphore_id: str,
+                             permits: int,
+                             blocking: bool = True,
+                             timeout: Optional[float] = None) -> bool:
+        return await self._acquire(partial(self._acquire_permit, semaphore_id, permits),
+                                   lambda _: self.__manager.release_permit(semaphore_id),
+                                   blocking,
+                                   timeout)
+
+    def _acquire_permit(self, semaphore_id: str, permits: int, blocking: bool, timeout: Optional[float]) -> bool:
+        return self.__manager.acquire_permit(semaphore_id, permits, blocking=blocking, timeout=timeout)
+
+    async def release_permit(self, semaphore_id: str):
+        await self._run(self.__manager.release_permit, semaphore_id)
+
+    async def acquire_lease(self,
+                            lock_id: str,
+                            ttl: float,
+                            blocking: bool = True,
+                            timeout: Optional[float] = None) -> Optional[int]:
+        return await self._acquire(partial(self._acquire_lease, lock_id, ttl),
+                                   lambda token: self.__manager.release_lease(lock_id, token),
+                                   blocking,
+                                   timeout)
+
+    def _acquire_lease(self, lock_id: str, ttl: float, blocking: bool, timeout: Optional[float]) -> Optional[int]:
+        return self.__manager.acquire_lease(lock_id, ttl, blocking=blocking, timeout=timeout)
+
+    async def renew_lease(self, lock_id: str, token: int, ttl: float) -> bool:
+        return await self._run(self.__manager.renew_lease, lock_id, token, ttl)
+
+    async def release_lease(self, lock_id: str, token: int):
+        await self._run(self.__manager.release_lease, lock_id, token)
+
+    def close(self):
+        """ Shut the executor down once the pending calls are done. """
+        self.__executor.shutdown(wait=True)
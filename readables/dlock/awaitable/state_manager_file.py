@@ -0,0 +1,85 @@
+"""
+Awaitable File Lock State Manager
+
+See :mod:`readables.dlock.blocking.state_manager_file`. This module is only available on POSIX systems.
+"""
+import os
+from asyncio import sleep
+from time import monotonic
+from typing import Dict, Optional
+
+from readables.annotations import experimental
+from readables.dlock.awaitable.state_manager import AwaitableDLockStateManager, AwaitableLocalLockStateManager
+from readables.dlock.blocking.state_manager_file import DEFAULT_DIRECTORY, lock_file_path, lock_file, unlock_file, \
+    is_file_locked
+
+
+@experimental
+class AwaitableFileLockStateManager(AwaitableDLockStateManager):
+    """
+    Awaitable File Lock State Manager
+
+    The tasks of this process are serialized by a local lock first. Then, instead of blocking the event
+    loop on ``flock(2)``, the lock file is tried without blocking and retried with an exponential
+    backoff, from ``min_poll_interval`` up to ``max_poll_interval`` seconds.
+
+    :param str directory: The directory of the lock files
+    """
+    def __init__(self,
+                 directory: Optional[str] = None,
+                 min_poll_interval: float = 0.001,
+                 max_poll_interval: float = 0.05):
+        self.__directory = directory or DEFAULT_DIRECTORY
+        self.__min_poll_interval = min_poll_interval
+        self.__max_poll_interval = max_poll_interval
+        self.__local = AwaitableLocalLockStateManager()
+        self.__fds: Dict[str, int] = dict()
+
+        os.makedirs(self.__directory, exist_ok=True)
+
+    async def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else monotonic() + timeout
+
+        if not await self.__local.acquire(lock_id, blocking, timeout):
+            return False
+
+        path = lock_file_path(self.__directory, lock_id)
+        interval = self.__min_poll_interval
+
+        try:
+            while True:
+                fd = lock_file(path, blocking=False)
+
+                if fd is not None or not blocking:
+                    break
+
+                remaining = None if deadline is None else deadline - monotonic()
+
+                if remaining is not None and remaining <= 0:
+                    break
+
+                await sleep(interval if remaining is None else min(interval, remaining))
+                interval = min(interval * 2, self.__max_poll_interval)
+        except BaseException:
+            await self.__local.release(lock_id)
+            raise
+
+        if fd is None:
+            await self.__local.release(lock_id)
+            return False
+
+        self.__fds[lock_id] = fd
+
+        return True
+
+    async def is_actively_locked(self, lock_id: str) -> bool:
+        return lock_id in self.__fds or is_file_locked(lock_file_path(self.__directory, lock_id))
+
+    async def release(self, lock_id: str):
+        fd = self.__fds.pop(lock_id, None)
+
+        if fd is None:
+            return
+
+        unlock_file(lock_file_path(self.__directory, lock_id), fd)
+        await self.__local.release(lock_id)
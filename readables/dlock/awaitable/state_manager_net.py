@@ -0,0 +1,196 @@
+"""
+Awaitable Network Lock State Manager
+
+A client of :mod:`readables.dlock.server`.
+"""
+import asyncio
+import socket
+from itertools import count
+from typing import Dict, List, Optional, Tuple, Iterable
+
+from readables.annotations import experimental
+from readables.dlock.awaitable.state_manager import AwaitableDLockStateManager
+from readables.dlock.blocking.state_manager import canonical_order
+from readables.dlock.protocol import Address, Message, encode, decode, unwrap
+
+
+class _AwaitableConnection:
+    """
+    A connection shared by many tasks
+
+    Any task can send a request without waiting for the responses of the others. A reader task
+    resolves the future of each request as its response arrives.
+    """
+    def __init__(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self.__reader = reader
+        self.__writer = writer
+        self.__ids = count()
+        self.__pending: Dict[int, Tuple[asyncio.Future, Message]] = dict()
+        self.__closed = False
+        self.__reader_task = asyncio.ensure_future(self._read())
+
+    @classmethod
+    async def open(cls, address: Address) -> '_AwaitableConnection':
+        if isinstance(address, str):
+            reader, writer = await asyncio.open_unix_connection(address)
+        else:
+            host, port = address
+            reader, writer = await asyncio.open_connection(host, port)
+            writer.get_extra_info('socket').setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        return cls(reader, writer)
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    def request(self, message: Message) -> asyncio.Future:
+        if self.__closed:
+            raise ConnectionError('The connection to the lock server is closed.')
+
+        request_id = next(self.__ids)
+        future = asyncio.get_running_loop().create_future()
+        self.__pending[request_id] = (future, message)
+        self.__writer.write(encode(dict(message, id=request_id)))
+
+        return future
+
+    async def _read(self):
+        try:
+            while True:
+                line = await self.__reader.readline()
+
+                if not line:
+                    break
+
+                response = decode(line)
+                future, request = self.__pending.pop(response['id'], (None, None))
+
+                if future is None:
+                    continue
+                elif not future.done():
+                    future.set_result(response)
+                elif request['op'] == 'acquire' and response.get('ok') and response.get('result'):
+                    # The acquisition was cancelled after the request was sent, so give the lock back.
+                    self.request({'op': 'release', 'lock': request['lock']})
+                elif request['op'] == 'acquire_many' and response.get('ok') and response.get('result'):
+                    self.request({'op': 'release_many', 'locks': request['locks']})
+        except (OSError, ValueError):
+            pass
+        finally:
+            self._fail_pending()
+
+    def _fail_pending(self):
+        self.__closed = True
+
+        for future, _ in self.__pending.values():
+            if not future.done():
+                future.set_exception(ConnectionError('The connection to the lock server is closed.'))
+
+        self.__pending.clear()
+        self.__writer.close()
+
+    async def close(self):
+        self._fail_pending()
+        self.__reader_task.cancel()
+        await asyncio.gather(self.__reader_task, return_exceptions=True)
+
+
+@experimental
+class AwaitableNetworkLockStateManager(AwaitableDLockStateManager):
+    """
+    Awaitable Network Lock State Manager
+
+    See :class:`readables.dlock.blocking.state_manager_net.NetworkLockStateManager`. The connections
+    are opened on first use in the running event loop.
+
+    :param address: A (host, port) pair or the path to a Unix socket
+    :param int pool_size: The number of connections
+    """
+    def __init__(self, address: Address, pool_size: int = 2):
+        self.__address = address
+        self.__pool: List[Optional[_AwaitableConnection]] = [None] * max(pool_size, 1)
+        self.__connecting: Dict[int, asyncio.Future] = dict()
+        self.__next_slot = count()
+        self.__owners: Dict[str, _AwaitableConnection] = dict()
+
+    async def _connection(self) -> _AwaitableConnection:
+        slot = next(self.__next_slot) % len(self.__pool)
+        connection = self.__pool[slot]
+
+        if connection is not None and not connection.closed:
+            return connection
+
+        # Concurrent tasks wait for the same connection attempt.
+        if slot not in self.__connecting:
+            self.__connecting[slot] = asyncio.ensure_future(_AwaitableConnection.open(self.__address))
+
+        try:
+            connection = self.__pool[slot] = await asyncio.shield(self.__connecting[slot])
+        finally:
+            if slot in self.__connecting and self.__connecting[slot].done():
+                del self.__connecting[slot]
+
+        return connection
+
+    async def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        connection = await self._connection()
+        request = {'op': 'acquire', 'lock': lock_id, 'blocking': blocking, 'timeout': timeout}
+
+        if not unwrap(await connection.request(request)):
+            return False
+
+        self.__owners[lock_id] = connection
+
+        return True
+
+    async def is_actively_locked(self, lock_id: str) -> bool:
+        connection = await self._connection()
+        return unwrap(await connection.request({'op': 'locked', 'lock': lock_id}))
+
+    async def release(self, lock_id: str):
+        connection = self.__owners.pop(lock_id, None)
+
+        if connection is not None:
+            unwrap(await connection.request({'op': 'release', 'lock': lock_id}))
+
+    async def acquire_many(self,
+                           lock_ids: Iterable[str],
+                           blocking: bool = True,
+                           timeout: Optional[float] = None) -> bool:
+        lock_ids = canonical_order(lock_ids)
+        connection = await self._connection()
+        request = {'op': 'acquire_many', 'locks': lock_ids, 'blocking': blocking, 'timeout': timeout}
+
+        if not unwrap(await connection.request(request)):
+            return False
+
+        for lock_id in lock_ids:
+            self.__owners[lock_id] = connection
+
+        return True
+
+    async def release_many(self, lock_ids: Iterable[str]):
+        batches: Dict[_AwaitableConnection, List[str]] = dict()
+
+        for lock_id in reversed(canonical_order(lock_ids)):
+            connection = self.__owners.pop(lock_id, None)
+
+            if connection is not None:
+                batches.setdefault(connection, []).append(lock_id)
+
+        # Send every batch before waiting for any response.
+        futures = [
+            connection.request({'op': 'release_many', 'locks': batch})
+            for connection, batch in batches.items()
+        ]
+
+        for future in futures:
+            unwrap(await future)
+
+    async def close(self):
+        connections = [c for c in self.__pool if c is not None]
+        self.__pool = [None] * len(self.__pool)
+
+        for connection in connections:
+            await connection.close()
@@ -0,0 +1,115 @@
+"""
+Awaitable SQLite Lock State Manager
+
+See :mod:`readables.dlock.blocking.state_manager_sqlite`.
+"""
+from asyncio import Future, get_running_loop, shield, sleep
+from functools import partial
+from time import monotonic
+from typing import Dict, Optional, Tuple
+from uuid import uuid4
+
+from readables.annotations import experimental
+from readables.dlock.awaitable.state_manager import AwaitableDLockStateManager
+from readables.dlock.blocking.state_manager_sqlite import DEFAULT_TTL, SQLiteLockTable
+
+
+@experimental
+class AwaitableSQLiteLockStateManager(AwaitableDLockStateManager):
+    """
+    Awaitable SQLite Lock State Manager
+
+    The statements run on the default executor of the event loop (with one connection per executor
+    thread), so that a busy database never blocks the loop.
+
+    :param str path: The path to the database file
+    :param float ttl: The number of seconds for a lease to expire
+    """
+    def __init__(self,
+                 path: str,
+                 ttl: float = DEFAULT_TTL,
+                 min_poll_interval: float = 0.001,
+                 max_poll_interval: float = 0.05):
+        self.__table = SQLiteLockTable(path)
+        self.__ttl = ttl
+        self.__min_poll_interval = min_poll_interval
+        self.__max_poll_interval = max_poll_interval
+        self.__owners: Dict[Tuple[str, int], str] = dict()  # The owner of each lease, by lock ID and token
+        self.__tokens: Dict[str, int] = dict()  # The token of the last lease of each lock ID
+
+    async def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        return await self._acquire(lock_id, self.__ttl, blocking, timeout) is not None
+
+    async def acquire_lease(self,
+                            lock_id: str,
+                            ttl: float,
+                            blocking: bool = True,
+                            timeout: Optional[float] = None) -> Optional[int]:
+        return await self._acquire(lock_id, ttl, blocking, timeout)
+
+    async def _acquire(self, lock_id: str, ttl: float, blocking: bool, timeout: Optional[float]) -> Optional[int]:
+        loop = get_running_loop()
+        deadline = None if timeout is None else monotonic() + timeout
+        owner = uuid4().hex
+        interval = self.__min_poll_interval
+
+        while True:
+            attempt = loop.run_in_executor(None, self.__table.try_acquire, lock_id, owner, ttl)
+
+            try:
+                token = await shield(attempt)
+            except BaseException:
+                # The attempt goes on in its thread, and may claim the row after the task is cancelled.
+                attempt.add_done_callback(partial(self._release_if_claimed, lock_id, owner))
+                raise
+
+            if token is not None:
+                break
+
+            remaining = None if deadline is None else deadline - monotonic()
+
+            if not blocking or (remaining is not None and remaining <= 0):
+                return None
+
+            await sleep(interval if remaining is None else min(interval, remaining))
+            interval = min(interval * 2, self.__max_poll_interval)
+
+        self.__owners[(lock_id, token)] = owner
+        self.__tokens[lock_id] = token
+
+        return token
+
+    def _release_if_claimed(self, lock_id: str, owner: str, attempt: Future):
+        """ Give the row back when an attempt claimed it after the acquisition was cancelled. """
+        if not attempt.cancelled() and attempt.exception() is None and attempt.result() is not None:
+            get_running_loop().run_in_executor(None, self.__table.release, lock_id, owner, attempt.result())
+
+    async def renew_lease(self, lock_id: str, token: int, ttl: float) -> bool:
+        owner = self.__owners.get((lock_id, token))
+
+        if owner is None:
+            return False
+
+        return await get_running_loop().run_in_executor(None, self.__table.renew, lock_id, owner, token, ttl)
+
+    async def is_actively_locked(self, lock_id: str) -> bool:
+        return await get_running_loop().run_in_executor(None, self.__table.is_locked, lock_id)
+
+    async def release(self, lock_id: str):
+        token = self.__tokens.get(lock_id)
+
+        if token is not None:
+            await self.release_lease(lock_id, token)
+
+    def close(self):
+        """ Close the connections to the database. """
+        self.__table.close()
+
+    async def release_lease(self, lock_id: str, token: int):
+        owner = self.__owners.pop((lock_id, token), None)
+
+        if self.__tokens.get(lock_id) == token:
+            del self.__tokens[lock_id]
+
+        if owner is not None:
+            await get_running_loop().run_in_executor(None, self.__table.release, lock_id, owner, token)
@@ -1,10 +1,11 @@
 import asyncio
-from asyncio import Lock, sleep
-from time import time
-from typing import Optional
+from asyncio import Event, sleep
+from time import perf_counter, time
+from typing import List, Optional
 
 from readables.dlock.awaitable.core import AwaitableDLockFactory
 from readables.dlock.awaitable.state_manager import AwaitableDLockStateManager
+from readables.dlock.blocking.state_manager_tck import LoadProfile, LoadResult
 
 
 async def check_awaitable(dlsm: AwaitableDLockStateManager,
@@ -48,3 +49,147 @@ async def check_awaitable(dlsm: AwaitableDLockStateManager,
 
     assert runtime <= timeout_duration, \
         f'The ACTUAL total runtime ({runtime:.3f}s) exceeded the expected total runtime ({timeout_duration}).'
+
+    await check_awaitable_timeout(dlsm)
+    await check_awaitable_many(dlsm)
+
+
+async def check_awaitable_timeout(dlsm: AwaitableDLockStateManager, timeout: float = 0.2, tolerance: float = 0.5):
+    """ Check that a lock held by another task fails a try-acquire and times out a bounded acquire. """
+    held = Event()
+    done = Event()
+
+    async def _holder():
+        async with AwaitableDLockFactory(manager=dlsm).lock('test-timeout'):
+            held.set()
+            await done.wait()
+
+    holder = asyncio.ensure_future(_holder())
+    await asyncio.wait_for(held.wait(), 5)
+
+    l = AwaitableDLockFactory(manager=dlsm).lock('test-timeout')
+
+    try:
+        assert not await l.acquire(blocking=False), 'A try-acquire succeeded on a held lock.'
+
+        start_time = time()
+        assert not await l.acquire(timeout=timeout), 'A bounded acquire succeeded on a held lock.'
+        runtime = time() - start_time
+
+        assert timeout <= runtime + 0.01 and runtime <= timeout + tolerance, \
+            f'The bounded acquire gave up after {runtime:.3f}s instead of {timeout}s.'
+    finally:
+        done.set()
+
+    await holder
+
+    assert await l.acquire(blocking=False), 'A try-acquire failed on a released lock.'
+    await l.release()
+
+
+async def check_awaitable_many(dlsm: AwaitableDLockStateManager,
+                               number_of_rounds: int = 20,
+                               timeout_duration: float = 30.0):
+    """ Check that overlapping sets of locks never deadlock and that a partial acquisition is rolled back. """
+    dlf = AwaitableDLockFactory(manager=dlsm)
+
+    async def _worker(ids):
+        for _ in range(number_of_rounds):
+            async with dlf.lock_many(ids) as l:
+                assert await l.locked(), 'The set of locks is not locked at the beginning.'
+                await sleep(0)
+
+    await asyncio.wait_for(
+        asyncio.gather(_worker(['test-a', 'test-b', 'test-c']), _worker(['test-c', 'test-b', 'test-a'])),
+        timeout_duration,
+    )
+
+    async with dlf.lock('test-b'):
+        assert not await dlf.lock_many(['test-a', 'test-b', 'test-c']).acquire(blocking=False), \
+            'A set of locks was acquired while one of them is held.'
+        assert not await dlf.lock('test-a').locked(), 'A partial acquisition of a set of locks was not rolled back.'
+
+    l = dlf.lock_many(['test-a', 'test-b', 'test-c'])
+    assert await l.acquire(blocking=False), 'A set of free locks was not acquired.'
+    await l.release()
+
+
+async def check_awaitable_shared(dlsm: AwaitableDLockStateManager,
+                                 number_of_readers: int = 4,
+                                 timeout_duration: float = 10.0):
+    """ Check that the readers hold a shared lock together, but never along with a writer. """
+    dlf = AwaitableDLockFactory(manager=dlsm)
+    inside = [0]
+    everyone_in = Event()
+
+    async def _reader():
+        async with dlf.shared_lock('test-shared'):
+            inside[0] += 1
+
+            if inside[0] == number_of_readers:
+                everyone_in.set()
+
+            # Every reader must be in at the same time for this to complete.
+            await everyone_in.wait()
+
+    await asyncio.wait_for(asyncio.gather(*[_reader() for _ in range(number_of_readers)]), timeout_duration)
+
+    async with dlf.shared_lock('test-shared'):
+        assert not await dlf.lock('test-shared').acquire(blocking=False), 'A writer got in along with a reader.'
+
+    async with dlf.lock('test-shared'):
+        assert not await dlf.shared_lock('test-shared').acquire(blocking=False), \
+            'A reader got in along with a writer.'
+
+
+async def check_awaitable_semaphore(dlsm: AwaitableDLockStateManager,
+                                    permits: int = 3,
+                                    number_of_concurrent_tasks: int = 9,
+                                    task_duration: float = 0.05,
+                                    timeout_duration: float = 10.0):
+    """ Check that no more than ``permits`` holders share a semaphore. """
+    dlf = AwaitableDLockFactory(manager=dlsm)
+    active = [0]
+    peak = [0]
+
+    async def _worker():
+        async with dlf.semaphore('test-semaphore', permits):
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+            await sleep(task_duration)
+            active[0] -= 1
+
+    await asyncio.wait_for(asyncio.gather(*[_worker() for _ in range(number_of_concurrent_tasks)]), timeout_duration)
+
+    assert peak[0] <= permits, f'{peak[0]} holders shared a semaphore of {permits} permits.'
+
+
+async def load_awaitable(dlsm: AwaitableDLockStateManager, profile: LoadProfile = LoadProfile()) -> LoadResult:
+    """ Run the contention profile against the state manager, with one task per worker.
+
+        See :func:`readables.dlock.blocking.state_manager_tck.load`.
+    """
+    schedules = profile.schedules()
+    dlf = AwaitableDLockFactory(manager=dlsm)
+
+    async def _worker(schedule: List[str]) -> List[float]:
+        latencies = []
+
+        for lock_id in schedule:
+            l = dlf.lock(lock_id)
+            started_at = perf_counter()
+            await l.acquire()
+            latencies.append(perf_counter() - started_at)
+
+            # Always yield, so that the other tasks get their turn even without a hold time.
+            await sleep(profile.hold_time)
+
+            await l.release()
+
+        return latencies
+
+    start_time = perf_counter()
+    results = await asyncio.gather(*[_worker(schedule) for schedule in schedules])
+    runtime = perf_counter() - start_time
+
+    return LoadResult.summarize(profile, runtime, [latency for latencies in results for latency in latencies])
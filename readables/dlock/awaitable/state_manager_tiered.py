@@ -0,0 +1,98 @@
+"""
+Awaitable Tiered Lock State Manager
+
+See :mod:`readables.dlock.blocking.state_manager_tiered`.
+"""
+from time import monotonic
+from typing import Dict, Optional
+
+from readables.annotations import experimental
+from readables.dlock.awaitable.state_manager import AwaitableDLockStateManager, AwaitableLocalLockStateManager
+
+
+@experimental
+class AwaitableTieredLockStateManager(AwaitableDLockStateManager):
+    """
+    Awaitable Tiered Lock State Manager
+
+    See :class:`readables.dlock.blocking.state_manager_tiered.TieredLockStateManager`.
+
+    :param AwaitableDLockStateManager remote: The remote state manager
+    :param int max_handoffs: The number of consecutive local handoffs allowed without a remote round trip
+    :param AwaitableLocalLockStateManager local: The local state manager
+    """
+    def __init__(self,
+                 remote: AwaitableDLockStateManager,
+                 max_handoffs: int = 16,
+                 local: Optional[AwaitableLocalLockStateManager] = None):
+        self.__remote = remote
+        self.__local = local if local is not None else AwaitableLocalLockStateManager()
+        self.__max_handoffs = max_handoffs
+        # The IDs whose remote lock is held, with the number of consecutive handoffs
+        self.__handoffs: Dict[str, int] = dict()
+
+    async def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else monotonic() + timeout
+
+        try:
+            if not await self.__local.acquire(lock_id, blocking=blocking, timeout=timeout):
+                return False
+        except BaseException:
+            await self._reclaim_handoff(lock_id)
+            raise
+
+        if lock_id in self.__handoffs:
+            # The previous local holder kept the remote lock for this task.
+            return True
+
+        remaining = None if deadline is None else max(deadline - monotonic(), 0)
+
+        try:
+            acquired = await self.__remote.acquire(lock_id, blocking=blocking, timeout=remaining)
+        except BaseException:
+            await self.__local.release(lock_id)
+            raise
+
+        if not acquired:
+            await self.__local.release(lock_id)
+            return False
+
+        self.__handoffs[lock_id] = 0
+
+        return True
+
+    async def _reclaim_handoff(self, lock_id: str):
+        """ Pass on or give back a handoff which a cancelled task has been granted but never saw.
+
+            See :meth:`readables.dlock.blocking.state_manager_tiered.TieredLockStateManager._reclaim_handoff`.
+        """
+        if not await self.__local.acquire(lock_id, blocking=False):
+            return
+
+        if lock_id in self.__handoffs:
+            await self.release(lock_id)
+        else:
+            await self.__local.release(lock_id)
+
+    async def is_actively_locked(self, lock_id: str) -> bool:
+        return await self.__remote.is_actively_locked(lock_id)
+
+    async def release(self, lock_id: str):
+        handoffs = self.__handoffs.get(lock_id)
+
+        if handoffs is None:
+            return
+
+        if handoffs < self.__max_handoffs:
+            self.__handoffs[lock_id] = handoffs + 1
+
+            if self.__local.handover(lock_id):
+                return
+
+        del self.__handoffs[lock_id]
+        await self.__remote.release(lock_id)
+        await self.__local.release(lock_id)
+
+    def remote_held(self, lock_id: str) -> bool:
+        """ Whether the remote lock of the ID is held by this manager """
+        return lock_id in self.__handoffs
@@ -0,0 +1,126 @@
+"""
+Benchmarks for the lock state managers
+
+Run with ``python -m readables.dlock.bench``, e.g., ``--managers local-64 sqlite --skew 1.1 --hold 0.001``
+to compare the state managers under a few hot IDs, or ``--ids 100000`` under many distinct IDs. Use
+``--format json`` to get machine-readable output.
+
+The number of entries left in the lock table after a run is reported for the state managers which
+keep one in memory, as it should drop back to zero once every lock is released.
+"""
+import asyncio
+import json
+import os
+import tempfile
+from argparse import ArgumentParser
+from contextlib import ExitStack
+from dataclasses import asdict
+from typing import Iterable, List, Optional, Sequence, Sized, Tuple, Union
+
+from readables.dlock.awaitable.state_manager import AwaitableDLockStateManager, AwaitableLocalLockStateManager
+from readables.dlock.awaitable.state_manager_bridge import AwaitableBridgeLockStateManager
+from readables.dlock.awaitable.state_manager_file import AwaitableFileLockStateManager
+from readables.dlock.awaitable.state_manager_sqlite import AwaitableSQLiteLockStateManager
+from readables.dlock.awaitable.state_manager_tck import load_awaitable
+from readables.dlock.blocking.state_manager import DLockStateManager, LocalLockStateManager
+from readables.dlock.blocking.state_manager_file import FileLockStateManager
+from readables.dlock.blocking.state_manager_shm import SharedMemoryLockStateManager
+from readables.dlock.blocking.state_manager_sqlite import SQLiteLockStateManager
+from readables.dlock.blocking.state_manager_tck import LoadProfile, LoadResult, load
+
+
+MANAGERS = ('local-1', 'local-64', 'shm', 'file', 'sqlite')
+
+
+def _make_manager(name: str,
+                  directory: str,
+                  awaitable: bool,
+                  stack: ExitStack) -> Union[DLockStateManager, AwaitableDLockStateManager]:
+    """ Make the state manager, whose resources are given back when the stack is closed. """
+    if name.startswith('local-'):
+        return AwaitableLocalLockStateManager() if awaitable else LocalLockStateManager(stripes=int(name[6:]))
+    elif name == 'shm':
+        manager = SharedMemoryLockStateManager(f'readables_bench_{os.getpid()}', directory=directory)
+        stack.callback(manager.unlink)
+        stack.callback(manager.close)
+
+        if not awaitable:
+            return manager
+
+        bridge = AwaitableBridgeLockStateManager(manager)
+        stack.callback(bridge.close)
+
+        return bridge
+    elif name == 'file':
+        return AwaitableFileLockStateManager(directory) if awaitable else FileLockStateManager(directory)
+    elif name == 'sqlite':
+        path = os.path.join(directory, 'locks.db')
+        manager = AwaitableSQLiteLockStateManager(path) if awaitable else SQLiteLockStateManager(path)
+        stack.callback(manager.close)
+
+        return manager
+    else:
+        raise ValueError(f'Unknown state manager: {name}')
+
+
+def run(managers: Iterable[str],
+        profile: LoadProfile,
+        awaitable: bool = False) -> List[Tuple[str, LoadResult, Optional[int]]]:
+    """ Run the contention profile against each state manager, each one in a new temporary directory.
+
+        :return: the name, the result and the number of entries left in the lock table (when the manager
+                 reports it) of each state manager
+    """
+    results = []
+
+    for name in managers:
+        with tempfile.TemporaryDirectory() as directory, ExitStack() as stack:
+            manager = _make_manager(name, directory, awaitable, stack)
+            result = asyncio.run(load_awaitable(manager, profile)) if awaitable else load(manager, profile)
+            remaining_entries = len(manager) if isinstance(manager, Sized) else None
+
+            results.append((name, result, remaining_entries))
+
+    return results
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = ArgumentParser(prog='python -m readables.dlock.bench', description='Benchmark the lock state managers.')
+    parser.add_argument('--managers', nargs='+', choices=MANAGERS, default=['local-1', 'local-64', 'shm'])
+    parser.add_argument('--ids', type=int, default=1000, help='The number of lock IDs')
+    parser.add_argument('--skew', type=float, default=0.0, help='The Zipf exponent of the ID picks (0 for uniform)')
+    parser.add_argument('--hold', type=float, default=0.0, help='The number of seconds each lock is held for')
+    parser.add_argument('--workers', type=int, default=16, help='The number of threads or tasks')
+    parser.add_argument('--operations', type=int, default=1000, help='The number of acquisitions per worker')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--awaitable', action='store_true', help='Benchmark the awaitable state managers')
+    parser.add_argument('--format', choices=('table', 'json'), default='table')
+    args = parser.parse_args(argv)
+
+    profile = LoadProfile(number_of_ids=args.ids,
+                          skew=args.skew,
+                          hold_time=args.hold,
+                          workers=args.workers,
+                          operations_per_worker=args.operations,
+                          seed=args.seed)
+    results = run(args.managers, profile, args.awaitable)
+
+    if args.format == 'json':
+        print(json.dumps([
+            dict(asdict(result), manager=name, remaining_entries=remaining_entries)
+            for name, result, remaining_entries in results
+        ], indent=2))
+        return
+
+    print(f'{"manager":<12} {"acq/s":>12} {"p50 (µs)":>10} {"p99 (µs)":>10} {"p999 (µs)":>10} {"max (µs)":>10}'
+          f' {"entries":>8}')
+
+    for name, result, remaining_entries in results:
+        print(f'{name:<12} {result.acquisitions_per_second:>12,.0f}'
+              f' {result.p50 * 1e6:>10,.1f} {result.p99 * 1e6:>10,.1f}'
+              f' {result.p999 * 1e6:>10,.1f} {result.max * 1e6:>10,.1f}'
+              f' {"-" if remaining_entries is None else remaining_entries:>8}')
+
+
+if __name__ == '__main__':
+    main()
@@ -1,7 +1,68 @@
-from typing import Dict
+from threading import Event, Thread
+from time import perf_counter
+from typing import Callable, Dict, Optional, Iterable, Sequence, Tuple, Union
 
 from readables.annotations import experimental
-from readables.dlock.blocking.state_manager import DLockStateManager
+from readables.dlock.blocking.state_manager import DLockStateManager, canonical_order
+from readables.dlock.instrumentation import DLockListener
+
+
+def _observe_acquisition(listener: DLockListener, ids: Sequence[str], acquire: Callable[[], bool]) -> bool:
+    for id in ids:
+        listener.on_wait(id)
+
+    started_at = perf_counter()
+
+    try:
+        acquired = acquire()
+    except BaseException:
+        wait_time = perf_counter() - started_at
+
+        for id in ids:
+            listener.on_give_up(id, wait_time)
+
+        raise
+
+    wait_time = perf_counter() - started_at
+
+    for id in ids:
+        if acquired:
+            listener.on_acquire(id, wait_time)
+        else:
+            listener.on_give_up(id, wait_time)
+
+    return acquired
+
+
+class _LeaseRenewal(Thread):
+    """ Renew a lease every third of its TTL until stopped, or until the lease is lost. """
+    def __init__(self, manager: DLockStateManager, lock_id: str, token: int, ttl: float):
+        super().__init__(name=f'dlock-lease-{lock_id}', daemon=True)
+        self.__manager = manager
+        self.__lock_id = lock_id
+        self.__token = token
+        self.__ttl = ttl
+        self.__stopped = Event()
+        self.lost = False
+
+    def run(self):
+        while not self.__stopped.wait(self.__ttl / 3):
+            try:
+                renewed = self.__manager.renew_lease(self.__lock_id, self.__token, self.__ttl)
+            except Exception:
+                # Try again on the next tick. If the backend stays unreachable, the lease expires and
+                # the renewal fails then.
+                continue
+
+            if not renewed:
+                self.lost = True
+                return
+
+    def stop(self):
+        self.__stopped.set()
+
+        if self.is_alive():
+            self.join()
 
 
 @experimental
@@ -9,28 +70,220 @@ class DLock:
     """
     Blocking Distributed Lock
 
+    With a ``ttl``, the lock is acquired as a lease (see :meth:`DLockStateManager.acquire_lease`) and
+    renewed in the background while held, so that a holder which dies only blocks the others for up
+    to ``ttl`` seconds.
+
     :param DLockStateManager manager: The state manager
     :param str id: The ID of the lock
+    :param DLockListener listener: The listener of the lock events
+    :param float ttl: The number of seconds for the lease to expire, if the lock is a lease
     """
 
     def __init__(self,
                  manager: DLockStateManager,
-                 id: str):
+                 id: str,
+                 listener: Optional[DLockListener] = None,
+                 ttl: Optional[float] = None):
         self.__id = id
         self.__manager = manager
+        self.__listener = listener
+        self.__acquired_at: Optional[float] = None  # While held by this instance, with a listener
+        self.__ttl = ttl
+        self.__token: Optional[int] = None
+        self.__renewal: Optional[_LeaseRenewal] = None
 
     @property
     def id(self):
         return self.__id
 
-    def acquire(self):
-        self.__manager.acquire(self.id)
+    @property
+    def manager(self) -> DLockStateManager:
+        return self.__manager
+
+    @property
+    def token(self) -> Optional[int]:
+        """ The fencing token of the lease while it is held """
+        return self.__token
+
+    @property
+    def lost(self) -> bool:
+        """ Whether the lease has been lost while held, i.e., another worker may hold the lock now """
+        return self.__renewal is not None and self.__renewal.lost
+
+    def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> Union[bool, int]:
+        """ Acquire the lock. See :meth:`DLockStateManager.acquire`.
+
+            :return: ``False`` if the lock is not acquired. Otherwise, ``True``, or the fencing token
+                     (a positive integer) if the lock has a TTL.
+        """
+        if self.__listener is None:
+            return self._acquire(blocking, timeout)
+
+        acquired = _observe_acquisition(self.__listener, (self.id,), lambda: self._acquire(blocking, timeout))
+
+        if acquired:
+            self.__acquired_at = perf_counter()
+
+        return acquired
+
+    def _acquire(self, blocking: bool, timeout: Optional[float]) -> Union[bool, int]:
+        if self.__ttl is None:
+            return self.__manager.acquire(self.id, blocking=blocking, timeout=timeout)
+
+        token = self.__manager.acquire_lease(self.id, self.__ttl, blocking=blocking, timeout=timeout)
+
+        if token is None:
+            return False
+
+        self.__token = token
+        self.__renewal = _LeaseRenewal(self.__manager, self.id, token, self.__ttl)
+        self.__renewal.start()
+
+        return token
 
     def locked(self):
         return self.__manager.is_actively_locked(self.id)
 
     def release(self):
-        self.__manager.release(self.id)
+        acquired_at, self.__acquired_at = self.__acquired_at, None
+
+        if self.__listener is not None and acquired_at is not None:
+            self.__listener.on_release(self.id, perf_counter() - acquired_at)
+
+        self._release()
+
+    def _release(self):
+        if self.__token is None:
+            self.__manager.release(self.id)
+            return
+
+        self.__renewal.stop()
+        self.__renewal = None
+        token, self.__token = self.__token, None
+        self.__manager.release_lease(self.id, token)
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.release()
+        # NOTE: Intentionally not handling error.
+        return
+
+
+@experimental
+class DSharedLock(DLock):
+    """
+    Blocking Distributed Lock in the shared mode
+
+    Readers hold the shared lock together while a writer holds the :class:`DLock` of the same ID alone.
+    Unlike the exclusive lock, it has no TTL, as the state managers only lease exclusive locks.
+
+    :param DLockStateManager manager: The state manager
+    :param str id: The ID of the lock
+    :param DLockListener listener: The listener of the lock events
+    """
+
+    def __init__(self,
+                 manager: DLockStateManager,
+                 id: str,
+                 listener: Optional[DLockListener] = None):
+        super().__init__(manager=manager, id=id, listener=listener)
+
+    def _acquire(self, blocking: bool, timeout: Optional[float]) -> bool:
+        """ Acquire the lock as a reader. See :meth:`DLockStateManager.acquire_shared`. """
+        return self.manager.acquire_shared(self.id, blocking=blocking, timeout=timeout)
+
+    def _release(self):
+        self.manager.release_shared(self.id)
+
+
+@experimental
+class DSemaphore(DLock):
+    """
+    Blocking Distributed Semaphore
+
+    :param DLockStateManager manager: The state manager
+    :param str id: The ID of the semaphore
+    :param int permits: The number of holders allowed at the same time
+    :param DLockListener listener: The listener of the lock events
+    """
+
+    def __init__(self,
+                 manager: DLockStateManager,
+                 id: str,
+                 permits: int,
+                 listener: Optional[DLockListener] = None):
+        super().__init__(manager=manager, id=id, listener=listener)
+        self.__permits = permits
+
+    @property
+    def permits(self) -> int:
+        return self.__permits
+
+    def _acquire(self, blocking: bool, timeout: Optional[float]) -> bool:
+        """ Acquire a permit. See :meth:`DLockStateManager.acquire_permit`. """
+        return self.manager.acquire_permit(self.id, self.permits, blocking=blocking, timeout=timeout)
+
+    def _release(self):
+        self.manager.release_permit(self.id)
+
+
+@experimental
+class DLockSet:
+    """
+    A set of blocking distributed locks, acquired and released all at once
+
+    :param DLockStateManager manager: The state manager
+    :param ids: The IDs of the locks
+    :param DLockListener listener: The listener of the lock events, notified for each lock of the set
+    """
+
+    def __init__(self,
+                 manager: DLockStateManager,
+                 ids: Iterable[str],
+                 listener: Optional[DLockListener] = None):
+        self.__ids = tuple(canonical_order(ids))
+        self.__manager = manager
+        self.__listener = listener
+        self.__acquired_at: Optional[float] = None  # While held by this instance, with a listener
+
+    @property
+    def ids(self) -> Tuple[str, ...]:
+        """ The IDs of the locks in the order of acquisition """
+        return self.__ids
+
+    def acquire(self, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """ Acquire all the locks or none of them. See :meth:`DLockStateManager.acquire_many`. """
+        if self.__listener is None:
+            return self.__manager.acquire_many(self.ids, blocking=blocking, timeout=timeout)
+
+        acquired = _observe_acquisition(
+            self.__listener,
+            self.ids,
+            lambda: self.__manager.acquire_many(self.ids, blocking=blocking, timeout=timeout),
+        )
+
+        if acquired:
+            self.__acquired_at = perf_counter()
+
+        return acquired
+
+    def locked(self):
+        return all(self.__manager.is_actively_locked(id) for id in self.ids)
+
+    def release(self):
+        acquired_at, self.__acquired_at = self.__acquired_at, None
+
+        if self.__listener is not None and acquired_at is not None:
+            hold_time = perf_counter() - acquired_at
+
+            for id in self.ids:
+                self.__listener.on_release(id, hold_time)
+
+        self.__manager.release_many(self.ids)
 
     def __enter__(self):
         self.acquire()
@@ -44,11 +297,39 @@ class DLock:
 
 @experimental
 class DLockFactory:
+    """
+    Blocking Distributed Lock Factory
+
+    :param DLockStateManager manager: The state manager
+    :param DLockListener listener: The listener of the events of the locks made by this factory,
+                                   e.g., :class:`readables.dlock.instrumentation.DLockMetrics`
+    """
     def __init__(self,
-                 manager: DLockStateManager):
+                 manager: DLockStateManager,
+                 listener: Optional[DLockListener] = None):
         self.__manager = manager
+        self.__listener = listener
         self.__locks: Dict[str, DLock] = dict()
 
-    def lock(self, id: str) -> DLock:
+    def lock(self, id: str, ttl: Optional[float] = None) -> DLock:
+        """ Make a lock, which is a lease renewed in the background if ``ttl`` is defined. """
         return DLock(manager=self.__manager,
-                     id=id)
+                     id=id,
+                     listener=self.__listener,
+                     ttl=ttl)
+
+    def shared_lock(self, id: str) -> DSharedLock:
+        return DSharedLock(manager=self.__manager,
+                           id=id,
+                           listener=self.__listener)
+
+    def semaphore(self, id: str, permits: int) -> DSemaphore:
+        return DSemaphore(manager=self.__manager,
+                          id=id,
+                          permits=permits,
+                          listener=self.__listener)
+
+    def lock_many(self, ids: Iterable[str]) -> DLockSet:
+        return DLockSet(manager=self.__manager,
+                        ids=ids,
+                        listener=self.__listener)
@@ -1,6 +1,10 @@
+import sys
 from abc import ABC, abstractmethod
+from collections import deque
+from itertools import count
 from threading import Lock
-from typing import Dict
+from time import monotonic
+from typing import Dict, List, Tuple, Optional, Deque, Iterable
 
 from readables.annotations import experimental
 
@@ -11,7 +15,14 @@ class DLockStateManager(ABC):
     An interface of the lock state manager
     """
     @abstractmethod
-    def acquire(self, lock_id: str):
+    def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """ Acquire the lock.
+
+            When ``blocking`` is disabled, this method returns right away, and ``timeout`` is ignored.
+            Otherwise, it waits for up to ``timeout`` seconds, or indefinitely if undefined.
+
+            :return: ``True`` if the lock is acquired
+        """
         raise NotImplemented()
 
     @abstractmethod
@@ -22,38 +33,324 @@ class DLockStateManager(ABC):
     def release(self, lock_id: str):
         raise NotImplemented()
 
+    def acquire_many(self, lock_ids: Iterable[str], blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """ Acquire all the locks or none of them.
+
+            The locks are acquired in the canonical (sorted) order, so that two callers asking for
+            overlapping sets never deadlock. If any lock cannot be acquired (or an error occurs), the
+            locks acquired so far are released. ``timeout`` applies to the whole set.
+
+            A remote state manager should override this method to acquire the set in one round trip.
+
+            :return: ``True`` if all the locks are acquired
+        """
+        deadline = None if timeout is None else monotonic() + timeout
+        acquired: List[str] = []
+
+        try:
+            for lock_id in canonical_order(lock_ids):
+                remaining = None if deadline is None else max(deadline - monotonic(), 0)
+
+                if not self.acquire(lock_id, blocking=blocking, timeout=remaining):
+                    self.release_many(acquired)
+                    return False
+
+                acquired.append(lock_id)
+        except BaseException:
+            self.release_many(acquired)
+            raise
+
+        return True
+
+    def release_many(self, lock_ids: Iterable[str]):
+        """ Release the locks, in the reverse canonical order. """
+        for lock_id in reversed(canonical_order(lock_ids)):
+            self.release(lock_id)
+
+    def acquire_shared(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        """ Acquire the lock in the shared mode (as a reader).
+
+            Any number of readers can hold the lock together, but never along with a writer, which
+            acquires the lock with :meth:`acquire`. The arguments are the same as :meth:`acquire`.
+
+            :return: ``True`` if the lock is acquired
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support shared locks.')
+
+    def release_shared(self, lock_id: str):
+        raise NotImplementedError(f'{type(self).__name__} does not support shared locks.')
+
+    def acquire_permit(self,
+                       semaphore_id: str,
+                       permits: int,
+                       blocking: bool = True,
+                       timeout: Optional[float] = None) -> bool:
+        """ Acquire one of the ``permits`` of the semaphore.
+
+            All the callers of a semaphore must agree on the number of permits. The other arguments
+            are the same as :meth:`acquire`.
+
+            :return: ``True`` if a permit is acquired
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support semaphores.')
+
+    def release_permit(self, semaphore_id: str):
+        raise NotImplementedError(f'{type(self).__name__} does not support semaphores.')
+
+    def acquire_lease(self,
+                      lock_id: str,
+                      ttl: float,
+                      blocking: bool = True,
+                      timeout: Optional[float] = None) -> Optional[int]:
+        """ Acquire the lock as a lease, which expires after ``ttl`` seconds unless renewed.
+
+            The other arguments are the same as :meth:`acquire`.
+
+            :return: The fencing token of the lease, greater than the token of any earlier lease on
+                     the lock, or ``None`` if the lock is not acquired. A resource guarded by the lock
+                     should reject the writes carrying a token lower than the highest it has seen.
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support leases.')
+
+    def renew_lease(self, lock_id: str, token: int, ttl: float) -> bool:
+        """ Extend the lease by ``ttl`` seconds from now.
+
+            :return: ``False`` if the lease has been lost (expired, or taken over by another holder)
+        """
+        raise NotImplementedError(f'{type(self).__name__} does not support leases.')
+
+    def release_lease(self, lock_id: str, token: int):
+        raise NotImplementedError(f'{type(self).__name__} does not support leases.')
+
+
+def canonical_order(lock_ids: Iterable[str]) -> List[str]:
+    """ The order in which a set of locks is acquired, without duplicates """
+    return sorted(set(lock_ids))
+
+
+class _Waiter:
+    __slots__ = ('lock', 'limit')
+
+    def __init__(self, limit: Optional[int]):
+        self.lock = Lock()
+        self.lock.acquire()
+        self.limit = limit
+
+
+class _LockEntry:
+    __slots__ = ('held', 'shared', 'waiters')
+
+    def __init__(self):
+        self.held = False  # Whether the lock is held exclusively
+        self.shared = 0  # The number of shared holders (readers or permits)
+        self.waiters: Deque[_Waiter] = deque()  # The waiters in the order of arrival
+
+    def grantable(self, limit: Optional[int]) -> bool:
+        """ Whether the lock can be taken, exclusively without ``limit``, or shared by up to ``limit`` holders """
+        if self.held:
+            return False
+
+        return self.shared == 0 if limit is None else self.shared < limit
+
+    def take(self, limit: Optional[int]):
+        if limit is None:
+            self.held = True
+        else:
+            self.shared += 1
+
+    def grant(self):
+        """ Hand the lock over to the waiters at the front of the queue, as long as they can share it. """
+        while self.waiters and self.grantable(self.waiters[0].limit):
+            waiter = self.waiters.popleft()
+            self.take(waiter.limit)
+            waiter.lock.release()
+
+    @property
+    def idle(self) -> bool:
+        return not self.held and not self.shared and not self.waiters
+
 
 @experimental
 class LocalLockStateManager(DLockStateManager):
     """
     Local Lock State Manager
+
+    The lock table is split into stripes, each one guarded by its own mutex, so that the threads
+    working on different IDs rarely contend. An entry is only kept while a thread holds or waits for
+    its lock, so the memory usage is bounded by the number of active locks, not by the number of IDs
+    ever used.
+
+    The waiters are served in the order of arrival. Each waiter sleeps on its own lock, which the
+    releasing thread hands the ownership over with, so that no waiter polls. Consecutive shared
+    waiters are woken up together, while a waiting writer holds back the readers arriving after it.
+
+    As the holders live in this process, a lease never expires, and its fencing token only orders the
+    leases of this manager.
+
+    :param int stripes: The number of stripes
     """
-    def __init__(self):
-        self.__access_lock = Lock()
-        self.__locks: Dict[str, Lock] = dict()
+    def __init__(self, stripes: int = 64):
+        self.__stripes: List[Tuple[Lock, Dict[str, _LockEntry]]] = [
+            (Lock(), dict())
+            for _ in range(max(stripes, 1))
+        ]
+        self.__tokens = count(1)
+
+    def _stripe(self, lock_id: str) -> Tuple[Lock, Dict[str, _LockEntry]]:
+        return self.__stripes[hash(lock_id) % len(self.__stripes)]
+
+    def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        return self._acquire(lock_id, None, blocking, timeout)
+
+    def acquire_shared(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        return self._acquire(lock_id, sys.maxsize, blocking, timeout)
+
+    def acquire_permit(self,
+                       semaphore_id: str,
+                       permits: int,
+                       blocking: bool = True,
+                       timeout: Optional[float] = None) -> bool:
+        return self._acquire(semaphore_id, max(permits, 1), blocking, timeout)
+
+    def acquire_lease(self,
+                      lock_id: str,
+                      ttl: float,
+                      blocking: bool = True,
+                      timeout: Optional[float] = None) -> Optional[int]:
+        return next(self.__tokens) if self._acquire(lock_id, None, blocking, timeout) else None
+
+    def renew_lease(self, lock_id: str, token: int, ttl: float) -> bool:
+        return True
+
+    def release_lease(self, lock_id: str, token: int):
+        self._release(lock_id, None)
+
+    def _acquire(self, lock_id: str, limit: Optional[int], blocking: bool, timeout: Optional[float]) -> bool:
+        access_lock, entries = self._stripe(lock_id)
 
-    def acquire(self, lock_id: str):
-        with self.__access_lock:
-            if lock_id not in self.__locks:
-                self.__locks[lock_id] = Lock()
+        with access_lock:
+            entry = entries.get(lock_id)
+
+            if entry is None:
+                entry = entries[lock_id] = _LockEntry()
+
+            if not entry.waiters and entry.grantable(limit):
+                entry.take(limit)
+                return True
+
+            if not blocking:
+                return False
+
+            waiter = _Waiter(limit)
+            entry.waiters.append(waiter)
         # End of accessing to the lock map
 
-        # Acquire the lock.
-        self.__locks.get(lock_id).acquire()
+        # Wait for the ownership to be handed over.
+        try:
+            if waiter.lock.acquire(timeout=-1 if timeout is None else max(timeout, 0)):
+                return True
+        except BaseException:
+            if not self._abandon(lock_id, entry, waiter):
+                self._release(lock_id, limit)
+            raise
+
+        return not self._abandon(lock_id, entry, waiter)
+
+    def _abandon(self, lock_id: str, entry: _LockEntry, waiter: _Waiter) -> bool:
+        """ Stop waiting.
+
+            :return: ``False`` if the ownership has been handed over in the meantime.
+        """
+        access_lock, entries = self._stripe(lock_id)
+
+        with access_lock:
+            try:
+                entry.waiters.remove(waiter)
+            except ValueError:
+                return False
+
+            # The waiters held back by this one may go ahead now.
+            entry.grant()
+
+            if entry.idle:
+                del entries[lock_id]
+
+            return True
+        # End of accessing to the lock map
 
     def is_actively_locked(self, lock_id: str) -> bool:
-        with self.__access_lock:
-            return lock_id in self.__locks or self.__locks.get(lock_id).locked()
+        access_lock, entries = self._stripe(lock_id)
+
+        with access_lock:
+            entry = entries.get(lock_id)
+            return entry is not None and (entry.held or entry.shared > 0)
+        # End of access to the lock map
+
+    def waiting(self, lock_id: str) -> int:
+        """ The number of threads waiting for the lock """
+        access_lock, entries = self._stripe(lock_id)
+
+        with access_lock:
+            entry = entries.get(lock_id)
+            return 0 if entry is None else len(entry.waiters)
         # End of access to the lock map
 
     def release(self, lock_id: str):
-        with self.__access_lock:
-            if lock_id not in self.__locks:
+        self._release(lock_id, None)
+
+    def release_shared(self, lock_id: str):
+        self._release(lock_id, sys.maxsize)
+
+    def release_permit(self, semaphore_id: str):
+        self._release(semaphore_id, 1)
+
+    def handover(self, lock_id: str) -> bool:
+        """ Release the exclusive lock only if a waiter takes it over right away.
+
+            :return: ``False`` if nobody waits for the lock, which is then still held
+        """
+        access_lock, entries = self._stripe(lock_id)
+
+        with access_lock:
+            entry = entries.get(lock_id)
+
+            if entry is None or not entry.held or not entry.waiters:
+                return False
+
+            # As the lock is free, the first waiter takes it for sure.
+            entry.held = False
+            entry.grant()
+
+            return True
+        # End of access to the lock map
+
+    def _release(self, lock_id: str, limit: Optional[int]):
+        access_lock, entries = self._stripe(lock_id)
+
+        with access_lock:
+            entry = entries.get(lock_id)
+
+            if entry is None:
                 return
+            elif limit is None:
+                if not entry.held:
+                    return
+
+                entry.held = False
+            else:
+                if not entry.shared:
+                    return
+
+                entry.shared -= 1
 
-            lock = self.__locks.get(lock_id)
+            # Hand the ownership over to the next waiters.
+            entry.grant()
 
-            if lock.locked():
-                lock.release()
+            if entry.idle:
+                # Evict the entry as nobody holds or waits for the lock.
+                del entries[lock_id]
         # End of access to the lock map
 
+    def __len__(self) -> int:
+        """ The number of lock entries in the table """
+        return sum(len(entries) for _, entries in self.__stripes)
@@ -0,0 +1,165 @@
+"""
+Bridge Lock State Manager
+
+Serve an awaitable state manager to threaded code. See also
+:mod:`readables.dlock.awaitable.state_manager_bridge` for the other way around.
+"""
+import asyncio
+from concurrent.futures import CancelledError, Future
+from functools import partial
+from threading import Lock, Thread
+from typing import Any, Callable, Coroutine, Iterable, List, Optional, Set
+
+from readables.annotations import experimental
+from readables.dlock.awaitable.state_manager import AwaitableDLockStateManager
+from readables.dlock.blocking.state_manager import DLockStateManager
+
+
+@experimental
+class BridgeLockStateManager(DLockStateManager):
+    """
+    Bridge Lock State Manager
+
+    Every call runs as a coroutine on an event loop in a background thread, started on first use,
+    while the calling thread waits for its result. If the calling thread is interrupted while waiting
+    (e.g., ``KeyboardInterrupt``), the coroutine is cancelled, and an acquisition which completed
+    anyway is given back.
+
+    :param AwaitableDLockStateManager manager: The awaitable state manager
+    :param loop: The event loop to run the coroutines on, already running in another thread.
+                 If undefined, the bridge runs its own loop.
+    """
+    def __init__(self, manager: AwaitableDLockStateManager, loop: Optional[asyncio.AbstractEventLoop] = None):
+        self.__manager = manager
+        self.__loop = loop
+        self.__thread: Optional[Thread] = None
+        self.__access_lock = Lock()
+        self.__releases: Set[asyncio.Task] = set()  # The releases of the abandoned acquisitions
+
+    def _event_loop(self) -> asyncio.AbstractEventLoop:
+        with self.__access_lock:
+            if self.__loop is None:
+                self.__loop = asyncio.new_event_loop()
+                self.__thread = Thread(target=self.__loop.run_forever, name='dlock-bridge', daemon=True)
+                self.__thread.start()
+
+            return self.__loop
+        # End of access to the event loop
+
+    def _run(self,
+             coroutine: Coroutine[Any, Any, Any],
+             release: Optional[Callable[[Any], Coroutine[Any, Any, Any]]] = None) -> Any:
+        """ Run the coroutine on the event loop, and wait for its result.
+
+            :param release: For an acquisition, the coroutine function giving back what the result
+                            of the acquisition holds
+        """
+        loop = self._event_loop()
+        future: Future = Future()
+        tasks: List[asyncio.Task] = []
+
+        # The task is created here, rather than by asyncio.run_coroutine_threadsafe, so that its outcome
+        # is still known on the loop if the calling thread stops waiting for it.
+        loop.call_soon_threadsafe(self._start, coroutine, future, tasks)
+
+        try:
+            return future.result()
+        except BaseException:
+            # Scheduled after _start, so the task exists by then.
+            loop.call_soon_threadsafe(self._abandon, tasks, release)
+            raise
+
+    @staticmethod
+    def _start(coroutine: Coroutine[Any, Any, Any], future: Future, tasks: List[asyncio.Task]):
+        future.set_running_or_notify_cancel()
+        task = asyncio.get_running_loop().create_task(coroutine)
+        task.add_done_callback(partial(BridgeLockStateManager._set_result, future))
+        tasks.append(task)
+
+    @staticmethod
+    def _set_result(future: Future, task: asyncio.Task):
+        if task.cancelled():
+            future.set_exception(CancelledError())
+        elif task.exception() is not None:
+            future.set_exception(task.exception())
+        else:
+            future.set_result(task.result())
+
+    def _abandon(self, tasks: List[asyncio.Task], release: Optional[Callable[[Any], Coroutine[Any, Any, Any]]]):
+        """ Cancel the task of a call nobody waits for anymore, on the loop. """
+        task = tasks[0]
+
+        # The awaitable state manager gives the lock back if it is cancelled while waiting.
+        task.cancel()
+
+        if release is not None:
+            # The acquisition may have completed already, or complete in spite of the cancellation.
+            task.add_done_callback(partial(self._release_if_acquired, release))
+
+    def _release_if_acquired(self, release: Callable[[Any], Coroutine[Any, Any, Any]], task: asyncio.Task):
+        if not task.cancelled() and task.exception() is None and task.result():
+            release_task = asyncio.get_running_loop().create_task(release(task.result()))
+            self.__releases.add(release_task)
+            release_task.add_done_callback(self.__releases.discard)
+
+    def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        return self._run(self.__manager.acquire(lock_id, blocking=blocking, timeout=timeout),
+                         lambda _: self.__manager.release(lock_id))
+
+    def is_actively_locked(self, lock_id: str) -> bool:
+        return self._run(self.__manager.is_actively_locked(lock_id))
+
+    def release(self, lock_id: str):
+        self._run(self.__manager.release(lock_id))
+
+    def acquire_many(self, lock_ids: Iterable[str], blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        lock_ids = list(lock_ids)
+        return self._run(self.__manager.acquire_many(lock_ids, blocking=blocking, timeout=timeout),
+                         lambda _: self.__manager.release_many(lock_ids))
+
+    def release_many(self, lock_ids: Iterable[str]):
+        self._run(self.__manager.release_many(list(lock_ids)))
+
+    def acquire_shared(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        return self._run(self.__manager.acquire_shared(lock_id, blocking=blocking, timeout=timeout),
+                         lambda _: self.__manager.release_shared(lock_id))
+
+    def release_shared(self, lock_id: str):
+        self._run(self.__manager.release_shared(lock_id))
+
+    def acquire_permit(self,
+                       semaphore_id: str,
+                       permits: int,
+                       blocking: bool = True,
+                       timeout: Optional[float] = None) -> bool:
+        return self._run(self.__manager.acquire_permit(semaphore_id, permits, blocking=blocking, timeout=timeout),
+                         lambda _: self.__manager.release_permit(semaphore_id))
+
+    def release_permit(self, semaphore_id: str):
+        self._run(self.__manager.release_permit(semaphore_id))
+
+    def acquire_lease(self,
+                      lock_id: str,
+                      ttl: float,
+                      blocking: bool = True,
+                      timeout: Optional[float] = None) -> Optional[int]:
+        return self._run(self.__manager.acquire_lease(lock_id, ttl, blocking=blocking, timeout=timeout),
+                         lambda token: self.__manager.release_lease(lock_id, token))
+
+    def renew_lease(self, lock_id: str, token: int, ttl: float) -> bool:
+        return self._run(self.__manager.renew_lease(lock_id, token, ttl))
+
+    def release_lease(self, lock_id: str, token: int):
+        self._run(self.__manager.release_lease(lock_id, token))
+
+    def close(self):
+        """ Stop the event loop of the bridge, if it runs its own. """
+        with self.__access_lock:
+            thread, self.__thread = self.__thread, None
+        # End of access to the event loop
+
+        if thread is not None:
+            self.__loop.call_soon_threadsafe(self.__loop.stop)
+            thread.join()
+            self.__loop.close()
+            self.__loop = None
@@ -0,0 +1,173 @@
+"""
+File Lock State Manager
+
+The locks are lock files locked with ``flock(2)`` so that they are shared by every process on the same
+host (e.g. pre-fork workers). This module is only available on POSIX systems.
+"""
+import fcntl
+import os
+import tempfile
+from hashlib import sha1
+from threading import Lock
+from time import monotonic, sleep
+from typing import Dict, Optional
+
+from readables.annotations import experimental
+from readables.dlock.blocking.state_manager import DLockStateManager, LocalLockStateManager
+
+DEFAULT_DIRECTORY = os.path.join(tempfile.gettempdir(), 'readables-dlock')
+
+
+def lock_file_path(directory: str, lock_id: str) -> str:
+    return os.path.join(directory, f'{sha1(lock_id.encode()).hexdigest()}.lock')
+
+
+def lock_file(path: str, blocking: bool = True) -> Optional[int]:
+    """ Lock the file exclusively and return its file descriptor.
+
+        As the previous holder removes the file on release, the file that has just been locked may have
+        been removed (or replaced) in the meantime, in which case the lock is retried on the new file.
+
+        :return: the file descriptor, or ``None`` if the file is locked and ``blocking`` is disabled.
+    """
+    while True:
+        fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX if blocking else fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return None
+        except BaseException:
+            os.close(fd)
+            raise
+
+        try:
+            current = os.stat(path)
+        except FileNotFoundError:
+            os.close(fd)
+            continue
+
+        locked = os.fstat(fd)
+
+        if (current.st_dev, current.st_ino) == (locked.st_dev, locked.st_ino):
+            return fd
+
+        os.close(fd)
+
+
+def unlock_file(path: str, fd: int):
+    """ Remove and unlock the file. """
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+    fcntl.flock(fd, fcntl.LOCK_UN)
+    os.close(fd)
+
+
+def is_file_locked(path: str) -> bool:
+    try:
+        fd = os.open(path, os.O_RDONLY)
+    except FileNotFoundError:
+        return False
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_SH | fcntl.LOCK_NB)
+    except BlockingIOError:
+        return True
+    else:
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        return False
+    finally:
+        os.close(fd)
+
+
+@experimental
+class FileLockStateManager(DLockStateManager):
+    """
+    File Lock State Manager
+
+    The threads of this process are serialized by a local lock first, so that each lock ID only has
+    one file descriptor at a time.
+
+    As ``flock(2)`` cannot time out, an acquisition with a timeout retries the lock file without
+    blocking, with an exponential backoff from ``min_poll_interval`` up to ``max_poll_interval``
+    seconds.
+
+    :param str directory: The directory of the lock files
+    """
+    def __init__(self,
+                 directory: Optional[str] = None,
+                 min_poll_interval: float = 0.001,
+                 max_poll_interval: float = 0.05):
+        self.__directory = directory or DEFAULT_DIRECTORY
+        self.__min_poll_interval = min_poll_interval
+        self.__max_poll_interval = max_poll_interval
+        self.__access_lock = Lock()
+        self.__local = LocalLockStateManager()
+        self.__fds: Dict[str, int] = dict()
+
+        os.makedirs(self.__directory, exist_ok=True)
+
+    def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else monotonic() + timeout
+
+        if not self.__local.acquire(lock_id, blocking, timeout):
+            return False
+
+        path = lock_file_path(self.__directory, lock_id)
+
+        try:
+            if not blocking:
+                fd = lock_file(path, blocking=False)
+            elif deadline is None:
+                fd = lock_file(path)
+            else:
+                fd = self._poll(path, deadline)
+        except BaseException:
+            self.__local.release(lock_id)
+            raise
+
+        if fd is None:
+            self.__local.release(lock_id)
+            return False
+
+        with self.__access_lock:
+            self.__fds[lock_id] = fd
+        # End of access to the file descriptor map
+
+        return True
+
+    def _poll(self, path: str, deadline: float) -> Optional[int]:
+        interval = self.__min_poll_interval
+
+        while True:
+            fd = lock_file(path, blocking=False)
+            remaining = deadline - monotonic()
+
+            if fd is not None or remaining <= 0:
+                return fd
+
+            sleep(min(interval, remaining))
+            interval = min(interval * 2, self.__max_poll_interval)
+
+    def is_actively_locked(self, lock_id: str) -> bool:
+        with self.__access_lock:
+            if lock_id in self.__fds:
+                return True
+        # End of access to the file descriptor map
+
+        return is_file_locked(lock_file_path(self.__directory, lock_id))
+
+    def release(self, lock_id: str):
+        with self.__access_lock:
+            fd = self.__fds.pop(lock_id, None)
+        # End of access to the file descriptor map
+
+        if fd is None:
+            return
+
+        unlock_file(lock_file_path(self.__directory, lock_id), fd)
+        self.__local.release(lock_id)
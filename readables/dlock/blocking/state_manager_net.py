@@ -0,0 +1,220 @@
+"""
+Network Lock State Manager
+
+A client of :mod:`readables.dlock.server`.
+"""
+import socket
+from concurrent.futures import Future
+from functools import partial
+from itertools import count
+from threading import Lock, Thread
+from typing import Dict, List, Optional, Iterable
+
+from readables.annotations import experimental
+from readables.dlock.blocking.state_manager import DLockStateManager, canonical_order
+from readables.dlock.protocol import Address, Message, encode, decode, unwrap
+
+
+class _Connection:
+    """
+    A connection shared by many threads
+
+    Any thread can send a request without waiting for the responses of the others. A reader thread
+    resolves the future of each request as its response arrives.
+    """
+    def __init__(self, address: Address, timeout: Optional[float]):
+        if isinstance(address, str):
+            self.__socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            self.__socket.settimeout(timeout)
+            self.__socket.connect(address)
+        else:
+            self.__socket = socket.create_connection(address, timeout=timeout)
+            self.__socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+        # The reader must be able to wait for a grant indefinitely.
+        self.__socket.settimeout(None)
+
+        self.__send_lock = Lock()
+        self.__ids = count()
+        self.__pending: Dict[int, Future] = dict()
+        self.__closed = False
+
+        Thread(target=self._read, daemon=True).start()
+
+    @property
+    def closed(self) -> bool:
+        return self.__closed
+
+    def request(self, message: Message) -> Future:
+        future = Future()
+
+        with self.__send_lock:
+            if self.__closed:
+                raise ConnectionError('The connection to the lock server is closed.')
+
+            request_id = next(self.__ids)
+            self.__pending[request_id] = future
+            self.__socket.sendall(encode(dict(message, id=request_id)))
+        # End of sending the request
+
+        return future
+
+    def _read(self):
+        try:
+            with self.__socket.makefile('rb') as stream:
+                for line in stream:
+                    response = decode(line)
+                    future = self.__pending.pop(response['id'], None)
+
+                    if future is not None:
+                        future.set_result(response)
+        except (OSError, ValueError):
+            pass
+        finally:
+            self.close()
+
+    def close(self):
+        with self.__send_lock:
+            self.__closed = True
+            pending = list(self.__pending.values())
+            self.__pending.clear()
+        # End of closing
+
+        for future in pending:
+            if not future.done():
+                future.set_exception(ConnectionError('The connection to the lock server is closed.'))
+
+        try:
+            self.__socket.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+
+        self.__socket.close()
+
+
+@experimental
+class NetworkLockStateManager(DLockStateManager):
+    """
+    Network Lock State Manager
+
+    Requests are spread over a pool of ``pool_size`` connections, each one shared by every thread.
+    As a lock belongs to the connection that acquired it on the server, its release is sent on the same
+    connection.
+
+    :param address: A (host, port) pair or the path to a Unix socket
+    :param int pool_size: The number of connections
+    :param float connect_timeout: The number of seconds to wait for a connection
+    """
+    def __init__(self, address: Address, pool_size: int = 2, connect_timeout: Optional[float] = 10.0):
+        self.__address = address
+        self.__connect_timeout = connect_timeout
+        self.__access_lock = Lock()
+        self.__pool: List[Optional[_Connection]] = [None] * max(pool_size, 1)
+        self.__next_slot = count()
+        self.__owners: Dict[str, _Connection] = dict()
+
+    def _connection(self) -> _Connection:
+        with self.__access_lock:
+            slot = next(self.__next_slot) % len(self.__pool)
+            connection = self.__pool[slot]
+
+            if connection is None or connection.closed:
+                connection = self.__pool[slot] = _Connection(self.__address, self.__connect_timeout)
+
+            return connection
+        # End of access to the pool
+
+    def _granted(self, connection: _Connection, request: Message, release: Message) -> bool:
+        """ Send an acquisition and wait for its result.
+
+            If the caller stops waiting (e.g., on a keyboard interrupt), the request is still pending on
+            the server, so the lock is given back with ``release`` if it is granted later on.
+        """
+        future = connection.request(request)
+
+        try:
+            return unwrap(future.result())
+        except BaseException:
+            future.add_done_callback(partial(self._release_late_grant, connection, release))
+            raise
+
+    @staticmethod
+    def _release_late_grant(connection: _Connection, release: Message, future: Future):
+        if future.cancelled() or future.exception() is not None:
+            return
+
+        response = future.result()
+
+        if response.get('ok') and response.get('result'):
+            try:
+                connection.request(release)
+            except ConnectionError:
+                pass  # The server releases the locks of a closed connection.
+
+    def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        connection = self._connection()
+        request = {'op': 'acquire', 'lock': lock_id, 'blocking': blocking, 'timeout': timeout}
+
+        if not self._granted(connection, request, {'op': 'release', 'lock': lock_id}):
+            return False
+
+        with self.__access_lock:
+            self.__owners[lock_id] = connection
+        # End of access to the owner map
+
+        return True
+
+    def is_actively_locked(self, lock_id: str) -> bool:
+        return unwrap(self._connection().request({'op': 'locked', 'lock': lock_id}).result())
+
+    def release(self, lock_id: str):
+        with self.__access_lock:
+            connection = self.__owners.pop(lock_id, None)
+        # End of access to the owner map
+
+        if connection is not None:
+            unwrap(connection.request({'op': 'release', 'lock': lock_id}).result())
+
+    def acquire_many(self, lock_ids: Iterable[str], blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        lock_ids = canonical_order(lock_ids)
+        connection = self._connection()
+        request = {'op': 'acquire_many', 'locks': lock_ids, 'blocking': blocking, 'timeout': timeout}
+
+        if not self._granted(connection, request, {'op': 'release_many', 'locks': lock_ids}):
+            return False
+
+        with self.__access_lock:
+            for lock_id in lock_ids:
+                self.__owners[lock_id] = connection
+        # End of access to the owner map
+
+        return True
+
+    def release_many(self, lock_ids: Iterable[str]):
+        batches: Dict[_Connection, List[str]] = dict()
+
+        with self.__access_lock:
+            for lock_id in reversed(canonical_order(lock_ids)):
+                connection = self.__owners.pop(lock_id, None)
+
+                if connection is not None:
+                    batches.setdefault(connection, []).append(lock_id)
+        # End of access to the owner map
+
+        # Send every batch before waiting for any response.
+        futures = [
+            connection.request({'op': 'release_many', 'locks': batch})
+            for connection, batch in batches.items()
+        ]
+
+        for future in futures:
+            unwrap(future.result())
+
+    def close(self):
+        with self.__access_lock:
+            connections = [c for c in self.__pool if c is not None]
+            self.__pool = [None] * len(self.__pool)
+        # End of access to the pool
+
+        for connection in connections:
+            connection.close()
@@ -0,0 +1,244 @@
+"""
+Shared Memory Lock State Manager
+
+The lock table is a fixed-size hash table of slots in a :mod:`multiprocessing.shared_memory` block,
+shared by every process on the same host that opens the table by name. Taking or giving back a lock
+only writes a slot in memory, with no file system or socket round trip.
+
+This module is only available on POSIX systems.
+"""
+import fcntl
+import os
+import struct
+import sys
+import tempfile
+from hashlib import blake2b
+from multiprocessing import resource_tracker, shared_memory
+from threading import Lock
+from time import monotonic, sleep
+from typing import Dict, List, Optional, Tuple
+
+from readables.annotations import experimental
+from readables.dlock.blocking.state_manager import DLockStateManager
+
+DEFAULT_NAME = 'readables_dlock'
+
+# A slot is the 16-byte digest of the lock ID (all zeros when free) and the PID of its owner.
+_SLOT = struct.Struct('<16si4x')
+_FREE = bytes(16)
+
+
+def _open_shared_memory(name: str, size: int) -> shared_memory.SharedMemory:
+    """ Open the block, or create it (zero-filled) if it does not exist yet.
+
+        The block outlives the processes using it, until :meth:`SharedMemoryLockStateManager.unlink`,
+        so it is not left to the resource tracker, which would remove it as soon as one of them exits.
+    """
+    track = {'track': False} if sys.version_info >= (3, 13) else {}
+
+    try:
+        block = shared_memory.SharedMemory(name=name, create=True, size=size, **track)
+    except FileExistsError:
+        block = shared_memory.SharedMemory(name=name, **track)
+
+    if not track:
+        resource_tracker.unregister(block._name, 'shared_memory')
+
+    if block.size < size:
+        block.close()
+        raise ValueError(f'The shared memory block "{name}" is smaller than a table of this size.')
+
+    return block
+
+
+@experimental
+class SharedMemoryLockStateManager(DLockStateManager):
+    """
+    Shared Memory Lock State Manager
+
+    An ID is hashed to a bucket of ``bucket_size`` slots, and takes any free slot of its bucket. Each
+    bucket is guarded by a ``fcntl`` record lock (one byte of a guard file) against the other processes,
+    and by a mutex against the other threads. The operating system releases the record locks of a
+    process when it dies, so a guard is never left locked.
+
+    A slot holds the PID of the owner of the lock. If the owner is dead, the next process contending
+    for the lock reclaims it. As a PID may be reused by the system, a lock whose owner died may stay
+    held until the new process with that PID exits.
+
+    There is no notification across processes, so a waiter polls its slot with an exponential backoff,
+    from ``min_poll_interval`` up to ``max_poll_interval`` seconds. A full bucket makes the waiters wait
+    as if the lock were held.
+
+    All the processes must open the table with the same ``name``, ``buckets`` and ``bucket_size``.
+    The block stays until :meth:`unlink` is called.
+
+    :param str name: The name of the shared memory block
+    :param int buckets: The number of buckets
+    :param int bucket_size: The number of slots per bucket
+    :param str directory: The directory of the guard file
+    """
+    def __init__(self,
+                 name: str = DEFAULT_NAME,
+                 buckets: int = 1024,
+                 bucket_size: int = 8,
+                 directory: Optional[str] = None,
+                 min_poll_interval: float = 0.00005,
+                 max_poll_interval: float = 0.005):
+        self.__buckets = max(buckets, 1)
+        self.__bucket_size = max(bucket_size, 1)
+        self.__min_poll_interval = min_poll_interval
+        self.__max_poll_interval = max_poll_interval
+
+        self.__block = _open_shared_memory(name, self.__buckets * self.__bucket_size * _SLOT.size)
+        self.__guard_fd = os.open(os.path.join(directory or tempfile.gettempdir(), f'{name}.guard'),
+                                  os.O_RDWR | os.O_CREAT,
+                                  0o644)
+        self.__mutexes: List[Lock] = [Lock() for _ in range(self.__buckets)]
+        self.__access_lock = Lock()
+        self.__slots: Dict[str, int] = dict()  # The slots of the locks held by this process
+
+    @staticmethod
+    def _key(lock_id: str) -> bytes:
+        return blake2b(lock_id.encode(), digest_size=16).digest()
+
+    def _bucket(self, key: bytes) -> int:
+        return int.from_bytes(key[:8], 'little') % self.__buckets
+
+    def _guard(self, bucket: int):
+        self.__mutexes[bucket].acquire()
+
+        try:
+            fcntl.lockf(self.__guard_fd, fcntl.LOCK_EX, 1, bucket)
+        except BaseException:
+            self.__mutexes[bucket].release()
+            raise
+
+    def _unguard(self, bucket: int):
+        fcntl.lockf(self.__guard_fd, fcntl.LOCK_UN, 1, bucket)
+        self.__mutexes[bucket].release()
+
+    def _slots(self, bucket: int) -> range:
+        first = bucket * self.__bucket_size
+        return range(first, first + self.__bucket_size)
+
+    def _read(self, slot: int) -> Tuple[bytes, int]:
+        return _SLOT.unpack_from(self.__block.buf, slot * _SLOT.size)
+
+    def _write(self, slot: int, key: bytes, pid: int):
+        _SLOT.pack_into(self.__block.buf, slot * _SLOT.size, key, pid)
+
+    @staticmethod
+    def _alive(pid: int) -> bool:
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return False
+        except PermissionError:
+            pass
+
+        return True
+
+    def _try_acquire(self, key: bytes) -> Optional[int]:
+        """ Take a slot for the key, unless the lock is held.
+
+            :return: The slot, or ``None`` if the lock is held (or the bucket is full)
+        """
+        bucket = self._bucket(key)
+        pid = os.getpid()  # Not cached, as the process may fork
+        self._guard(bucket)
+
+        try:
+            free_slot = None
+
+            for slot in self._slots(bucket):
+                slot_key, owner = self._read(slot)
+
+                if slot_key == key:
+                    if owner == pid or self._alive(owner):
+                        return None
+
+                    # Reclaim the lock of a dead owner.
+                    self._write(slot, key, pid)
+                    return slot
+                elif slot_key == _FREE and free_slot is None:
+                    free_slot = slot
+
+            if free_slot is not None:
+                self._write(free_slot, key, pid)
+
+            return free_slot
+        finally:
+            self._unguard(bucket)
+
+    def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        key = self._key(lock_id)
+        deadline = None if timeout is None else monotonic() + timeout
+        interval = self.__min_poll_interval
+
+        while True:
+            slot = self._try_acquire(key)
+
+            if slot is not None:
+                break
+
+            remaining = None if deadline is None else deadline - monotonic()
+
+            if not blocking or (remaining is not None and remaining <= 0):
+                return False
+
+            sleep(interval if remaining is None else min(interval, remaining))
+            interval = min(interval * 2, self.__max_poll_interval)
+
+        with self.__access_lock:
+            self.__slots[lock_id] = slot
+        # End of access to the slot map
+
+        return True
+
+    def is_actively_locked(self, lock_id: str) -> bool:
+        key = self._key(lock_id)
+        bucket = self._bucket(key)
+        self._guard(bucket)
+
+        try:
+            for slot in self._slots(bucket):
+                slot_key, owner = self._read(slot)
+
+                if slot_key == key:
+                    return owner == os.getpid() or self._alive(owner)
+
+            return False
+        finally:
+            self._unguard(bucket)
+
+    def release(self, lock_id: str):
+        with self.__access_lock:
+            slot = self.__slots.pop(lock_id, None)
+        # End of access to the slot map
+
+        if slot is None:
+            return
+
+        key = self._key(lock_id)
+        bucket = self._bucket(key)
+        self._guard(bucket)
+
+        try:
+            # The slot may have been reclaimed if this process was taken for dead (see the PID reuse).
+            if self._read(slot) == (key, os.getpid()):
+                self._write(slot, _FREE, 0)
+        finally:
+            self._unguard(bucket)
+
+    def close(self):
+        """ Detach from the table, without removing it. """
+        os.close(self.__guard_fd)
+        self.__block.close()
+
+    def unlink(self):
+        """ Remove the table for every process. The processes already attached keep using it. """
+        if sys.version_info < (3, 13):
+            # Before Python 3.13, unlinking also unregisters the block from the resource tracker.
+            resource_tracker.register(self.__block._name, 'shared_memory')
+
+        self.__block.unlink()
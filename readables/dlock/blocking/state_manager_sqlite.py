@@ -0,0 +1,229 @@
+"""
+SQLite Lock State Manager
+
+Each lock is a lease row in a SQLite database (in WAL mode) so that the locks are shared by every
+process that can open the database file. A lease expires after its TTL, so a crashed holder only
+blocks the others until then.
+"""
+import sqlite3
+import threading
+from time import monotonic, sleep, time
+from typing import Dict, List, Optional, Tuple
+from uuid import uuid4
+
+from readables.annotations import experimental
+from readables.dlock.blocking.state_manager import DLockStateManager
+
+DEFAULT_TTL = 30.0
+
+
+class SQLiteLockTable:
+    """
+    The lease table shared by the blocking and awaitable SQLite state managers
+
+    Each thread has its own connection, opened on its first use, until :meth:`close`.
+
+    A released lease keeps its row, so that the fencing token of the next lease on the same lock keeps
+    increasing. The table therefore has one row per lock ID ever used.
+
+    :param str path: The path to the database file
+    :param str table: The name of the table
+    :param float busy_timeout: The number of seconds to wait for the database to be unlocked
+    """
+    def __init__(self, path: str, table: str = 'readables_dlock', busy_timeout: float = 5.0):
+        self.__path = path
+        self.__table = table
+        self.__busy_timeout = busy_timeout
+        self.__connections = threading.local()
+        self.__all_connections: List[sqlite3.Connection] = []  # The connections of every thread, to close them
+        self.__access_lock = threading.Lock()
+        self.__closed = False
+
+        self.__acquire_sql = (
+            f'INSERT INTO {table} (lock_id, owner, expires_at, token) VALUES (?, ?, ?, 1)'
+            f' ON CONFLICT (lock_id) DO UPDATE'
+            f' SET owner = excluded.owner, expires_at = excluded.expires_at, token = {table}.token + 1'
+            f' WHERE {table}.expires_at <= ?'
+        )
+        self.__token_sql = f'SELECT token FROM {table} WHERE lock_id = ?'
+        self.__renew_sql = (
+            f'UPDATE {table} SET expires_at = ? WHERE lock_id = ? AND owner = ? AND token = ? AND expires_at > ?'
+        )
+        self.__release_sql = f'UPDATE {table} SET expires_at = 0 WHERE lock_id = ? AND owner = ? AND token = ?'
+        self.__is_locked_sql = f'SELECT 1 FROM {table} WHERE lock_id = ? AND expires_at > ?'
+
+        self._connection().execute(
+            f'CREATE TABLE IF NOT EXISTS {table} ('
+            f' lock_id TEXT PRIMARY KEY,'
+            f' owner TEXT NOT NULL,'
+            f' expires_at REAL NOT NULL,'
+            f' token INTEGER NOT NULL'
+            f')'
+        )
+
+    def _connection(self) -> sqlite3.Connection:
+        connection = getattr(self.__connections, 'connection', None)
+
+        if connection is None:
+            if self.__closed:
+                raise sqlite3.ProgrammingError('Cannot operate on a closed lock table.')
+
+            # Autocommit mode, where each statement is a transaction on its own. A connection is only
+            # used by its thread, but closed by the thread calling close().
+            connection = sqlite3.connect(self.__path,
+                                         timeout=self.__busy_timeout,
+                                         isolation_level=None,
+                                         check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            self.__connections.connection = connection
+
+            with self.__access_lock:
+                self.__all_connections.append(connection)
+            # End of access to the connection list
+
+        return connection
+
+    def try_acquire(self, lock_id: str, owner: str, ttl: float) -> Optional[int]:
+        """ Take the lease if it is free or expired, with an upsert and a read of the new token in one
+            immediate transaction.
+
+            :return: The fencing token of the lease, or ``None`` if the lease is held by another owner
+        """
+        connection = self._connection()
+        now = time()
+
+        # The upsert and the read of the new token must see the same row.
+        connection.execute('BEGIN IMMEDIATE')
+
+        try:
+            if connection.execute(self.__acquire_sql, (lock_id, owner, now + ttl, now)).rowcount == 1:
+                token = connection.execute(self.__token_sql, (lock_id,)).fetchone()[0]
+            else:
+                token = None
+
+            connection.execute('COMMIT')
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+
+        return token
+
+    def renew(self, lock_id: str, owner: str, token: int, ttl: float) -> bool:
+        """ Extend the lease of the token, unless it has expired in the meantime. """
+        now = time()
+        return self._connection().execute(self.__renew_sql, (now + ttl, lock_id, owner, token, now)).rowcount == 1
+
+    def is_locked(self, lock_id: str) -> bool:
+        return self._connection().execute(self.__is_locked_sql, (lock_id, time())).fetchone() is not None
+
+    def release(self, lock_id: str, owner: str, token: int):
+        """ Give the lease of the token back, unless another owner has taken the lock since then. """
+        self._connection().execute(self.__release_sql, (lock_id, owner, token))
+
+    def close(self):
+        """ Close the connections of every thread. The table must not be used afterward. """
+        with self.__access_lock:
+            self.__closed = True
+            connections, self.__all_connections = self.__all_connections, []
+        # End of access to the connection list
+
+        for connection in connections:
+            connection.close()
+
+
+@experimental
+class SQLiteLockStateManager(DLockStateManager):
+    """
+    SQLite Lock State Manager
+
+    While waiting, the lease is retried with an exponential backoff, from ``min_poll_interval`` up to
+    ``max_poll_interval`` seconds.
+
+    :meth:`acquire` takes a lease of ``ttl`` seconds, which is not renewed. :meth:`acquire_lease` takes
+    its own TTL, returns the fencing token of the lease, and :meth:`renew_lease` extends it.
+
+    :param str path: The path to the database file
+    :param float ttl: The number of seconds for a lease to expire
+    """
+    def __init__(self,
+                 path: str,
+                 ttl: float = DEFAULT_TTL,
+                 min_poll_interval: float = 0.001,
+                 max_poll_interval: float = 0.05):
+        self.__table = SQLiteLockTable(path)
+        self.__ttl = ttl
+        self.__min_poll_interval = min_poll_interval
+        self.__max_poll_interval = max_poll_interval
+        self.__access_lock = threading.Lock()
+        self.__owners: Dict[Tuple[str, int], str] = dict()  # The owner of each lease, by lock ID and token
+        self.__tokens: Dict[str, int] = dict()  # The token of the last lease of each lock ID
+
+    def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        return self._acquire(lock_id, self.__ttl, blocking, timeout) is not None
+
+    def acquire_lease(self,
+                      lock_id: str,
+                      ttl: float,
+                      blocking: bool = True,
+                      timeout: Optional[float] = None) -> Optional[int]:
+        return self._acquire(lock_id, ttl, blocking, timeout)
+
+    def _acquire(self, lock_id: str, ttl: float, blocking: bool, timeout: Optional[float]) -> Optional[int]:
+        deadline = None if timeout is None else monotonic() + timeout
+        owner = uuid4().hex
+        interval = self.__min_poll_interval
+
+        while True:
+            token = self.__table.try_acquire(lock_id, owner, ttl)
+
+            if token is not None:
+                break
+
+            remaining = None if deadline is None else deadline - monotonic()
+
+            if not blocking or (remaining is not None and remaining <= 0):
+                return None
+
+            sleep(interval if remaining is None else min(interval, remaining))
+            interval = min(interval * 2, self.__max_poll_interval)
+
+        with self.__access_lock:
+            self.__owners[(lock_id, token)] = owner
+            self.__tokens[lock_id] = token
+        # End of access to the owner map
+
+        return token
+
+    def renew_lease(self, lock_id: str, token: int, ttl: float) -> bool:
+        with self.__access_lock:
+            owner = self.__owners.get((lock_id, token))
+        # End of access to the owner map
+
+        return owner is not None and self.__table.renew(lock_id, owner, token, ttl)
+
+    def is_actively_locked(self, lock_id: str) -> bool:
+        return self.__table.is_locked(lock_id)
+
+    def release(self, lock_id: str):
+        with self.__access_lock:
+            token = self.__tokens.get(lock_id)
+        # End of access to the owner map
+
+        if token is not None:
+            self.release_lease(lock_id, token)
+
+    def close(self):
+        """ Close the connections to the database. """
+        self.__table.close()
+
+    def release_lease(self, lock_id: str, token: int):
+        with self.__access_lock:
+            owner = self.__owners.pop((lock_id, token), None)
+
+            if self.__tokens.get(lock_id) == token:
+                del self.__tokens[lock_id]
+        # End of access to the owner map
+
+        if owner is not None:
+            self.__table.release(lock_id, owner, token)
@@ -1,12 +1,19 @@
 """
 Test Compatibility Kit for Blocking Distributed Lock
-"""
 
-from typing import Optional
+Besides the compatibility checks, :func:`load` runs a contention profile against any state manager
+and measures its throughput and acquire latency.
+"""
+import math
+import random
+from bisect import bisect
+from dataclasses import dataclass
+from itertools import accumulate
+from typing import List, Optional, Sequence
 
 from concurrent.futures import ThreadPoolExecutor, as_completed
-from threading import Lock
-from time import sleep, time
+from threading import Barrier, Event, Lock
+from time import perf_counter, sleep, time
 
 from readables.dlock.blocking.core import DLockFactory
 from readables.dlock.blocking.state_manager import DLockStateManager
@@ -60,3 +67,211 @@ def check(dlsm: DLockStateManager,
 
     assert runtime <= timeout_duration, \
         f'The ACTUAL total runtime ({runtime:.3f}s) exceeded the expected total runtime ({timeout_duration}).'
+
+    check_timeout(dlsm)
+    check_many(dlsm)
+
+
+def check_timeout(dlsm: DLockStateManager, timeout: float = 0.2, tolerance: float = 0.5):
+    """ Check that a lock held by another worker fails a try-acquire and times out a bounded acquire. """
+    held = Event()
+    done = Event()
+
+    def _holder():
+        with DLockFactory(manager=dlsm).lock('test-timeout'):
+            held.set()
+            done.wait(timeout + tolerance + 5)
+
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        holder = pool.submit(_holder)
+        assert held.wait(5), 'The holder did not acquire the lock.'
+
+        l = DLockFactory(manager=dlsm).lock('test-timeout')
+
+        try:
+            assert not l.acquire(blocking=False), 'A try-acquire succeeded on a held lock.'
+
+            start_time = time()
+            assert not l.acquire(timeout=timeout), 'A bounded acquire succeeded on a held lock.'
+            runtime = time() - start_time
+
+            assert timeout <= runtime + 0.01 and runtime <= timeout + tolerance, \
+                f'The bounded acquire gave up after {runtime:.3f}s instead of {timeout}s.'
+        finally:
+            done.set()
+
+        holder.result()
+
+    assert l.acquire(blocking=False), 'A try-acquire failed on a released lock.'
+    l.release()
+
+
+def check_many(dlsm: DLockStateManager, number_of_rounds: int = 20, timeout_duration: float = 30.0):
+    """ Check that overlapping sets of locks never deadlock and that a partial acquisition is rolled back. """
+    dlf = DLockFactory(manager=dlsm)
+
+    def _worker(ids):
+        for _ in range(number_of_rounds):
+            with dlf.lock_many(ids) as l:
+                assert l.locked(), 'The set of locks is not locked at the beginning.'
+
+    with ThreadPoolExecutor(max_workers=2) as pool:
+        futures = [
+            pool.submit(_worker, ['test-a', 'test-b', 'test-c']),
+            pool.submit(_worker, ['test-c', 'test-b', 'test-a']),
+        ]
+
+        for future in as_completed(futures, timeout=timeout_duration):
+            future.result()
+
+    with dlf.lock('test-b'):
+        assert not dlf.lock_many(['test-a', 'test-b', 'test-c']).acquire(blocking=False), \
+            'A set of locks was acquired while one of them is held.'
+        assert not dlf.lock('test-a').locked(), 'A partial acquisition of a set of locks was not rolled back.'
+
+    l = dlf.lock_many(['test-a', 'test-b', 'test-c'])
+    assert l.acquire(blocking=False), 'A set of free locks was not acquired.'
+    l.release()
+
+
+def check_shared(dlsm: DLockStateManager, number_of_readers: int = 4, timeout_duration: float = 10.0):
+    """ Check that the readers hold a shared lock together, but never along with a writer. """
+    dlf = DLockFactory(manager=dlsm)
+    barrier = Barrier(number_of_readers, timeout=timeout_duration)
+
+    def _reader():
+        with dlf.shared_lock('test-shared'):
+            # Every reader must be in at the same time to pass the barrier.
+            barrier.wait()
+
+    with ThreadPoolExecutor(max_workers=number_of_readers) as pool:
+        for future in [pool.submit(_reader) for _ in range(number_of_readers)]:
+            future.result(timeout=timeout_duration)
+
+    with dlf.shared_lock('test-shared'):
+        assert not dlf.lock('test-shared').acquire(blocking=False), 'A writer got in along with a reader.'
+
+    with dlf.lock('test-shared'):
+        assert not dlf.shared_lock('test-shared').acquire(blocking=False), 'A reader got in along with a writer.'
+
+
+def check_semaphore(dlsm: DLockStateManager,
+                    permits: int = 3,
+                    number_of_concurrent_tasks: int = 9,
+                    task_duration: float = 0.05,
+                    timeout_duration: float = 10.0):
+    """ Check that no more than ``permits`` holders share a semaphore. """
+    dlf = DLockFactory(manager=dlsm)
+    counter_lock = Lock()
+    active = [0]
+    peak = [0]
+
+    def _worker():
+        with dlf.semaphore('test-semaphore', permits):
+            with counter_lock:
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+
+            sleep(task_duration)
+
+            with counter_lock:
+                active[0] -= 1
+
+    with ThreadPoolExecutor(max_workers=number_of_concurrent_tasks) as pool:
+        for future in [pool.submit(_worker) for _ in range(number_of_concurrent_tasks)]:
+            future.result(timeout=timeout_duration)
+
+    assert peak[0] <= permits, f'{peak[0]} holders shared a semaphore of {permits} permits.'
+
+
+@dataclass(frozen=True)
+class LoadProfile:
+    """
+    A contention profile
+
+    :param int number_of_ids: The number of lock IDs to pick from
+    :param float skew: The exponent of the Zipf distribution of the picks (0 for uniform, about 1 for a
+                       few hot IDs)
+    :param float hold_time: The number of seconds each lock is held for
+    :param int workers: The number of threads (or tasks)
+    :param int operations_per_worker: The number of acquisitions per worker
+    :param int seed: The seed of the random picks
+    """
+    number_of_ids: int = 1000
+    skew: float = 0.0
+    hold_time: float = 0.0
+    workers: int = 16
+    operations_per_worker: int = 1000
+    seed: int = 0
+
+    def schedules(self) -> List[List[str]]:
+        """ The lock IDs each worker acquires, in order """
+        rng = random.Random(self.seed)
+        ids = [f'load-{i}' for i in range(self.number_of_ids)]
+        cumulative_weights = list(accumulate(1 / (rank ** self.skew) for rank in range(1, self.number_of_ids + 1)))
+        total = cumulative_weights[-1]
+
+        return [
+            [ids[min(bisect(cumulative_weights, rng.random() * total), self.number_of_ids - 1)]
+             for _ in range(self.operations_per_worker)]
+            for _ in range(self.workers)
+        ]
+
+
+@dataclass(frozen=True)
+class LoadResult:
+    """ The outcome of a contention profile, with the latencies in seconds """
+    profile: LoadProfile
+    acquisitions: int
+    seconds: float
+    acquisitions_per_second: float
+    p50: float
+    p99: float
+    p999: float
+    max: float
+
+    @classmethod
+    def summarize(cls, profile: LoadProfile, seconds: float, latencies: Sequence[float]) -> 'LoadResult':
+        ordered = sorted(latencies)
+
+        def _percentile(q: float) -> float:
+            return ordered[max(math.ceil(len(ordered) * q / 100) - 1, 0)] if ordered else 0.0
+
+        return cls(profile=profile,
+                   acquisitions=len(ordered),
+                   seconds=seconds,
+                   acquisitions_per_second=len(ordered) / seconds if seconds else 0.0,
+                   p50=_percentile(50),
+                   p99=_percentile(99),
+                   p999=_percentile(99.9),
+                   max=ordered[-1] if ordered else 0.0)
+
+
+def load(dlsm: DLockStateManager, profile: LoadProfile = LoadProfile()) -> LoadResult:
+    """ Run the contention profile against the state manager and measure its acquire latency. """
+    schedules = profile.schedules()
+    dlf = DLockFactory(manager=dlsm)
+
+    def _worker(schedule: List[str]) -> List[float]:
+        latencies = []
+
+        for lock_id in schedule:
+            l = dlf.lock(lock_id)
+            started_at = perf_counter()
+            l.acquire()
+            latencies.append(perf_counter() - started_at)
+
+            if profile.hold_time > 0:
+                sleep(profile.hold_time)
+
+            l.release()
+
+        return latencies
+
+    with ThreadPoolExecutor(max_workers=profile.workers) as pool:
+        start_time = perf_counter()
+        futures = [pool.submit(_worker, schedule) for schedule in schedules]
+        latencies = [latency for future in futures for latency in future.result()]
+        runtime = perf_counter() - start_time
+
+    return LoadResult.summarize(profile, runtime, latencies)
@@ -0,0 +1,132 @@
+"""
+Tiered Lock State Manager
+
+A local lock per ID in front of a remote state manager, so that the threads of one process waiting
+for the same ID queue locally instead of each polling or queueing on the backend.
+"""
+from threading import Lock
+from time import monotonic
+from typing import Dict, Optional
+
+from readables.annotations import experimental
+from readables.dlock.blocking.state_manager import DLockStateManager, LocalLockStateManager
+
+
+@experimental
+class TieredLockStateManager(DLockStateManager):
+    """
+    Tiered Lock State Manager
+
+    A thread first acquires the local lock of the ID, so only one thread per ID talks to the remote
+    state manager at a time.
+
+    On release, if another local thread waits for the same ID, the remote lock is kept and the local
+    lock is handed over directly, which saves a remote release and acquisition. To let the other
+    processes in, the remote lock is still given back after ``max_handoffs`` consecutive handoffs
+    (``0`` to always give it back).
+
+    The remote lock may then be held for longer than any single holder, so a remote lease TTL must
+    cover the handoffs too.
+
+    :param DLockStateManager remote: The remote state manager
+    :param int max_handoffs: The number of consecutive local handoffs allowed without a remote round trip
+    :param LocalLockStateManager local: The local state manager
+    """
+    def __init__(self,
+                 remote: DLockStateManager,
+                 max_handoffs: int = 16,
+                 local: Optional[LocalLockStateManager] = None):
+        self.__remote = remote
+        self.__local = local if local is not None else LocalLockStateManager()
+        self.__max_handoffs = max_handoffs
+        self.__access_lock = Lock()
+        # The IDs whose remote lock is held, with the number of consecutive handoffs
+        self.__handoffs: Dict[str, int] = dict()
+
+    def acquire(self, lock_id: str, blocking: bool = True, timeout: Optional[float] = None) -> bool:
+        deadline = None if timeout is None else monotonic() + timeout
+
+        try:
+            if not self.__local.acquire(lock_id, blocking=blocking, timeout=timeout):
+                return False
+        except BaseException:
+            self._reclaim_handoff(lock_id)
+            raise
+
+        with self.__access_lock:
+            handed_over = lock_id in self.__handoffs
+        # End of access to the handoff map
+
+        if handed_over:
+            # The previous local holder kept the remote lock for this thread.
+            return True
+
+        remaining = None if deadline is None else max(deadline - monotonic(), 0)
+
+        try:
+            acquired = self.__remote.acquire(lock_id, blocking=blocking, timeout=remaining)
+        except BaseException:
+            self.__local.release(lock_id)
+            raise
+
+        if not acquired:
+            self.__local.release(lock_id)
+            return False
+
+        with self.__access_lock:
+            self.__handoffs[lock_id] = 0
+        # End of access to the handoff map
+
+        return True
+
+    def _reclaim_handoff(self, lock_id: str):
+        """ Pass on or give back a handoff which an interrupted thread has been granted but never saw.
+
+            The local lock has then been released (to the next waiter, if any) while the remote lock is
+            still held. If nobody took the local lock over, take it back to release both as its holder.
+        """
+        if not self.__local.acquire(lock_id, blocking=False):
+            # Held by another thread, which either continues the handoffs or holds no remote lock yet.
+            return
+
+        with self.__access_lock:
+            handed_over = lock_id in self.__handoffs
+        # End of access to the handoff map
+
+        if handed_over:
+            self.release(lock_id)
+        else:
+            self.__local.release(lock_id)
+
+    def is_actively_locked(self, lock_id: str) -> bool:
+        return self.__remote.is_actively_locked(lock_id)
+
+    def release(self, lock_id: str):
+        # The handoff count of the ID is only updated by the holder of its local lock, i.e., this thread.
+        with self.__access_lock:
+            handoffs = self.__handoffs.get(lock_id)
+        # End of access to the handoff map
+
+        if handoffs is None:
+            return
+
+        if handoffs < self.__max_handoffs:
+            with self.__access_lock:
+                self.__handoffs[lock_id] = handoffs + 1
+            # End of access to the handoff map
+
+            if self.__local.handover(lock_id):
+                return
+
+        with self.__access_lock:
+            del self.__handoffs[lock_id]
+        # End of access to the handoff map
+
+        self.__remote.release(lock_id)
+        self.__local.release(lock_id)
+
+    def remote_held(self, lock_id: str) -> bool:
+        """ Whether the remote lock of the ID is held by this manager """
+        with self.__access_lock:
+            return lock_id in self.__handoffs
+        # End of access to the handoff map
@@ -0,0 +1,171 @@
+"""
+Instrumentation of the distributed locks
+
+A :class:`DLockListener` given to :class:`readables.dlock.blocking.core.DLockFactory` or
+:class:`readables.dlock.awaitable.core.AwaitableDLockFactory` is notified of every acquisition and
+release of the locks made by the factory. Without a listener, a lock only pays for one ``is None``
+check per call.
+
+:class:`DLockMetrics` is a listener keeping, for each lock ID, the histograms of the wait and hold
+times, the contention counters and the number of current waiters.
+"""
+import math
+from dataclasses import dataclass, field
+from threading import Lock
+from typing import Dict, List, Tuple
+
+from readables.annotations import experimental
+
+
+@experimental
+class DLockListener:
+    """
+    The listener of the lock events
+
+    Every method does nothing by default, so that a listener only overrides the events it needs. The
+    methods are called from the threads (or the event loop) using the locks, so they must be quick
+    and thread-safe.
+    """
+    def on_wait(self, lock_id: str):
+        """ A worker starts waiting for the lock. """
+
+    def on_acquire(self, lock_id: str, wait_time: float):
+        """ A worker acquired the lock after ``wait_time`` seconds. """
+
+    def on_give_up(self, lock_id: str, wait_time: float):
+        """ A worker gave up (or failed) acquiring the lock after ``wait_time`` seconds. """
+
+    def on_release(self, lock_id: str, hold_time: float):
+        """ A worker released the lock after holding it for ``hold_time`` seconds. """
+
+
+class Histogram:
+    """
+    A histogram of durations with logarithmic buckets
+
+    The bucket ``i`` counts the durations up to ``2 ** i`` microseconds, so a percentile is accurate
+    to a factor of two, and recording a duration costs no allocation.
+    """
+    BUCKETS = 40  # Up to 2 ** 39 µs, about 6 days
+
+    __slots__ = ('buckets', 'count', 'total', 'max')
+
+    def __init__(self):
+        self.buckets = [0] * self.BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def record(self, seconds: float):
+        microseconds = seconds * 1_000_000
+        index = math.frexp(microseconds)[1] if microseconds > 1 else 0
+        self.buckets[min(index, self.BUCKETS - 1)] += 1
+        self.count += 1
+        self.total += seconds
+
+        if seconds > self.max:
+            self.max = seconds
+
+    @property
+    def mean(self) -> float:
+        return self.total / self.count if self.count else 0.0
+
+    def percentile(self, q: float) -> float:
+        """ The upper bound of the ``q``-th percentile (0 to 100) in seconds """
+        if not self.count:
+            return 0.0
+
+        rank = math.ceil(self.count * q / 100)
+        seen = 0
+
+        for index, bucket in enumerate(self.buckets):
+            seen += bucket
+
+            if seen >= rank:
+                return min((2 ** index) / 1_000_000, self.max)
+
+        return self.max
+
+
+@dataclass
+class LockStats:
+    """ The statistics of one lock ID """
+    wait: Histogram = field(default_factory=Histogram)
+    hold: Histogram = field(default_factory=Histogram)
+    acquisitions: int = 0
+    contentions: int = 0  # The acquisitions that found the lock held or awaited by another worker
+    give_ups: int = 0
+    waiters: int = 0  # The workers currently waiting
+    holders: int = 0  # The workers currently holding
+
+
+@experimental
+class DLockMetrics(DLockListener):
+    """
+    A listener keeping the statistics of each lock ID
+
+    The contention is observed through this listener only, so it only accounts for the workers using
+    the factories sharing the listener, not for the other processes using the same state manager.
+    """
+    def __init__(self):
+        self.__access_lock = Lock()
+        self.__stats: Dict[str, LockStats] = dict()
+
+    def _stats(self, lock_id: str) -> LockStats:
+        stats = self.__stats.get(lock_id)
+
+        if stats is None:
+            stats = self.__stats[lock_id] = LockStats()
+
+        return stats
+
+    def on_wait(self, lock_id: str):
+        with self.__access_lock:
+            stats = self._stats(lock_id)
+
+            if stats.waiters or stats.holders:
+                stats.contentions += 1
+
+            stats.waiters += 1
+        # End of access to the statistics
+
+    def on_acquire(self, lock_id: str, wait_time: float):
+        with self.__access_lock:
+            stats = self._stats(lock_id)
+            stats.waiters -= 1
+            stats.holders += 1
+            stats.acquisitions += 1
+            stats.wait.record(wait_time)
+        # End of access to the statistics
+
+    def on_give_up(self, lock_id: str, wait_time: float):
+        with self.__access_lock:
+            stats = self._stats(lock_id)
+            stats.waiters -= 1
+            stats.give_ups += 1
+            stats.wait.record(wait_time)
+        # End of access to the statistics
+
+    def on_release(self, lock_id: str, hold_time: float):
+        with self.__access_lock:
+            stats = self._stats(lock_id)
+            stats.holders -= 1
+            stats.hold.record(hold_time)
+        # End of access to the statistics
+
+    def stats(self, lock_id: str) -> LockStats:
+        """ The statistics of the lock ID (empty if it has never been used) """
+        with self.__access_lock:
+            return self.__stats.get(lock_id) or LockStats()
+        # End of access to the statistics
+
+    def hottest(self, n: int = 10) -> List[Tuple[str, LockStats]]:
+        """ The ``n`` lock IDs with the longest total wait time, which limit the throughput the most """
+        with self.__access_lock:
+            return sorted(self.__stats.items(), key=lambda item: item[1].wait.total, reverse=True)[:n]
+        # End of access to the statistics
+
+    def reset(self):
+        with self.__access_lock:
+            self.__stats.clear()
+        # End of access to the statistics
@@ -0,0 +1,39 @@
+"""
+The wire protocol between the lock server and its clients
+
+Each message is a JSON object on its own line. A request has an ``id`` (unique per connection), an
+``op`` and its arguments. The server answers each request with a response carrying the same ``id``,
+so a client can send many requests on one connection without waiting (pipelining).
+
+An ``acquire`` request (with the optional ``blocking`` and ``timeout`` arguments) is only answered
+once the lock is granted or the timeout is reached, so the response is the grant notification and
+clients never poll. ``acquire_many`` and ``release_many`` take a list of ``locks`` so that a set of
+locks costs one round trip.
+"""
+import json
+from typing import Any, Dict, Tuple, Union
+
+Address = Union[Tuple[str, int], str]
+""" A (host, port) pair for TCP or a path for a Unix socket """
+
+Message = Dict[str, Any]
+
+
+class LockServerError(RuntimeError):
+    """ The lock server rejected a request. """
+
+
+def encode(message: Message) -> bytes:
+    return json.dumps(message, separators=(',', ':')).encode() + b'\n'
+
+
+def decode(line: bytes) -> Message:
+    return json.loads(line)
+
+
+def unwrap(response: Message) -> Any:
+    """ Get the result of the response, or raise its error. """
+    if not response.get('ok'):
+        raise LockServerError(response.get('error', 'Unknown error'))
+
+    return response.get('result')
@@ -0,0 +1,198 @@
+"""
+Lock Server
+
+A small asyncio server keeping the lock table in memory, for the network state managers in
+:mod:`readables.dlock.blocking.state_manager_net` and :mod:`readables.dlock.awaitable.state_manager_net`.
+
+A lock belongs to the connection that acquired it. When a connection is closed, its locks are
+released and its pending requests are dropped. :meth:`LockServer.close` closes every connection this
+way after it stops accepting new ones.
+
+Run with ``python -m readables.dlock.server --port 7420`` (or ``--unix /path/to/socket``).
+"""
+import asyncio
+from argparse import ArgumentParser
+from typing import Dict, Set, Optional, Awaitable, Callable, Any, Sequence, List
+
+from readables.annotations import experimental
+from readables.dlock.awaitable.state_manager import AwaitableLocalLockStateManager
+from readables.dlock.protocol import Address, Message, encode, decode
+
+
+class _Session:
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.held: Set[str] = set()
+        self.tasks: Set[asyncio.Future] = set()
+
+    def send(self, message: Message):
+        if not self.writer.is_closing():
+            self.writer.write(encode(message))
+
+
+@experimental
+class LockServer:
+    def __init__(self):
+        self.__table = AwaitableLocalLockStateManager()
+        self.__holders: Dict[str, _Session] = dict()
+        self.__servers: List[asyncio.AbstractServer] = []
+        self.__sessions: Set[_Session] = set()
+        self.__handlers: Set[asyncio.Task] = set()
+        self.__operations: Dict[str, Callable[[_Session, Message], Awaitable[Any]]] = {
+            'acquire': self._acquire,
+            'release': self._release,
+            'acquire_many': self._acquire_many,
+            'release_many': self._release_many,
+            'locked': self._locked,
+        }
+
+    async def _acquire(self, session: _Session, request: Message) -> bool:
+        lock_id = request['lock']
+
+        if not await self.__table.acquire(lock_id, request.get('blocking', True), request.get('timeout')):
+            return False
+
+        self.__holders[lock_id] = session
+        session.held.add(lock_id)
+
+        return True
+
+    async def _release(self, session: _Session, request: Message):
+        lock_id = request['lock']
+
+        if self.__holders.get(lock_id) is not session:
+            raise ValueError(f'The lock "{lock_id}" is not held by this connection.')
+
+        del self.__holders[lock_id]
+        session.held.discard(lock_id)
+        await self.__table.release(lock_id)
+
+    async def _acquire_many(self, session: _Session, request: Message) -> bool:
+        lock_ids = request['locks']
+
+        if not await self.__table.acquire_many(lock_ids, request.get('blocking', True), request.get('timeout')):
+            return False
+
+        for lock_id in lock_ids:
+            self.__holders[lock_id] = session
+            session.held.add(lock_id)
+
+        return True
+
+    async def _release_many(self, session: _Session, request: Message):
+        lock_ids = request['locks']
+
+        for lock_id in lock_ids:
+            if self.__holders.get(lock_id) is not session:
+                raise ValueError(f'The lock "{lock_id}" is not held by this connection.')
+
+        for lock_id in lock_ids:
+            del self.__holders[lock_id]
+            session.held.discard(lock_id)
+
+        await self.__table.release_many(lock_ids)
+
+    async def _locked(self, session: _Session, request: Message) -> bool:
+        return request['lock'] in self.__holders
+
+    async def _dispatch(self, session: _Session, request: Message):
+        try:
+            operation = self.__operations.get(request.get('op'))
+
+            if operation is None:
+                raise ValueError(f'Unknown operation: {request.get("op")}')
+
+            result = await operation(session, request)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            session.send({'id': request.get('id'), 'ok': False, 'error': f'{type(e).__name__}: {e}'})
+        else:
+            session.send({'id': request.get('id'), 'ok': True, 'result': result})
+
+    async def handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        session = _Session(writer)
+        handler = asyncio.current_task()
+        self.__sessions.add(session)
+        self.__handlers.add(handler)
+
+        try:
+            while True:
+                line = await reader.readline()
+
+                if not line:
+                    break
+
+                # Each request runs on its own so that a waiting acquisition never blocks the others.
+                task = asyncio.ensure_future(self._dispatch(session, decode(line)))
+                session.tasks.add(task)
+                task.add_done_callback(session.tasks.discard)
+        except (ConnectionError, ValueError):
+            pass
+        finally:
+            for task in session.tasks:
+                task.cancel()
+
+            await asyncio.gather(*session.tasks, return_exceptions=True)
+
+            for lock_id in list(session.held):
+                del self.__holders[lock_id]
+                await self.__table.release(lock_id)
+
+            writer.close()
+            self.__sessions.discard(session)
+            self.__handlers.discard(handler)
+
+    async def start(self, address: Address) -> asyncio.AbstractServer:
+        """ Start listening on the address. """
+        if isinstance(address, str):
+            server = await asyncio.start_unix_server(self.handle, path=address)
+        else:
+            host, port = address
+            server = await asyncio.start_server(self.handle, host=host, port=port)
+
+        self.__servers.append(server)
+
+        return server
+
+    async def close(self):
+        """ Stop accepting connections, then close the open ones and wait for their handlers to finish. """
+        servers, self.__servers = self.__servers, []
+
+        for server in servers:
+            server.close()
+
+        # A closed connection ends its handler, which drops its requests and releases its locks.
+        for session in list(self.__sessions):
+            session.writer.close()
+
+        await asyncio.gather(*self.__handlers, return_exceptions=True)
+
+        for server in servers:
+            await server.wait_closed()
+
+    async def serve(self, address: Address):
+        """ Serve on the address until cancelled, then close. """
+        server = await self.start(address)
+
+        try:
+            await server.serve_forever()
+        finally:
+            await self.close()
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = ArgumentParser(prog='python -m readables.dlock.server', description='Run a lock server.')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=7420)
+    parser.add_argument('--unix', help='The path to the Unix socket to listen on instead of TCP')
+    args = parser.parse_args(argv)
+
+    try:
+        asyncio.run(LockServer().serve(args.unix or (args.host, args.port)))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
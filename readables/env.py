@@ -1,24 +1,43 @@
 """
 Status: Testing
 """
+import json
 import os
 import re
+import shutil
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from hashlib import blake2b
+from tempfile import NamedTemporaryFile
 from textwrap import wrap
-from typing import Optional, Any, TypeVar, Type, Callable, Generic, Literal, Dict, List, Iterable
+from threading import Event, Lock, Thread
+from types import MappingProxyType
+from typing import Optional, Any, TypeVar, Type, Callable, Generic, Literal, Dict, List, Iterable, Iterator, Mapping, \
+    TextIO, Tuple
 
 __all__ = [
     'RequiredEnvironmentVariable',
+    'InvalidEnvironmentVariables',
     'EnvironmentVariableManager',
+    'EnvironmentSnapshot',
+    'LayeredEnvironment',
+    'parse_env_file',
     'required_env',
     'optional_env',
     'required_flag',
     'optional_flag',
     'flag',
+    'snapshot',
+    'load_env_files',
+    'subscribe',
+    'watch',
     'manager',
+    'Exporter',
     'EnvFileExporter',
     'MarkdownExporter',
+    'JSONSchemaExporter',
+    'KubernetesConfigMapExporter',
+    'KubernetesSecretExporter',
 ]
 
 T = TypeVar('T')
@@ -33,6 +52,7 @@ class EnvironmentVariable(Generic[T]):
     required: bool
     help: Optional[str]
     default: Optional[Any] = None
+    convert: Optional[ValueConverter] = field(default=None, repr=False, compare=False)
 
 
 class RequiredEnvironmentVariable(RuntimeError):
@@ -43,22 +63,428 @@ class RequiredEnvironmentVariable(RuntimeError):
         return f'{self.args[0]}: {self.args[1]}'
 
 
+class InvalidEnvironmentVariables(RuntimeError):
+    """ Some environment variables are missing or invalid.
+
+        :param errors: The error of each variable, by name
+    """
+    def __init__(self, errors: Dict[str, Exception]):
+        super().__init__('\n'.join(
+            [f'{len(errors)} environment variable(s) missing or invalid:']
+            + [f'- {name}: {error}' for name, error in errors.items()]
+        ))
+        self.errors = errors
+
+
+class EnvironmentSnapshot:
+    """ The values of the declared environment variables, resolved all at once
+
+        The values are read as attributes (``snapshot.ALPHA``), or by name (``snapshot['ALPHA']``) for
+        the names which are not valid identifiers or which are taken by the snapshot itself (e.g.,
+        ``refresh``). A snapshot is immutable. Use :meth:`refresh` to resolve the variables again.
+    """
+    __slots__ = ('_manager', '_values')
+
+    def __init__(self, manager: 'EnvironmentVariableManager', values: Dict[str, Any]):
+        object.__setattr__(self, '_manager', manager)
+        object.__setattr__(self, '_values', MappingProxyType(values))
+
+        for name in type(self).__slots__:
+            object.__setattr__(self, name, values[name])
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f'{type(self).__name__} is immutable.')
+
+    def __delattr__(self, name):
+        raise AttributeError(f'{type(self).__name__} is immutable.')
+
+    def __getitem__(self, name: str) -> Any:
+        return self._values[name]
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._values
+
+    def __repr__(self):
+        return f'{type(self).__name__}({", ".join(f"{k}={v!r}" for k, v in self._values.items())})'
+
+    def as_dict(self) -> Mapping[str, Any]:
+        return self._values
+
+    def refresh(self) -> 'EnvironmentSnapshot':
+        """ Resolve the variables again. See :meth:`EnvironmentVariableManager.refresh`. """
+        return self._manager.refresh()
+
+
+# An assignment, with an optional "export" and an optional trailing comment. A value is either quoted
+# (single quotes: as is, double quotes: with escape sequences, both may span lines) or bare.
+_ENV_FILE_ASSIGNMENT = re.compile(
+    rb"""^[ \t]*(?:export[ \t]+)?([A-Za-z_][A-Za-z0-9_.]*)[ \t]*=[ \t]*"""
+    rb"""(?:'([^']*)'|"((?:[^"\\]|\\.)*)"|([^\r\n]*?))"""
+    rb"""(?:[ \t]+\#[^\r\n]*)?[ \t]*\r?$""",
+    re.MULTILINE | re.DOTALL,
+)
+_ENV_FILE_ESCAPE = re.compile(r'\\(.)', re.DOTALL)
+_ENV_FILE_ESCAPES = {'n': '\n', 'r': '\r', 't': '\t'}
+# A bare value with any of these would not be read back as is.
+_ENV_FILE_UNSAFE = re.compile(r'[\s#"\'\\]')
+_ENV_FILE_QUOTED = {'\\': '\\\\', '"': '\\"', '\n': '\\n', '\r': '\\r', '\t': '\\t'}
+
+
+def _env_file_value(value: str) -> str:
+    """ The value as written in an env file, double-quoted and escaped unless it is safe to leave bare """
+    if not _ENV_FILE_UNSAFE.search(value):
+        return value
+
+    return '"' + ''.join(_ENV_FILE_QUOTED.get(c, c) for c in value) + '"'
+
+
+def parse_env_file(path: str) -> Dict[str, str]:
+    """ Read the assignments of an env file, e.g., as written by :class:`EnvFileExporter`.
+
+        The comments, the blank lines and the lines which are not assignments are skipped. When a
+        variable is assigned more than once, the last assignment wins.
+    """
+    with open(path, 'rb') as f:
+        content = f.read()
+
+    variables: Dict[str, str] = dict()
+
+    for match in _ENV_FILE_ASSIGNMENT.finditer(content):
+        name, single_quoted, double_quoted, bare = match.groups()
+
+        if single_quoted is not None:
+            value = single_quoted.decode()
+        elif double_quoted is not None:
+            value = double_quoted.decode()
+
+            if '\\' in value:
+                value = _ENV_FILE_ESCAPE.sub(lambda m: _ENV_FILE_ESCAPES.get(m[1], m[1]), value)
+        else:
+            value = bare.decode()
+
+        variables[name.decode()] = value
+
+    return variables
+
+
+class LayeredEnvironment(Mapping[str, str]):
+    """ The process environment layered with env files, read-only
+
+        The files are read in order, so a file overrides the files before it, and only read again on
+        :meth:`reload`. A missing file is skipped (e.g., an optional ``.env.local``). The process
+        environment is read live and, as with the usual dotenv loaders, takes precedence over the files
+        unless ``override`` is set.
+
+        The process environment itself is never changed.
+
+        :param paths: The paths of the env files, from the lowest to the highest priority
+        :param bool override: Whether the files take precedence over the process environment
+    """
+    def __init__(self, paths: Iterable[str], *, override: bool = False):
+        self.paths: Tuple[str, ...] = tuple(paths)
+        self.override = override
+        self.files: Dict[str, str] = dict()
+        self.__stats: List[Optional[Tuple[int, int, int]]] = [None] * len(self.paths)
+        self.__layers: List[Dict[str, str]] = [dict() for _ in self.paths]
+
+        self.reload()
+
+    @staticmethod
+    def _stat(path: str) -> Optional[Tuple[int, int, int]]:
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def reload(self) -> bool:
+        """ Read the files which changed since the last time, by their modification time and size.
+
+            :return: Whether any file changed
+        """
+        changed = False
+
+        for index, path in enumerate(self.paths):
+            stat = self._stat(path)
+
+            if stat == self.__stats[index]:
+                continue
+
+            try:
+                self.__layers[index] = parse_env_file(path) if stat is not None else dict()
+            except FileNotFoundError:
+                stat, self.__layers[index] = None, dict()
+
+            self.__stats[index] = stat
+            changed = True
+
+        if changed:
+            files: Dict[str, str] = dict()
+
+            for layer in self.__layers:
+                files.update(layer)
+
+            self.files = files
+
+        return changed
+
+    def __getitem__(self, name: str) -> str:
+        upper, lower = (self.files, os.environ) if self.override else (os.environ, self.files)
+
+        if name in upper:
+            return upper[name]
+
+        return lower[name]
+
+    def get(self, name: str, default: Any = None) -> Any:
+        upper, lower = (self.files, os.environ) if self.override else (os.environ, self.files)
+        value = upper.get(name)
+
+        return value if value is not None else lower.get(name, default)
+
+    def __contains__(self, name: object) -> bool:
+        return name in self.files or name in os.environ
+
+    def __iter__(self):
+        yield from self.files
+        yield from (name for name in os.environ if name not in self.files)
+
+    def __len__(self) -> int:
+        return len(self.files) + sum(1 for name in os.environ if name not in self.files)
+
+
+Changes = Dict[str, Tuple[Any, Any]]  # The old and new values of the changed variables, by name
+
+
+class _EnvironmentWatcher(Thread):
+    """ Poll the sources of a manager every ``interval`` seconds until stopped. """
+    def __init__(self, manager: 'EnvironmentVariableManager', interval: float):
+        super().__init__(name='readables-env-watcher', daemon=True)
+        self.__manager = manager
+        self.__interval = interval
+        self.__stopped = Event()
+
+    def run(self):
+        while not self.__stopped.wait(self.__interval):
+            try:
+                self.__manager.poll()
+            except Exception:
+                # Keep the last valid values, and try again on the next tick.
+                continue
+
+    def stop(self):
+        self.__stopped.set()
+
+        if self.is_alive():
+            self.join()
+
+
 class EnvironmentVariableManager:
     """ Manage environment variables. """
 
     def __init__(self):
         self._variables: dict[str, EnvironmentVariable] = dict()
+        self._environ: Mapping[str, str] = os.environ
+        self._snapshot: Optional[EnvironmentSnapshot] = None
+        self._snapshot_types: Dict[Tuple[str, ...], Type[EnvironmentSnapshot]] = dict()
+        self._snapshot_variables: Dict[str, EnvironmentVariable] = dict()  # The declarations behind the snapshot
+        self._raw_values: Dict[str, Optional[str]] = dict()  # The raw values behind the snapshot
+        self._subscribers: List[Callable[[Changes], None]] = []
+        self._watcher: Optional[_EnvironmentWatcher] = None
+        self._access_lock = Lock()
 
     @property
     def variables(self) -> dict[str, EnvironmentVariable]:
         return self._variables
 
+    @property
+    def environ(self) -> Mapping[str, str]:
+        """ The source of the values: the process environment, or a :class:`LayeredEnvironment` """
+        return self._environ
+
+    def load_env_files(self, *paths: str, override: bool = False) -> 'LayeredEnvironment':
+        """ Read the variables from the env files too, without changing the process environment.
+
+            The variables declared from then on, and the next snapshot, are resolved from the files
+            layered with the process environment. See :class:`LayeredEnvironment`.
+        """
+        self._environ = LayeredEnvironment(paths, override=override)
+        self._snapshot = None
+        self._raw_values.clear()
+
+        return self._environ
+
     @staticmethod
     def _parse_value(raw_value: Optional[str], kind: Type[T]) -> T:
         if raw_value is None:
             return None
         return kind(raw_value)
 
+    def _resolve(self, variable: EnvironmentVariable, raw_value: Optional[str]) -> Any:
+        """ Convert the raw value of the declared variable (``None`` when undefined). """
+        convert = variable.convert or variable.interpreted_type
+
+        if variable.required:
+            if raw_value is None:
+                if os.getenv('READABLES_ENV_ALLOW_UNSET_REQUIRED') == 'true':
+                    return ''
+                else:
+                    raise RequiredEnvironmentVariable(variable.name,
+                                                      variable.help or "Your need to set this environment variable.")
+
+            return self._parse_value(raw_value, convert)
+
+        read_value = raw_value if raw_value is not None else variable.default
+        value = self._parse_value(read_value, convert) if read_value is not None else None
+
+        return (value or False) if variable.variable_type == 'flag' else value
+
+    def snapshot(self) -> EnvironmentSnapshot:
+        """ Get the values of all the declared variables, resolved once.
+
+            The snapshot is resolved again when the declared variables have changed since then, or on
+            :meth:`refresh`.
+
+            :raises InvalidEnvironmentVariables: with every missing or invalid variable at once
+        """
+        snapshot = self._snapshot
+
+        # As the declarations are kept as they are, the comparison is mostly the one of their identities.
+        if snapshot is None or self._snapshot_variables != self._variables:
+            snapshot = self.refresh()
+
+        return snapshot
+
+    def refresh(self) -> EnvironmentSnapshot:
+        """ Resolve all the declared variables again, e.g., after the environment has changed.
+
+            :raises InvalidEnvironmentVariables: with every missing or invalid variable at once
+        """
+        with self._access_lock:
+            variables = dict(self._variables)
+            snapshot = self._update(dict(), {name: self._environ.get(name) for name in variables})
+            self._snapshot_variables = variables
+
+            return snapshot
+        # End of access to the snapshot
+
+    def _update(self, values: Dict[str, Any], raw_values: Dict[str, Optional[str]]) -> EnvironmentSnapshot:
+        """ Resolve the variables of the raw values, and make the snapshot of them with the other values. """
+        errors: Dict[str, Exception] = dict()
+
+        for name, raw_value in raw_values.items():
+            try:
+                values[name] = self._resolve(self._variables[name], raw_value)
+            except Exception as e:
+                errors[name] = e
+
+        if errors:
+            raise InvalidEnvironmentVariables(errors)
+
+        self._raw_values.update(raw_values)
+
+        names = tuple(values)
+        snapshot_type = self._snapshot_types.get(names)
+
+        if snapshot_type is None:
+            snapshot_type = self._snapshot_types[names] = type(
+                'EnvironmentSnapshot',
+                (EnvironmentSnapshot,),
+                {'__slots__': tuple(
+                    name
+                    for name in names
+                    if name.isidentifier() and not name.startswith('_') and not hasattr(EnvironmentSnapshot, name)
+                )},
+            )
+
+        self._snapshot = snapshot_type(self, values)
+
+        return self._snapshot
+
+    def poll(self) -> Changes:
+        """ Check the sources for changes, and resolve the changed variables only.
+
+            The env files are only read again when their modification time or size changed, and the
+            variables whose raw value is the same are not converted again. The subscribers are notified
+            of the variables whose value changed.
+
+            :return: The old and new values of the changed variables, by name
+            :raises InvalidEnvironmentVariables: if a changed variable is missing or invalid, in which
+                                                 case the snapshot is left as it was
+        """
+        self.snapshot()
+
+        with self._access_lock:
+            if isinstance(self._environ, LayeredEnvironment):
+                self._environ.reload()
+
+            raw_values = {
+                name: raw_value
+                for name, raw_value in ((name, self._environ.get(name)) for name in self._raw_values)
+                if raw_value != self._raw_values[name]
+            }
+
+            if not raw_values:
+                return dict()
+
+            old_values = self._snapshot.as_dict()
+            new_values = self._update(dict(old_values), raw_values).as_dict()
+            subscribers = list(self._subscribers)
+        # End of access to the snapshot
+
+        changes = {
+            name: (old_values[name], new_values[name])
+            for name in raw_values
+            if old_values[name] != new_values[name]
+        }
+
+        if changes:
+            for subscriber in subscribers:
+                subscriber(changes)
+
+        return changes
+
+    def subscribe(self, callback: Callable[[Changes], None]) -> Callable[[], None]:
+        """ Get notified of the changes found by :meth:`poll` (or :meth:`watch`).
+
+            The callback gets the old and new values of the changed variables, by name, from the thread
+            polling the sources, so it must be quick and thread-safe.
+
+            :return: The function to unsubscribe
+        """
+        with self._access_lock:
+            self._subscribers.append(callback)
+        # End of access to the subscribers
+
+        def unsubscribe():
+            with self._access_lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+            # End of access to the subscribers
+
+        return unsubscribe
+
+    def watch(self, interval: float = 1.0):
+        """ Poll the sources every ``interval`` seconds in a background thread, until :meth:`unwatch`.
+
+            Only the modification time and size of the env files and the raw values of the declared
+            variables are checked on each tick. When a changed variable is invalid, the last valid
+            values are kept until it is fixed.
+        """
+        self.unwatch()
+        self.snapshot()
+
+        self._watcher = _EnvironmentWatcher(self, interval)
+        self._watcher.start()
+
+    def unwatch(self):
+        """ Stop polling the sources in the background. """
+        watcher, self._watcher = self._watcher, None
+
+        if watcher is not None:
+            watcher.stop()
+
     def required_env(self, env: str,
                      *,
                      kind: Type[T] = str,
@@ -77,15 +503,16 @@ class EnvironmentVariableManager:
                 required=True,
                 help=help,
                 default=None,
+                convert=convert,
             )
 
-        if env not in os.environ:
+        if env not in self._environ:
             if os.getenv('READABLES_ENV_ALLOW_UNSET_REQUIRED') == 'true':
                 return ''
             else:
                 raise RequiredEnvironmentVariable(env, help or "Your need to set this environment variable.")
 
-        return self._parse_value(os.environ[env], convert or kind)
+        return self._parse_value(self._environ[env], convert or kind)
 
     def optional_env(self, env: str,
                      default: Any = None,
@@ -106,9 +533,10 @@ class EnvironmentVariableManager:
                 required=False,
                 help=help,
                 default=default,
+                convert=convert,
             )
 
-        read_value = os.getenv(env, default)
+        read_value = self._environ.get(env, default)
         return self._parse_value(read_value, convert or kind) if read_value is not None else None
 
     def _parse_bool_value(self, raw_value: Optional[str]) -> T:
@@ -142,30 +570,165 @@ class EnvironmentVariableManager:
     flag = optional_flag
 
 
+ExportMode = Literal["all", "minimal"]
+
+
 class Exporter(ABC):
+    """ Export the declared variables, e.g., :attr:`EnvironmentVariableManager.variables`
+
+        The document is generated as a stream of chunks by :meth:`iter_export`, so that it can be
+        written out without building it whole in memory (see :meth:`write` and :meth:`write_file`).
+
+        With the ``minimal`` mode, only the variables which must be set are set: the optional ones are
+        commented out, or left out where the format has no comments. With the ``all`` mode, every
+        variable is set, the optional ones to their default value, except the optional variables without
+        a default value, which are left unset the same way. Without a mode, the exporter's
+        :attr:`DEFAULT_MODE` is used.
+    """
+    DEFAULT_MODE: ExportMode = 'minimal'
+
     @classmethod
     @abstractmethod
-    def export(cls,
-               variables: Dict[str, EnvironmentVariable],
-               *,
-               mode: Literal["all", "minimal"] = 'minimal'):
+    def iter_export(cls,
+                    variables: Dict[str, EnvironmentVariable],
+                    *,
+                    mode: Optional[ExportMode] = None,
+                    **options) -> Iterator[str]:
         raise NotImplementedError()
 
-
-class EnvFileExporter(Exporter):
     @classmethod
     def export(cls,
                variables: Dict[str, EnvironmentVariable],
                *,
-               mode: Literal["all", "minimal"] = 'minimal'):
-        blocks: List[str] = []
+               mode: Optional[ExportMode] = None,
+               **options) -> str:
+        return ''.join(cls.iter_export(variables, mode=mode, **options))
 
-        for env_name, env in variables.items():
+    @classmethod
+    def write(cls,
+              variables: Dict[str, EnvironmentVariable],
+              stream: TextIO,
+              *,
+              mode: Optional[ExportMode] = None,
+              **options):
+        """ Write the document to a file object, chunk by chunk. """
+        for chunk in cls.iter_export(variables, mode=mode, **options):
+            stream.write(chunk)
+
+    @classmethod
+    def write_file(cls,
+                   variables: Dict[str, EnvironmentVariable],
+                   path: str,
+                   *,
+                   mode: Optional[ExportMode] = None,
+                   **options) -> bool:
+        """ Write the document to a file, unless the file already has the same content.
+
+            The file is left untouched (including its modification time) when its content hash is the
+            same, so that the tools watching it do not rebuild, and replaced atomically otherwise.
+
+            :return: Whether the file has been written
+        """
+        digest = blake2b()
+
+        # A unique temporary file in the same directory, so that concurrent writers do not collide and
+        # the file can be replaced atomically.
+        with NamedTemporaryFile('w', encoding='utf-8', newline='', dir=os.path.dirname(path) or None,
+                                prefix=f'.{os.path.basename(path)}.', suffix='.tmp', delete=False) as f:
+            temporary_path = f.name
+
+            try:
+                for chunk in cls.iter_export(variables, mode=mode, **options):
+                    f.write(chunk)
+                    digest.update(chunk.encode('utf-8'))
+            except BaseException:
+                f.close()
+                os.remove(temporary_path)
+                raise
+
+        try:
+            if _file_digest(path) == digest.digest():
+                os.remove(temporary_path)
+                return False
+
+            # The temporary file is only readable by its owner, so keep the permissions of the file, or give
+            # a new file the permissions of any file created by this process.
+            if os.path.exists(path):
+                shutil.copymode(path, temporary_path)
+            else:
+                os.chmod(temporary_path, 0o666 & ~_umask())
+
+            os.replace(temporary_path, path)
+        except BaseException:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            raise
+
+        return True
+
+    @staticmethod
+    def _type_name(env: EnvironmentVariable) -> str:
+        return f'{env.interpreted_type.__module__}.{env.interpreted_type.__qualname__}'
+
+    @staticmethod
+    def _placeholder(env: EnvironmentVariable) -> Optional[str]:
+        """ The value to export for the variable: empty if it is required, else its default value.
+
+            :return: ``None`` for an optional variable without a default value, which must stay unset
+        """
+        if env.required:
+            return ''
+        elif env.variable_type == 'flag':
+            return 'false'
+        else:
+            return str(env.default) if env.default is not None else None
+
+
+def _umask() -> int:
+    """ The file mode creation mask of the process """
+    # Linux reports it as is, while os.umask can only read it by changing it, for every thread at once.
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith('Umask:'):
+                    return int(line.split()[1], 8)
+    except OSError:
+        pass
+
+    mask = os.umask(0o022)
+    os.umask(mask)
+
+    return mask
+
+
+def _file_digest(path: str) -> Optional[bytes]:
+    digest = blake2b()
+
+    try:
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 16), b''):
+                digest.update(block)
+    except FileNotFoundError:
+        return None
+
+    return digest.digest()
+
+
+class EnvFileExporter(Exporter):
+    @classmethod
+    def iter_export(cls,
+                    variables: Dict[str, EnvironmentVariable],
+                    *,
+                    mode: Optional[ExportMode] = None,
+                    **options) -> Iterator[str]:
+        mode = mode or cls.DEFAULT_MODE
+
+        for index, (env_name, env) in enumerate(variables.items()):
             lines: List[str] = [
                 f"[{'REQUIRED' if env.required else 'OPTIONAL'} {env.variable_type}]",
                 f"{env_name}",
                 f"",
-                f"> Interpreted as {env.interpreted_type.__module__}.{env.interpreted_type.__qualname__}",
+                f"> Interpreted as {cls._type_name(env)}",
                 f"",
             ]
 
@@ -177,50 +740,168 @@ class EnvFileExporter(Exporter):
                         lines.append(new_line)
                 lines.append('')
 
-            if env.variable_type == 'flag':
-                placeholder = '' if env.required else 'false'
-            else:
-                placeholder = '' if env.required else (env.default if env.default else '')
-
             # Add the prefix to each leading line.
             lines = [f'# {l}' for l in lines]
 
-            # Add the assignment line.
-            lines.append(
-                f'{"#" if not env.required else ""}{env_name}={placeholder if placeholder is not None else ""}'
-            )
+            # Add the assignment line, commented out if the variable does not need to be set, or if it
+            # has no value to be set to.
+            placeholder = cls._placeholder(env)
+            commented = (not env.required and mode == 'minimal') or placeholder is None
+            lines.append(f'{"#" if commented else ""}{env_name}={_env_file_value(placeholder or "")}')
 
-            # Add the lines to the block collection.
-            blocks.append('\n'.join(lines))
+            yield ('\n\n' if index else '') + '\n'.join(lines)
 
         # end loop on the variable list.
 
-        return '\n\n'.join(blocks)
-
 
 class MarkdownExporter(Exporter):
+    """ Document the variables, with a table per variable, followed by its help
+
+        As a documentation is meant to be complete, every variable is exported by default.
+    """
+    DEFAULT_MODE: ExportMode = 'all'
+
     @classmethod
-    def export(cls,
-               variables: Dict[str, EnvironmentVariable],
-               *,
-               mode: Literal["all", "minimal"] = 'minimal'):
-        blocks: List[str] = []
+    def iter_export(cls,
+                    variables: Dict[str, EnvironmentVariable],
+                    *,
+                    mode: Optional[ExportMode] = None,
+                    **options) -> Iterator[str]:
+        mode = mode or cls.DEFAULT_MODE
+
+        index = 0
 
         for env_name, env in variables.items():
+            if not env.required and mode == 'minimal':
+                continue
+
             block: List[str] = [
                 f"# {env_name}",
+                f"",
                 f"| Variable Type | Interpreted as | Required? | Default Value |",
-                f"| ------------- | -------------- | --------- | ------------- |"
-                f"| {env.variable_type} | {env.interpreted_type.__module__}.{env.interpreted_type.__qualname__} | '**Yes**' if env.required else 'NO' | `{env.default}` |",
+                f"| ------------- | -------------- | --------- | ------------- |",
+                f"| {env.variable_type} | {cls._type_name(env)} | {'**Yes**' if env.required else 'No'} "
+                f"| `{env.default}` |",
             ]
 
             if env.help is not None:
-                block.append(f"{env.help}")
                 block.append(f"")
+                block.append(f"{env.help}")
+
+            yield ('\n\n' if index else '') + '\n'.join(block)
+            index += 1
+
+
+class JSONSchemaExporter(Exporter):
+    """ Describe the variables as a JSON Schema of an object of strings, e.g., to validate a configuration
+
+        A flag is restricted to the values :meth:`EnvironmentVariableManager.optional_flag` accepts, in
+        lower case.
+        The interpreted type of a variable is kept in the ``x-interpreted-as`` annotation.
+    """
+    FLAG_VALUES = ('1', 'true', 'yes', '0', 'false', 'no')
+
+    @classmethod
+    def iter_export(cls,
+                    variables: Dict[str, EnvironmentVariable],
+                    *,
+                    mode: Optional[ExportMode] = None,
+                    title: Optional[str] = None,
+                    **options) -> Iterator[str]:
+        mode = mode or cls.DEFAULT_MODE
+
+        yield '{\n  "$schema": "https://json-schema.org/draft/2020-12/schema",\n'
+
+        if title is not None:
+            yield f'  "title": {json.dumps(title)},\n'
+
+        yield '  "type": "object",\n  "properties": {'
+
+        required: List[str] = []
+        separator = ''
+
+        for env_name, env in variables.items():
+            if not env.required and mode == 'minimal':
+                continue
+
+            schema: Dict[str, Any] = {'type': 'string'}
+
+            if env.variable_type == 'flag':
+                schema['enum'] = list(cls.FLAG_VALUES)
+
+            if env.help is not None:
+                schema['description'] = env.help
+
+            if not env.required and cls._placeholder(env) is not None:
+                schema['default'] = cls._placeholder(env)
+
+            schema['x-interpreted-as'] = cls._type_name(env)
+
+            yield f'{separator}\n    {json.dumps(env_name)}: {json.dumps(schema)}'
+            separator = ','
+
+            if env.required:
+                required.append(env_name)
+
+        yield '\n  }' if separator else '}'
+        yield f',\n  "required": {json.dumps(required)}\n}}\n'
+
+
+class _KubernetesExporter(Exporter):
+    """ Export the variables as the data of a Kubernetes manifest, with their help as comments """
+    KIND: str
+    DATA_FIELD: str
+    HEADER: str = ''
+
+    @classmethod
+    def iter_export(cls,
+                    variables: Dict[str, EnvironmentVariable],
+                    *,
+                    mode: Optional[ExportMode] = None,
+                    name: str = 'environment',
+                    namespace: Optional[str] = None,
+                    **options) -> Iterator[str]:
+        mode = mode or cls.DEFAULT_MODE
+
+        yield f'apiVersion: v1\nkind: {cls.KIND}\nmetadata:\n  name: {json.dumps(name)}\n'
+
+        if namespace is not None:
+            yield f'  namespace: {json.dumps(namespace)}\n'
+
+        yield f'{cls.HEADER}{cls.DATA_FIELD}:'
+
+        empty = True
+
+        for env_name, env in variables.items():
+            placeholder = cls._placeholder(env)
+
+            if (not env.required and mode == 'minimal') or placeholder is None:
+                continue
+
+            lines: List[str] = []
+
+            if env.help is not None:
+                lines.extend(f'  # {line}'.rstrip() for line in env.help.split('\n'))
+
+            lines.append(f'  {env_name}: {json.dumps(placeholder)}')
+
+            yield '\n' + '\n'.join(lines)
+            empty = False
+
+        yield ' {}\n' if empty else '\n'
+
+
+class KubernetesConfigMapExporter(_KubernetesExporter):
+    """ Export the variables as a Kubernetes ConfigMap, e.g., to use with ``envFrom`` """
+    KIND = 'ConfigMap'
+    DATA_FIELD = 'data'
 
-            blocks.append('\n'.join(block))
 
-        return '\n\n'.join(blocks)
+class KubernetesSecretExporter(_KubernetesExporter):
+    """ Export the variables as a Kubernetes Secret, with plain values (``stringData``) """
+    KIND = 'Secret'
+    DATA_FIELD = 'stringData'
+    HEADER = 'type: Opaque\n'
 
 
 manager = EnvironmentVariableManager()
@@ -229,3 +910,7 @@ optional_env = manager.optional_env
 required_flag = manager.required_flag
 optional_flag = manager.optional_flag
 flag = manager.flag
+snapshot = manager.snapshot
+load_env_files = manager.load_env_files
+subscribe = manager.subscribe
+watch = manager.watch
@@ -0,0 +1,355 @@
+"""
+Static scanner of the environment variables
+
+Find the variables declared with :func:`readables.env.required_env`, :func:`readables.env.optional_env`
+and the flags in a source tree, without importing it, e.g., to export them with
+:class:`readables.env.EnvFileExporter`::
+
+    from readables.env import EnvFileExporter
+    from readables.env_scanner import EnvironmentVariableScanner
+
+    variables = EnvironmentVariableScanner(cache_path='.env-scan.json').scan('your_app')
+    output = EnvFileExporter.export(variables)
+
+Only the calls whose name (the first argument) is a string literal are found, either to a function
+imported from :mod:`readables.env` or as an attribute of :mod:`readables.env` or of its default manager,
+e.g., ``env.flag(...)`` or ``env.manager.required_env(...)``. The help, the default
+value and the variable type are read when they are literals too. A ``kind`` is recorded by name, as
+the code is never imported.
+"""
+import ast
+import builtins
+import json
+import os
+import re
+from bisect import bisect_left
+from concurrent.futures import ProcessPoolExecutor
+from hashlib import blake2b
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from readables.env import EnvironmentVariable
+
+__all__ = [
+    'EnvironmentVariableScanner',
+    'scan',
+]
+
+_CACHE_VERSION = 2
+
+# The declaring functions, with the type of variable and whether it is required
+_FUNCTIONS: Dict[str, Tuple[str, bool]] = {
+    'required_env': ('variable', True),
+    'optional_env': ('variable', False),
+    'required_flag': ('flag', True),
+    'optional_flag': ('flag', False),
+    'flag': ('flag', False),
+}
+
+# A file without anything like a call to a declaring function is not parsed.
+_CALL = re.compile(rb'(?:_env|flag)\s*\(')
+_ALIAS = re.compile(rb'\b(?:required_env|optional_env|required_flag|optional_flag|flag)\s+as\s+(\w+)')
+
+# The owners of the declaring functions, as attributes
+_MANAGERS = frozenset({'readables.env', 'readables.env.manager'})
+
+_EXCLUDED_DIRECTORIES = frozenset({'.git', '.hg', '.tox', '.nox', '.venv', 'venv', '__pycache__', 'node_modules'})
+
+# A variable found by the scan, as it is cached and sent across processes:
+# (name, variable type, dotted name of the kind, required, help, default)
+_Record = Tuple[str, str, str, bool, Optional[str], Any]
+
+
+def _literal(node: Optional[ast.AST]) -> Any:
+    if node is None:
+        return None
+
+    try:
+        return ast.literal_eval(node)
+    except (ValueError, TypeError, SyntaxError, MemoryError, RecursionError):
+        return None
+
+
+def _dotted_name(node: ast.AST) -> Optional[str]:
+    if isinstance(node, ast.Name):
+        return node.id
+    elif isinstance(node, ast.Attribute):
+        owner = _dotted_name(node.value)
+        return None if owner is None else f'{owner}.{node.attr}'
+    else:
+        return None
+
+
+def _scan_source(module: str, source: bytes) -> List[_Record]:
+    """ Find the declarations in the source of a module. A source which does not parse has none. """
+    aliases = _ALIAS.findall(source)
+    call = re.compile(rb'(?:_env|flag|' + b'|'.join(aliases) + rb')\s*\(') if aliases else _CALL
+
+    if not call.search(source):
+        return []
+
+    try:
+        tree = ast.parse(source)
+    except (SyntaxError, ValueError):
+        return []
+
+    # Only the nodes spanning a line which may declare a variable or import a name are visited, as
+    # walking the whole tree costs several times as much as parsing it.
+    lines = [
+        number
+        for number, line in enumerate(source.split(b'\n'), 1)
+        if b'import' in line or call.search(line)
+    ]
+
+    imports: Dict[str, str] = dict()  # The dotted name of each imported name
+    functions: Dict[str, str] = dict()  # The declaring functions imported from readables.env, by local name
+    calls: List[ast.Call] = []
+    nodes: List[ast.AST] = list(tree.body)
+
+    while nodes:
+        node = nodes.pop()
+        first_line = getattr(node, 'lineno', None)
+
+        if first_line is not None:
+            index = bisect_left(lines, first_line)
+
+            if index == len(lines) or lines[index] > (node.end_lineno or first_line):
+                continue
+
+        if isinstance(node, ast.Import):
+            for alias in node.names:
+                if alias.asname:
+                    imports[alias.asname] = alias.name
+                else:
+                    head = alias.name.split('.')[0]
+                    imports[head] = head
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            for alias in node.names:
+                if node.module == 'readables.env' and alias.name == '*':
+                    functions.update((name, name) for name in _FUNCTIONS)
+                elif node.module == 'readables.env' and alias.name in _FUNCTIONS:
+                    functions[alias.asname or alias.name] = alias.name
+
+                imports[alias.asname or alias.name] = f'{node.module}.{alias.name}'
+        elif isinstance(node, ast.Call) and node.args:
+            calls.append(node)
+
+        nodes.extend(ast.iter_child_nodes(node))
+
+    def resolve(node: ast.AST) -> Optional[str]:
+        """ The dotted name of an imported name, or of an attribute of an imported name """
+        name = _dotted_name(node)
+
+        if name is None:
+            return None
+
+        head, _, tail = name.partition('.')
+
+        if head not in imports:
+            return None
+
+        return f'{imports[head]}.{tail}' if tail else imports[head]
+
+    def qualify(node: ast.AST) -> str:
+        name = _dotted_name(node)
+
+        if name is None:
+            return 'builtins.str'
+
+        resolved = resolve(node)
+
+        if resolved is not None:
+            return resolved
+        elif '.' not in name and isinstance(getattr(builtins, name, None), type):
+            return f'builtins.{name}'
+        else:
+            return f'{module}.{name}'
+
+    records: List[Tuple[int, int, _Record]] = []
+
+    for node in calls:
+        if isinstance(node.func, ast.Name):
+            function = functions.get(node.func.id)
+        elif isinstance(node.func, ast.Attribute) and node.func.attr in _FUNCTIONS:
+            # Only the functions of readables.env and the methods of its default manager
+            function = node.func.attr if resolve(node.func.value) in _MANAGERS else None
+        else:
+            function = None
+
+        if function is None:
+            continue
+
+        name = node.args[0]
+
+        if not isinstance(name, ast.Constant) or not isinstance(name.value, str):
+            continue
+
+        variable_type, required = _FUNCTIONS[function]
+        keywords = {keyword.arg: keyword.value for keyword in node.keywords if keyword.arg}
+        help = _literal(keywords.get('help'))
+        default = None if required or variable_type == 'flag' else _literal(
+            node.args[1] if len(node.args) > 1 else keywords.get('default')
+        )
+
+        records.append((node.lineno, node.col_offset, (
+            name.value,
+            _literal(keywords.get('variable_type')) or variable_type,
+            qualify(keywords['kind']) if 'kind' in keywords else 'builtins.str',
+            required,
+            help if isinstance(help, str) else None,
+            default if isinstance(default, (str, int, float, bool)) else None,  # As it is cached as JSON
+        )))
+
+    # The nodes are not visited in order, so restore the order of the source.
+    return [record for _, _, record in sorted(records, key=lambda item: item[:2])]
+
+
+def _scan_sources(sources: List[Tuple[str, bytes]]) -> List[List[_Record]]:
+    return [_scan_source(module, source) for module, source in sources]
+
+
+class EnvironmentVariableScanner:
+    """
+    Static scanner of the environment variables
+
+    The files are parsed on a pool of up to ``max_workers`` processes when there are enough of them
+    (``1`` to always parse them in this process).
+
+    With a ``cache_path``, the result of each file is kept in a JSON file along with the file's
+    modification time, size and hash. A file whose modification time and size are unchanged is not
+    even read, and a file whose content hash is unchanged (e.g., after a fresh checkout) is not parsed
+    again. The cache is rewritten only when it changed.
+
+    :param str cache_path: The path of the cache file
+    :param int max_workers: The number of processes parsing the files
+    """
+    CHUNK_SIZE = 32  # The number of files sent to a process at once
+
+    def __init__(self, cache_path: Optional[str] = None, max_workers: Optional[int] = None):
+        self.__cache_path = cache_path
+        self.__max_workers = max_workers or os.cpu_count() or 1
+        self.__types: Dict[str, Type] = dict()
+
+    def _files(self, paths: Iterable[str]) -> Iterator[Tuple[str, str]]:
+        """ List the Python files with their module name, in a stable order. """
+        for path in paths:
+            if os.path.isfile(path):
+                yield path, os.path.splitext(os.path.basename(path))[0]
+                continue
+
+            # The files are listed (and cached) by their path as given, e.g., relative to the working directory.
+            parent = os.path.dirname(os.path.abspath(path))
+
+            for directory, directories, files in os.walk(path):
+                directories[:] = sorted(d for d in directories if d not in _EXCLUDED_DIRECTORIES)
+                package = os.path.relpath(os.path.abspath(directory), parent).replace(os.sep, '.')
+
+                for file in sorted(files):
+                    if file.endswith('.py'):
+                        module = package if file == '__init__.py' else f'{package}.{file[:-3]}'
+                        yield os.path.join(directory, file), module
+
+    def _load_cache(self) -> Dict[str, Dict[str, Any]]:
+        if self.__cache_path is None:
+            return dict()
+
+        try:
+            with open(self.__cache_path) as f:
+                cache = json.load(f)
+        except (FileNotFoundError, ValueError):
+            return dict()
+
+        return cache.get('files', dict()) if cache.get('version') == _CACHE_VERSION else dict()
+
+    def _save_cache(self, entries: Dict[str, Dict[str, Any]]):
+        temporary_path = f'{self.__cache_path}.{os.getpid()}.tmp'
+
+        with open(temporary_path, 'w') as f:
+            json.dump({'version': _CACHE_VERSION, 'files': entries}, f)
+
+        os.replace(temporary_path, self.__cache_path)
+
+    def _parse(self, sources: List[Tuple[str, bytes]]) -> List[List[_Record]]:
+        if self.__max_workers <= 1 or len(sources) < 2 * self.CHUNK_SIZE:
+            return _scan_sources(sources)
+
+        chunks = [sources[i:i + self.CHUNK_SIZE] for i in range(0, len(sources), self.CHUNK_SIZE)]
+
+        with ProcessPoolExecutor(max_workers=min(self.__max_workers, len(chunks))) as executor:
+            return [records for chunk in executor.map(_scan_sources, chunks) for records in chunk]
+
+    def _type(self, dotted_name: str) -> Type:
+        """ The type of a kind, by name: a builtin type, or a stand-in with the same name. """
+        kind = self.__types.get(dotted_name)
+
+        if kind is None:
+            module, _, qualname = dotted_name.rpartition('.')
+
+            if module == 'builtins' and isinstance(getattr(builtins, qualname, None), type):
+                kind = getattr(builtins, qualname)
+            else:
+                kind = type(qualname, (), {'__module__': module, '__qualname__': qualname})
+
+            self.__types[dotted_name] = kind
+
+        return kind
+
+    def scan(self, *paths: str) -> Dict[str, EnvironmentVariable]:
+        """ Find the variables declared in the files and directories.
+
+            :return: The variables by name, as :attr:`readables.env.EnvironmentVariableManager.variables`.
+                     When a variable is declared more than once, the first declaration wins.
+        """
+        cache = self._load_cache()
+        entries: Dict[str, Dict[str, Any]] = dict()
+        misses: List[Tuple[str, str, Dict[str, Any], bytes]] = []  # The files to parse
+        changed = False
+
+        for path, module in self._files(paths):
+            stat = os.stat(path)
+            entry = cache.get(path)
+
+            if entry is not None and (entry['mtime_ns'], entry['size']) == (stat.st_mtime_ns, stat.st_size):
+                entries[path] = entry
+                continue
+
+            with open(path, 'rb') as f:
+                source = f.read()
+
+            digest = blake2b(source, digest_size=16).hexdigest()
+            changed = True
+
+            if entry is not None and entry['hash'] == digest:
+                entries[path] = dict(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+                continue
+
+            entries[path] = dict(mtime_ns=stat.st_mtime_ns, size=stat.st_size, hash=digest, variables=[])
+            misses.append((path, module, entries[path], source))
+
+        for (_, _, entry, _), records in zip(misses, self._parse([(m, s) for _, m, _, s in misses])):
+            entry['variables'] = records
+
+        if self.__cache_path is not None and (changed or len(entries) != len(cache)):
+            self._save_cache(entries)
+
+        variables: Dict[str, EnvironmentVariable] = dict()
+
+        for entry in entries.values():
+            for name, variable_type, kind, required, help, default in entry['variables']:
+                if name not in variables:
+                    variables[name] = EnvironmentVariable(
+                        name=name,
+                        variable_type=variable_type,
+                        interpreted_type=self._type(kind),
+                        required=required,
+                        help=help,
+                        default=default,
+                    )
+
+        return variables
+
+
+def scan(*paths: str,
+         cache_path: Optional[str] = None,
+         max_workers: Optional[int] = None) -> Dict[str, EnvironmentVariable]:
+    """ Find the variables declared in the files and directories. See :class:`EnvironmentVariableScanner`. """
+    return EnvironmentVariableScanner(cache_path=cache_path, max_workers=max_workers).scan(*paths)
@@ -0,0 +1,228 @@
+import asyncio
+from collections import deque
+from inspect import isawaitable
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Deque, Generic, Iterable, List, Literal, Optional, Set, \
+    TypeVar, Union
+
+T = TypeVar('T')
+R = TypeVar('R')
+
+Source = Union[AsyncIterable[T], Iterable[T]]
+Pipeline = Callable[[AsyncIterable[Any]], AsyncIterator[Any]]
+
+
+class AsyncStage:
+    """
+    A stage of an asynchronous stream
+
+    The callable may be a regular function or return an awaitable. For a flat-map stage, the
+    (awaited) result may be either an iterable or an asynchronous iterable.
+
+    :param kind: The kind of the stage
+    :param fn: The callable
+    :param int concurrency: The maximum number of items being processed at the same time
+    :param bool ordered: Whether the items are emitted in the order of the source
+    """
+    def __init__(self,
+                 kind: Literal["filter", "map", "flat_map"],
+                 fn: Callable[[Any], Any],
+                 concurrency: int = 1,
+                 ordered: bool = True):
+        if concurrency < 1:
+            raise ValueError(f'The concurrency must be positive (given: {concurrency}).')
+
+        self.kind = kind
+        self.fn = fn
+        self.concurrency = concurrency
+        self.ordered = ordered
+
+    async def __call__(self, item: Any) -> List[Any]:
+        """ Process one item and return the items to emit. """
+        result = self.fn(item)
+
+        if isawaitable(result):
+            result = await result
+
+        if self.kind == 'filter':
+            return [item] if result else []
+        elif self.kind == 'map':
+            return [result]
+        else:
+            return [value async for value in _iterate(result)]
+
+
+async def _iterate(source: Source[T]) -> AsyncIterator[T]:
+    if isawaitable(source):
+        source = await source
+
+    if hasattr(source, '__aiter__'):
+        async for item in source:
+            yield item
+    else:
+        for item in source:
+            yield item
+
+
+async def _close(iterator: AsyncIterator[Any]):
+    aclose = getattr(iterator, 'aclose', None)
+
+    if aclose is not None:
+        await aclose()
+
+
+def _fuse(stages: List[AsyncStage]) -> Pipeline:
+    """ Fuse the sequential stages into one asynchronous generator function.
+
+        Like its synchronous counterpart, every stage is inlined into a single loop, except that the
+        result of each callable is awaited whenever it is awaitable. The source is closed on exit.
+    """
+    params = ['_source', '_isawaitable=_isawaitable', '_iterate=_iterate', '_close=_close']
+    body = ['try:', '    async for _v in _source:']
+    depth = 2
+
+    for i, stage in enumerate(stages):
+        params.append(f'_f{i}=_f{i}')
+        pad = '    ' * depth
+
+        if stage.kind == 'filter':
+            body.append(f'{pad}_r = _f{i}(_v)')
+            body.append(f'{pad}if not ((await _r) if _isawaitable(_r) else _r): continue')
+        elif stage.kind == 'map':
+            body.append(f'{pad}_v = _f{i}(_v)')
+            body.append(f'{pad}if _isawaitable(_v): _v = await _v')
+        else:
+            body.append(f'{pad}async for _v in _iterate(_f{i}(_v)):')
+            depth += 1
+
+    body.append(f'{"    " * depth}yield _v')
+    body.extend(['finally:', '    await _close(_source)'])
+
+    code = f'async def _fused({", ".join(params)}):\n' + '\n'.join(f'    {line}' for line in body)
+    namespace = {f'_f{i}': stage.fn for i, stage in enumerate(stages)}
+    namespace.update(_isawaitable=isawaitable, _iterate=_iterate, _close=_close)
+    exec(code, namespace)
+
+    return namespace['_fused']
+
+
+def _concurrent(stage: AsyncStage) -> Pipeline:
+    """ Run the stage on up to ``stage.concurrency`` items at the same time.
+
+        The source is only pulled when a slot is available. When the consumer stops early, the pending
+        tasks are cancelled and the source is closed.
+    """
+    async def _run(source: AsyncIterable[Any]) -> AsyncIterator[Any]:
+        iterator = source.__aiter__()
+        pending: Union[Deque[asyncio.Future], Set[asyncio.Future]] = deque() if stage.ordered else set()
+        push = pending.append if stage.ordered else pending.add
+        exhausted = False
+
+        async def _fill():
+            nonlocal exhausted
+
+            while not exhausted and len(pending) < stage.concurrency:
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    exhausted = True
+                else:
+                    push(asyncio.ensure_future(stage(item)))
+
+        try:
+            await _fill()
+
+            while pending:
+                if stage.ordered:
+                    done = [pending[0]]
+                    await done[0]
+                    pending.popleft()
+                else:
+                    done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                    pending.difference_update(done)
+
+                # Refill before yielding so that the stage keeps working while the consumer runs.
+                await _fill()
+
+                for task in done:
+                    for value in task.result():
+                        yield value
+        finally:
+            for task in pending:
+                task.cancel()
+
+            await asyncio.gather(*pending, return_exceptions=True)
+            await _close(iterator)
+
+    return _run
+
+
+def _compile(chain: List[AsyncStage]) -> Pipeline:
+    """ Compile the chain into one pipeline.
+
+        Consecutive sequential stages are fused into a single asynchronous generator while each
+        concurrent stage runs on its own.
+    """
+    parts: List[Pipeline] = []
+    sequential: List[AsyncStage] = []
+
+    for stage in chain:
+        if stage.concurrency == 1:
+            sequential.append(stage)
+            continue
+
+        if sequential:
+            parts.append(_fuse(sequential))
+            sequential = []
+
+        parts.append(_concurrent(stage))
+
+    if sequential:
+        parts.append(_fuse(sequential))
+
+    def _pipeline(source: AsyncIterable[Any]) -> AsyncIterator[Any]:
+        for part in parts:
+            source = part(source)
+        return source.__aiter__()
+
+    return _pipeline
+
+
+class AsyncStream(Generic[T]):
+    """
+    Lazy asynchronous stream over an (asynchronous) iterable source
+
+    This is the asyncio counterpart of :class:`readables.stream.sync.Stream`. Every stage accepts
+    either a regular or an async callable and may process up to ``concurrency`` items at the same
+    time, emitting them in the order of the source (``ordered=True``) or as they complete.
+
+    To stop early and cancel the pending work right away, close the iterator returned by
+    :meth:`observe` with ``aclose()`` (or use ``contextlib.aclosing``).
+
+    :param source: The source of the items
+    """
+
+    def __init__(self, source: Source[T], chain: Optional[List[AsyncStage]] = None):
+        self._source = source
+        self._chain: List[AsyncStage] = list(chain or [])
+        self._compiled: Optional[Pipeline] = None
+
+    def _then(self, stage: AsyncStage) -> 'AsyncStream':
+        return self.__class__(self._source, self._chain + [stage])
+
+    def filter(self, fn: Callable[[T], Any], *, concurrency: int = 1, ordered: bool = True) -> 'AsyncStream[T]':
+        return self._then(AsyncStage('filter', fn, concurrency, ordered))
+
+    def map(self, fn: Callable[[T], Any], *, concurrency: int = 1, ordered: bool = True) -> 'AsyncStream[Any]':
+        return self._then(AsyncStage('map', fn, concurrency, ordered))
+
+    def flat_map(self, fn: Callable[[T], Any], *, concurrency: int = 1, ordered: bool = True) -> 'AsyncStream[Any]':
+        return self._then(AsyncStage('flat_map', fn, concurrency, ordered))
+
+    def observe(self) -> AsyncIterator[Any]:
+        if self._compiled is None:
+            self._compiled = _compile(self._chain)
+
+        return self._compiled(_iterate(self._source))
+
+    def __aiter__(self) -> AsyncIterator[Any]:
+        return self.observe()
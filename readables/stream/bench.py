@@ -0,0 +1,168 @@
+"""
+Benchmark suite for the stream package
+
+Each case runs the same pipeline, one filter followed by ``chain_length - 1`` maps, on the stream and
+on two baselines: nested generator expressions and the ``map``/``filter`` builtins (the closest
+thing to an ``itertools`` pipeline).
+
+Run with ``python -m readables.stream.bench``. Use ``--format json`` to get machine-readable output
+that can be compared between releases.
+"""
+import json
+import platform
+import sys
+import tracemalloc
+from argparse import ArgumentParser
+from dataclasses import dataclass, asdict
+from time import perf_counter
+from typing import Callable, Iterable, Iterator, List, Sequence, Dict, Optional
+
+from readables.stream.sync import Stream
+
+IMPLEMENTATIONS = ('generator', 'itertools', 'stream')
+
+
+@dataclass
+class BenchmarkResult:
+    implementation: str
+    size: int
+    chain_length: int
+    selectivity: float
+    seconds: float
+    items_per_second: float
+    # The extra time per item and per stage compared to the generator baseline
+    overhead_ns_per_item_per_stage: float
+    peak_memory_bytes: int
+
+
+def _increment(x: int) -> int:
+    return x + 1
+
+
+def _build(implementation: str, source: Iterable[int], chain_length: int, selectivity: float) -> Iterator[int]:
+    threshold = int(selectivity * 100)
+
+    def keep(x: int) -> bool:
+        return x % 100 < threshold
+
+    if implementation == 'stream':
+        stream = Stream(source).filter(keep)
+        for _ in range(chain_length - 1):
+            stream = stream.map(_increment)
+        return iter(stream)
+    elif implementation == 'itertools':
+        iterator = filter(keep, source)
+        for _ in range(chain_length - 1):
+            iterator = map(_increment, iterator)
+        return iterator
+    elif implementation == 'generator':
+        iterator = (x for x in source if keep(x))
+        for _ in range(chain_length - 1):
+            iterator = (_increment(x) for x in iterator)
+        return iterator
+    else:
+        raise ValueError(f'Unknown implementation: {implementation}')
+
+
+def _consume(iterator: Iterator[int]):
+    for _ in iterator:
+        pass
+
+
+def _best_time(fn: Callable[[], Iterator[int]], repeat: int) -> float:
+    best = float('inf')
+
+    for _ in range(repeat):
+        start_time = perf_counter()
+        _consume(fn())
+        best = min(best, perf_counter() - start_time)
+
+    return best
+
+
+def _peak_memory(fn: Callable[[], Iterator[int]]) -> int:
+    tracemalloc.start()
+
+    try:
+        _consume(fn())
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def run(sizes: Sequence[int] = (10_000, 1_000_000),
+        chain_lengths: Sequence[int] = (1, 3, 10),
+        selectivities: Sequence[float] = (0.1, 0.5, 1.0),
+        implementations: Sequence[str] = IMPLEMENTATIONS,
+        repeat: int = 5) -> List[BenchmarkResult]:
+    """ Run every combination of the parameters and return the results. """
+    results: List[BenchmarkResult] = []
+
+    for size in sizes:
+        source = range(size)
+
+        for chain_length in chain_lengths:
+            for selectivity in selectivities:
+                times: Dict[str, float] = dict()
+
+                for implementation in ('generator', *implementations):
+                    if implementation not in times:
+                        times[implementation] = _best_time(
+                            lambda: _build(implementation, source, chain_length, selectivity),
+                            repeat,
+                        )
+
+                for implementation in implementations:
+                    seconds = times[implementation]
+                    baseline = times['generator']
+
+                    results.append(BenchmarkResult(
+                        implementation=implementation,
+                        size=size,
+                        chain_length=chain_length,
+                        selectivity=selectivity,
+                        seconds=seconds,
+                        items_per_second=size / seconds if seconds else float('inf'),
+                        overhead_ns_per_item_per_stage=(seconds - baseline) / (size * chain_length) * 1e9,
+                        peak_memory_bytes=_peak_memory(
+                            lambda: _build(implementation, source, chain_length, selectivity)
+                        ),
+                    ))
+
+    return results
+
+
+def _metadata() -> Dict[str, str]:
+    return {
+        'python': sys.version.split()[0],
+        'implementation': platform.python_implementation(),
+        'platform': platform.platform(),
+    }
+
+
+def main(argv: Optional[Sequence[str]] = None):
+    parser = ArgumentParser(prog='python -m readables.stream.bench', description='Benchmark the stream package.')
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--chain-lengths', type=int, nargs='+', default=[1, 3, 10])
+    parser.add_argument('--selectivities', type=float, nargs='+', default=[0.1, 0.5, 1.0])
+    parser.add_argument('--implementations', nargs='+', choices=IMPLEMENTATIONS, default=list(IMPLEMENTATIONS))
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--format', choices=['text', 'json'], default='text')
+    args = parser.parse_args(argv)
+
+    results = run(args.sizes, args.chain_lengths, args.selectivities, args.implementations, args.repeat)
+
+    if args.format == 'json':
+        json.dump({'metadata': _metadata(), 'results': [asdict(r) for r in results]}, sys.stdout, indent=2)
+        print()
+        return
+
+    print(f'{"implementation":<14} {"size":>10} {"chain":>5} {"select":>6} {"items/s":>14} {"ns/item/stage":>14} {"peak":>10}')
+
+    for r in results:
+        print(f'{r.implementation:<14} {r.size:>10} {r.chain_length:>5} {r.selectivity:>6.2f} '
+              f'{r.items_per_second:>14,.0f} {r.overhead_ns_per_item_per_stage:>14.1f} {r.peak_memory_bytes:>10,}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,146 @@
+"""
+File sources for streams
+
+Both sources yield the records (lines by default) as ``memoryview`` slices over the data read from the
+file, without the delimiter, so that no record is copied until it is explicitly converted. A
+``memoryview`` works with ``re`` byte patterns, ``bytes(...)`` and ``str(..., encoding)``.
+
+The sources can be iterated more than once; each iteration reads the file again.
+"""
+import mmap
+import os
+from typing import Iterator, Union
+
+DEFAULT_CHUNK_SIZE = 1 << 20
+
+PathLike = Union[str, bytes, os.PathLike]
+
+
+class FileSource:
+    """
+    Read the records of a file chunk by chunk
+
+    Each chunk is read once and the records are sliced out of it. Only a record spanning two chunks
+    is copied (to join its two parts).
+
+    :param path: The path to the file
+    :param int chunk_size: The number of bytes to read at once
+    :param bytes delimiter: The record delimiter
+    """
+    def __init__(self, path: PathLike, chunk_size: int = DEFAULT_CHUNK_SIZE, delimiter: bytes = b'\n'):
+        if chunk_size < 1:
+            raise ValueError(f'The chunk size must be positive (given: {chunk_size}).')
+
+        if not delimiter:
+            raise ValueError('The delimiter must not be empty.')
+
+        self.path = path
+        self.chunk_size = chunk_size
+        self.delimiter = delimiter
+
+    def __iter__(self) -> Iterator[memoryview]:
+        delimiter = self.delimiter
+        step = len(delimiter)
+        tail = b''
+
+        with open(self.path, 'rb', buffering=0) as f:
+            while True:
+                chunk = f.read(self.chunk_size)
+
+                if not chunk:
+                    break
+
+                view = memoryview(chunk)
+                start = 0
+
+                if tail:
+                    record = None
+
+                    if step > 1:
+                        # The delimiter may straddle the two chunks.
+                        head = tail[-(step - 1):]
+                        position = (head + chunk[:step - 1]).find(delimiter)
+
+                        if position >= 0:
+                            record = tail[:len(tail) - len(head) + position]
+                            start = position + step - len(head)
+
+                    if record is None:
+                        position = chunk.find(delimiter)
+
+                        if position < 0:
+                            tail += chunk
+                            continue
+
+                        record = tail + chunk[:position]
+                        start = position + step
+
+                    yield memoryview(record)
+                    tail = b''
+
+                find = chunk.find
+
+                while True:
+                    end = find(delimiter, start)
+
+                    if end < 0:
+                        break
+
+                    yield view[start:end]
+                    start = end + step
+
+                if start < len(chunk):
+                    tail = chunk[start:]
+
+        if tail:
+            yield memoryview(tail)
+
+
+class MmapSource:
+    """
+    Read the records of a memory-mapped file
+
+    The file is mapped once and the records are sliced out of the mapping, so the pages are only
+    loaded by the OS as the stream reaches them.
+
+    :param path: The path to the file
+    :param bytes delimiter: The record delimiter
+    """
+    def __init__(self, path: PathLike, delimiter: bytes = b'\n'):
+        if not delimiter:
+            raise ValueError('The delimiter must not be empty.')
+
+        self.path = path
+        self.delimiter = delimiter
+
+    def __iter__(self) -> Iterator[memoryview]:
+        delimiter = self.delimiter
+        step = len(delimiter)
+
+        with open(self.path, 'rb') as f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return
+
+            mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(mapping)
+        size = len(mapping)
+        find = mapping.find
+        start = 0
+
+        try:
+            while start < size:
+                end = find(delimiter, start)
+
+                if end < 0:
+                    end = size
+
+                yield view[start:end]
+                start = end + step
+        finally:
+            try:
+                view.release()
+                mapping.close()
+            except BufferError:
+                # Some records are still referenced. The mapping is closed once they are collected.
+                pass
@@ -1,9 +1,26 @@
-from typing import Iterable, Any, Generic, TypeVar, Callable, List, Iterator, Generator
+import os
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from functools import reduce
+from itertools import compress, groupby, islice
+from typing import Iterable, Any, Generic, TypeVar, Callable, List, Iterator, Generator, Optional, Union, Sequence, Literal, \
+    Deque, Set, Tuple, Hashable
+
+from readables.stream.sources import DEFAULT_CHUNK_SIZE, FileSource, MmapSource, PathLike
+
+try:
+    import numpy
+except ImportError:  # pragma: no cover
+    numpy = None
 
 T = TypeVar('T')
 S = TypeVar('S')
 R = TypeVar('R')
 
+DEFAULT_BATCH_SIZE = 1024
+
+_MISSING = object()
+
 
 class Filter(Generic[T]):
     def __init__(self, fn: Callable[[T], bool]):
@@ -25,37 +42,516 @@ class FlatMap(Generic[S, R]):
     """
     Flat map an iterable object
 
-    While code is identical to Map, how it is used is different.
+    The wrapped callable returns an iterable for each item and every element of that iterable is
+    emitted downstream on its own.
     """
-    def __init__(self, fn: Callable[[S], R]):
+    def __init__(self, fn: Callable[[S], Iterable[R]]):
         self._fn = fn
 
     def __call__(self, s: S) -> Generator[R, Any, None]:
-        yield self._fn(s)
+        yield from self._fn(s)
+
+
+class MapBatch(Generic[S, R]):
+    """
+    Map a batch of items at once
+
+    The wrapped callable receives a chunk (a list, or a NumPy array when ``array`` is enabled) and
+    returns the sequence of the mapped items.
+    """
+    def __init__(self,
+                 fn: Callable[[Sequence[S]], Sequence[R]],
+                 size: int = DEFAULT_BATCH_SIZE,
+                 array: bool = False):
+        _check_batch_options(size, array)
+        self._fn = fn
+        self.size = size
+        self.array = array
+
+    def __call__(self, chunk: Sequence[S]) -> Sequence[R]:
+        return self._fn(chunk)
+
+
+class FilterBatch(Generic[T]):
+    """
+    Filter a batch of items at once
+
+    The wrapped callable receives a chunk and returns a mask of the same length where the truthy
+    positions are kept.
+    """
+    def __init__(self,
+                 fn: Callable[[Sequence[T]], Sequence[bool]],
+                 size: int = DEFAULT_BATCH_SIZE,
+                 array: bool = False):
+        _check_batch_options(size, array)
+        self._fn = fn
+        self.size = size
+        self.array = array
+
+    def __call__(self, chunk: Sequence[T]) -> Sequence[T]:
+        mask = self._fn(chunk)
+
+        if numpy is not None and isinstance(chunk, numpy.ndarray):
+            return chunk[numpy.asarray(mask, dtype=bool)]
+        else:
+            return list(compress(chunk, mask))
+
+
+class ParallelMap(Generic[S, R]):
+    """
+    Map the items on a thread or process pool
+
+    At most ``max_in_flight`` submissions are pending at any time so that the source is only pulled
+    as fast as the pool consumes it. With ``chunk_size`` greater than one, the items are submitted in
+    chunks to cut the per-submission (and, for process pools, the IPC) overhead.
+
+    When an executor instance is given, it is used as is and left running afterward.
+    """
+    def __init__(self,
+                 fn: Callable[[S], R],
+                 workers: Optional[int] = None,
+                 executor: Union[Literal["thread", "process"], Executor] = 'thread',
+                 ordered: bool = True,
+                 chunk_size: int = 1,
+                 max_in_flight: Optional[int] = None):
+        if chunk_size < 1:
+            raise ValueError(f'The chunk size must be positive (given: {chunk_size}).')
+
+        if not isinstance(executor, Executor) and executor not in ('thread', 'process'):
+            raise ValueError(f'Unknown executor: {executor!r}')
+
+        self._fn = fn
+        self.workers = workers or os.cpu_count() or 1
+        self.executor = executor
+        self.ordered = ordered
+        self.chunk_size = chunk_size
+        self.max_in_flight = max_in_flight or self.workers * 2
+
+    def _create_executor(self) -> Executor:
+        if isinstance(self.executor, Executor):
+            return self.executor
+        elif self.executor == 'process':
+            return ProcessPoolExecutor(max_workers=self.workers)
+        else:
+            return ThreadPoolExecutor(max_workers=self.workers)
+
+    def __call__(self, source: Iterable[S]) -> Iterator[R]:
+        pool = self._create_executor()
+        pending: Union[Deque[Future], Set[Future]] = deque() if self.ordered else set()
+        push = pending.append if self.ordered else pending.add
+
+        if self.chunk_size > 1:
+            submissions = (pool.submit(_map_chunk, self._fn, chunk) for chunk in _chunks(source, self.chunk_size, False))
+        else:
+            submissions = (pool.submit(self._fn, item) for item in source)
+
+        try:
+            for future in islice(submissions, self.max_in_flight):
+                push(future)
+
+            while pending:
+                if self.ordered:
+                    done = [pending.popleft()]
+                else:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    pending.difference_update(done)
+
+                for future in done:
+                    # Refill before yielding so that the pool keeps working while the consumer runs.
+                    for next_future in islice(submissions, 1):
+                        push(next_future)
+
+                    if self.chunk_size > 1:
+                        yield from future.result()
+                    else:
+                        yield future.result()
+        finally:
+            for future in pending:
+                future.cancel()
+
+            if pool is not self.executor:
+                pool.shutdown(wait=False)
+
+
+class Window(Generic[T]):
+    """
+    Group the items into windows of ``size`` items, emitted as tuples
+
+    When ``step`` is undefined or not less than ``size``, the windows are tumbling (and the items
+    between two windows are skipped when ``step`` is greater). Otherwise, the windows are sliding by
+    ``step`` items. Only up to ``size`` items are held at any time.
+
+    :param bool partial: Whether to emit the trailing incomplete window of tumbling windows
+    """
+    def __init__(self, size: int, step: Optional[int] = None, partial: bool = False):
+        if size < 1 or (step is not None and step < 1):
+            raise ValueError(f'The size and the step must be positive (given: {size}, {step}).')
+
+        self.size = size
+        self.step = step or size
+        self.partial = partial
+
+    def __call__(self, source: Iterable[T]) -> Iterator[Tuple[T, ...]]:
+        iterator = iter(source)
+        gap = self.step - self.size
+
+        if gap >= 0:
+            while True:
+                window = tuple(islice(iterator, self.size))
+
+                if len(window) == self.size or (window and self.partial):
+                    yield window
+
+                if len(window) < self.size:
+                    return
+
+                if gap:
+                    # Skip the items between the two windows.
+                    deque(islice(iterator, gap), maxlen=0)
+
+        window = deque(islice(iterator, self.size), maxlen=self.size)
+
+        if len(window) < self.size:
+            return
+
+        yield tuple(window)
+
+        while True:
+            slid = 0
+
+            for item in islice(iterator, self.step):
+                window.append(item)
+                slid += 1
+
+            if slid < self.step:
+                return
+
+            yield tuple(window)
+
+
+class GroupBy(Generic[T, R]):
+    """
+    Group the consecutive items sharing the same key, emitted as ``(key, group)`` pairs
+
+    The source must be sorted (or at least clustered) by the key. The group is a list unless
+    ``aggregate`` is given, in which case the group is given to ``aggregate`` as an iterator and its
+    result is emitted instead, so that no group is ever held in memory.
+    """
+    def __init__(self,
+                 key: Callable[[T], Hashable],
+                 aggregate: Optional[Callable[[Iterator[T]], R]] = None):
+        self._key = key
+        self._aggregate = aggregate or list
+
+    def __call__(self, source: Iterable[T]) -> Iterator[Tuple[Hashable, R]]:
+        aggregate = self._aggregate
+
+        for key, group in groupby(source, self._key):
+            yield key, aggregate(group)
+
+
+def _map_chunk(fn: Callable[[S], R], chunk: List[S]) -> List[R]:
+    return [fn(item) for item in chunk]
+
+
+def _check_batch_options(size: int, array: bool):
+    if size < 1:
+        raise ValueError(f'The batch size must be positive (given: {size}).')
+
+    if array and numpy is None:
+        raise ImportError('NumPy is required for the array mode. Install it with "readables-py[numpy]".')
+
+
+Stage = Union[Filter, Map, FlatMap, MapBatch, FilterBatch, ParallelMap, Window, GroupBy]
+_OPERATORS = (ParallelMap, Window, GroupBy)
+BatchStage = Union[MapBatch, FilterBatch]
+Pipeline = Callable[[Iterable[Any]], Iterator[Any]]
+
+
+def _chunks(source: Iterable[T], size: int, array: bool) -> Iterator[Sequence[T]]:
+    if isinstance(source, (list, tuple, range)) or (numpy is not None and isinstance(source, numpy.ndarray)):
+        # Slicing a sequence avoids pulling the items one by one (and gives views on NumPy arrays).
+        for offset in range(0, len(source), size):
+            chunk = source[offset:offset + size]
+            yield numpy.asarray(chunk) if array else (chunk if isinstance(chunk, list) else list(chunk))
+        return
+
+    iterator = iter(source)
+
+    while True:
+        chunk = list(islice(iterator, size))
+
+        if not chunk:
+            return
+
+        yield numpy.asarray(chunk) if array else chunk
+
+
+def _batch(stages: List[BatchStage]) -> Pipeline:
+    """ Run consecutive batch stages sharing the same chunking on each chunk in turn. """
+    size = stages[0].size
+    array = stages[0].array
+
+    def _batched(source: Iterable[Any]) -> Iterator[Any]:
+        for chunk in _chunks(source, size, array):
+            for stage in stages:
+                chunk = stage(chunk)
+
+                if len(chunk) == 0:
+                    break
+            else:
+                yield from chunk
+
+    return _batched
+
+
+def _fuse(chain: List[Stage]) -> Pipeline:
+    """ Fuse the per-item stages into one generator function.
+
+        The generated code inlines every stage as a plain statement inside a single loop, so each item
+        goes through the user callables without any per-stage dispatch. A flat-map stage opens a
+        nested loop and the remaining stages are emitted inside of it.
+    """
+    if not chain:
+        return iter
+
+    # The user callables are bound as default arguments so that they are looked up as locals.
+    params = ['_source']
+    body = ['for _v in _source:']
+    depth = 1
+
+    for i, stage in enumerate(chain):
+        params.append(f'_f{i}=_f{i}')
+        pad = '    ' * depth
+
+        if isinstance(stage, Filter):
+            body.append(f'{pad}if not _f{i}(_v): continue')
+        elif isinstance(stage, Map):
+            body.append(f'{pad}_v = _f{i}(_v)')
+        elif isinstance(stage, FlatMap):
+            body.append(f'{pad}for _v in _f{i}(_v):')
+            depth += 1
+        else:
+            raise TypeError(f'Unsupported stage: {stage!r}')
+
+    body.append(f'{"    " * depth}yield _v')
+
+    code = f'def _fused({", ".join(params)}):\n' + '\n'.join(f'    {line}' for line in body)
+    namespace = {f'_f{i}': stage._fn for i, stage in enumerate(chain)}
+    exec(code, namespace)
+
+    return namespace['_fused']
+
+
+def _compile(chain: List[Stage]) -> Pipeline:
+    """ Compile the chain into one pipeline.
+
+        Consecutive per-item stages are fused into a single generator while consecutive batch stages
+        with the same chunking share one chunk loop. Any other stage (an operator over the whole
+        stream, such as a parallel map or a window) runs on its own.
+    """
+    parts: List[Pipeline] = []
+    start = 0
+
+    for i in range(1, len(chain) + 1):
+        if i < len(chain) and _same_segment(chain[start], chain[i]):
+            continue
+
+        segment = chain[start:i]
+
+        if isinstance(segment[0], _OPERATORS):
+            parts.append(segment[0])
+        elif isinstance(segment[0], (MapBatch, FilterBatch)):
+            parts.append(_batch(segment))
+        else:
+            parts.append(_fuse(segment))
+
+        start = i
+
+    if not parts:
+        return iter
+    elif len(parts) == 1:
+        return parts[0]
+
+    def _pipeline(source: Iterable[Any]) -> Iterator[Any]:
+        for part in parts:
+            source = part(source)
+        return iter(source)
+
+    return _pipeline
+
+
+def _same_segment(head: Stage, stage: Stage) -> bool:
+    if isinstance(head, _OPERATORS) or isinstance(stage, _OPERATORS):
+        return False
+
+    head_batched = isinstance(head, (MapBatch, FilterBatch))
+
+    if head_batched != isinstance(stage, (MapBatch, FilterBatch)):
+        return False
+    elif head_batched:
+        return head.size == stage.size and head.array == stage.array
+    else:
+        return True
+
+
+class _closing:
+    """ Close the iterator (e.g. to shut a pool down) once a terminal operation returns early. """
+    def __init__(self, iterator: Iterator[Any]):
+        self._iterator = iterator
+
+    def __enter__(self) -> Iterator[Any]:
+        return self._iterator
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        close = getattr(self._iterator, 'close', None)
+
+        if close is not None:
+            close()
 
 
 class Stream(Generic[T, S]):
-    def __init__(self, source: Iterator[T]):
+    """
+    Lazy stream over an iterable source
+
+    Stages are declared with the fluent methods (``filter``, ``map``, ``flat_map``, ``map_batch``,
+    ``filter_batch``, ``parallel_map``, ``window`` and ``group_by``), each of which returns a new
+    stream sharing the same source. The chain is compiled the first time the stream is iterated.
+
+    The terminal operations (``first``, ``take``, ``any``, ``all``, ``reduce`` and ``count``) stop
+    pulling from the source as soon as the answer is known.
+
+    The stream is parameterized with the type of the source items (``T``) and the type of the items it
+    emits (``S``) after its stages, e.g., ``Stream[bytes, str]``.
+
+    :param source: The source of the items
+    """
+
+    def __init__(self, source: Iterable[T], chain: Optional[List[Stage]] = None):
         self._source = source
-        self._chain: List[Filter | Map | FlatMap] = []
+        self._chain: List[Stage] = list(chain or [])
+        self._compiled: Optional[Pipeline] = None
 
-    def observe(self):
-        for item in self._source:
-            included = True
-            iterated_value = item
+    @classmethod
+    def from_file(cls,
+                  path: PathLike,
+                  chunk_size: int = DEFAULT_CHUNK_SIZE,
+                  *,
+                  delimiter: bytes = b'\n') -> 'Stream[memoryview, memoryview]':
+        """ Stream the records (lines by default) of a file read in chunks of ``chunk_size`` bytes.
 
-            for act in self._chain:
-                if isinstance(act, Filter) and not act(iterated_value):
-                    included = False
-                    break
+            The records are ``memoryview`` slices of the chunks. Use :meth:`decode` after filtering to
+            only decode the records that are kept.
+        """
+        return cls(FileSource(path, chunk_size, delimiter))
+
+    @classmethod
+    def from_mmap(cls, path: PathLike, *, delimiter: bytes = b'\n') -> 'Stream[memoryview, memoryview]':
+        """ Stream the records (lines by default) of a memory-mapped file.
+
+            The records are ``memoryview`` slices of the mapping. Use :meth:`decode` after filtering
+            to only decode the records that are kept.
+        """
+        return cls(MmapSource(path, delimiter))
+
+    def _then(self, stage: Stage) -> 'Stream':
+        return self.__class__(self._source, self._chain + [stage])
+
+    def filter(self, fn: Callable[[S], bool]) -> 'Stream[T, S]':
+        return self._then(Filter(fn))
+
+    def map(self, fn: Callable[[S], R]) -> 'Stream[T, R]':
+        return self._then(Map(fn))
+
+    def flat_map(self, fn: Callable[[S], Iterable[R]]) -> 'Stream[T, R]':
+        return self._then(FlatMap(fn))
+
+    def decode(self, encoding: str = 'utf-8', errors: str = 'strict') -> 'Stream[T, str]':
+        """ Decode the byte records (e.g. from :meth:`from_file` or :meth:`from_mmap`) into strings. """
+        return self.map(lambda record: str(record, encoding, errors))
+
+    def map_batch(self,
+                  fn: Callable[[Sequence[S]], Sequence[R]],
+                  size: int = DEFAULT_BATCH_SIZE,
+                  *,
+                  array: bool = False) -> 'Stream[T, R]':
+        """ Map the items in chunks of up to ``size`` items.
+
+            When ``array`` is enabled, each chunk is given as a NumPy array.
+        """
+        return self._then(MapBatch(fn, size, array))
+
+    def filter_batch(self,
+                     fn: Callable[[Sequence[S]], Sequence[bool]],
+                     size: int = DEFAULT_BATCH_SIZE,
+                     *,
+                     array: bool = False) -> 'Stream[T, S]':
+        """ Filter the items in chunks of up to ``size`` items with a boolean mask per chunk.
+
+            When ``array`` is enabled, each chunk is given as a NumPy array.
+        """
+        return self._then(FilterBatch(fn, size, array))
+
+    def parallel_map(self,
+                     fn: Callable[[S], R],
+                     workers: Optional[int] = None,
+                     executor: Union[Literal["thread", "process"], Executor] = 'thread',
+                     ordered: bool = True,
+                     *,
+                     chunk_size: int = 1,
+                     max_in_flight: Optional[int] = None) -> 'Stream[T, R]':
+        """ Map the items on a pool of ``workers`` threads or processes.
+
+            When ``ordered`` is disabled, the items are emitted as soon as they are mapped. For the
+            process pool, ``fn`` must be picklable.
+        """
+        return self._then(ParallelMap(fn, workers, executor, ordered, chunk_size, max_in_flight))
+
+    def window(self, size: int, step: Optional[int] = None, *, partial: bool = False) -> 'Stream[T, Tuple[S, ...]]':
+        """ Group the items into tumbling (by default) or sliding windows. See :class:`Window`. """
+        return self._then(Window(size, step, partial))
+
+    def group_by(self,
+                 key: Callable[[S], Hashable],
+                 aggregate: Optional[Callable[[Iterator[S]], R]] = None) -> 'Stream[T, Tuple[Hashable, R]]':
+        """ Group the consecutive items sharing the same key. See :class:`GroupBy`. """
+        return self._then(GroupBy(key, aggregate))
+
+    def first(self, default: Any = None) -> Any:
+        """ Get the first item, or the default value when the stream is empty. """
+        with _closing(self.observe()) as iterator:
+            return next(iterator, default)
+
+    def take(self, n: int) -> List[Any]:
+        """ Get up to the first ``n`` items. """
+        with _closing(self.observe()) as iterator:
+            return list(islice(iterator, n))
+
+    def any(self, predicate: Optional[Callable[[Any], bool]] = None) -> bool:
+        """ Check if any item (or its predicate) is truthy, stopping at the first one. """
+        with _closing(self.observe()) as iterator:
+            return any(iterator if predicate is None else map(predicate, iterator))
+
+    def all(self, predicate: Optional[Callable[[Any], bool]] = None) -> bool:
+        """ Check if every item (or its predicate) is truthy, stopping at the first falsy one. """
+        with _closing(self.observe()) as iterator:
+            return all(iterator if predicate is None else map(predicate, iterator))
+
+    def reduce(self, fn: Callable[[R, Any], R], initial: Any = _MISSING) -> R:
+        """ Fold the items with ``fn``, starting with ``initial`` if given. """
+        with _closing(self.observe()) as iterator:
+            return reduce(fn, iterator) if initial is _MISSING else reduce(fn, iterator, initial)
 
-                if isinstance(act, Map):
-                    iterated_value = act(iterated_value)
+    def count(self) -> int:
+        """ Count the items without holding them. """
+        counter = deque(enumerate(self.observe(), 1), maxlen=1)
+        return counter[0][0] if counter else 0
 
-                if isinstance(act, FlatMap):
-                    raise NotImplementedError('To be implemented')
+    def observe(self) -> Iterator[S]:
+        if self._compiled is None:
+            self._compiled = _compile(self._chain)
 
-            if not included:
-                continue
+        return self._compiled(self._source)
 
-            yield iterated_value
+    def __iter__(self) -> Iterator[S]:
+        return self.observe()
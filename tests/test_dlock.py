@@ -1,16 +1,947 @@
+import asyncio
+import multiprocessing
+import os
+import sqlite3
+import tempfile
+from threading import Thread
+from time import sleep, time
+from uuid import uuid4
 from unittest import TestCase, IsolatedAsyncioTestCase
+from unittest.mock import patch
 
+from readables.dlock import bench
+from readables.dlock.awaitable.core import AwaitableDLockFactory, AwaitableDSharedLock
 from readables.dlock.awaitable.state_manager import AwaitableLocalLockStateManager
-from readables.dlock.awaitable.state_manager_tck import check_awaitable
+from readables.dlock.awaitable.state_manager_bridge import AwaitableBridgeLockStateManager
+from readables.dlock.awaitable.state_manager_file import AwaitableFileLockStateManager
+from readables.dlock.awaitable.state_manager_net import AwaitableNetworkLockStateManager
+from readables.dlock.awaitable.state_manager_sqlite import AwaitableSQLiteLockStateManager
+from readables.dlock.awaitable.state_manager_tiered import AwaitableTieredLockStateManager
+from readables.dlock.awaitable.state_manager_tck import check_awaitable, check_awaitable_shared, \
+    check_awaitable_semaphore, load_awaitable
+from readables.dlock.blocking.core import DLockFactory, DSharedLock
 from readables.dlock.blocking.state_manager import LocalLockStateManager
-from readables.dlock.blocking.state_manager_tck import check
+from readables.dlock.blocking import state_manager_bridge, state_manager_net
+from readables.dlock.blocking.state_manager_bridge import BridgeLockStateManager
+from readables.dlock.blocking.state_manager_file import FileLockStateManager
+from readables.dlock.blocking.state_manager_net import NetworkLockStateManager
+from readables.dlock.blocking.state_manager_shm import SharedMemoryLockStateManager
+from readables.dlock.blocking.state_manager_sqlite import SQLiteLockStateManager
+from readables.dlock.blocking.state_manager_tiered import TieredLockStateManager
+from readables.dlock.blocking.state_manager_tck import check, check_shared, check_semaphore, load, LoadProfile
+from readables.dlock.instrumentation import DLockMetrics, Histogram
+from readables.dlock.server import LockServer
+
+
+def _hold_file_lock(directory: str, queue: multiprocessing.Queue):
+    with DLockFactory(manager=FileLockStateManager(directory)).lock('shared'):
+        started_at = time()
+        sleep(0.2)
+        queue.put((started_at, time()))
+
+
+def _hold_shm_lock(name: str, directory: str, queue: multiprocessing.Queue):
+    with DLockFactory(manager=SharedMemoryLockStateManager(name, directory=directory)).lock('shared'):
+        started_at = time()
+        sleep(0.2)
+        queue.put((started_at, time()))
+
+
+def _die_holding_shm_lock(name: str, directory: str):
+    SharedMemoryLockStateManager(name, directory=directory).acquire('abandoned')
+    os._exit(0)
+
+
+def _make_sqlite_manager(test_case: TestCase, path: str, **kwargs) -> SQLiteLockStateManager:
+    manager = SQLiteLockStateManager(path, **kwargs)
+    test_case.addCleanup(manager.close)
+    return manager
+
+
+def _make_awaitable_sqlite_manager(test_case: TestCase, path: str, **kwargs) -> AwaitableSQLiteLockStateManager:
+    manager = AwaitableSQLiteLockStateManager(path, **kwargs)
+    test_case.addCleanup(manager.close)
+    return manager
+
+
+def _make_shm_manager(test_case: TestCase, **kwargs) -> SharedMemoryLockStateManager:
+    name = f'readables_test_{uuid4().hex[:12]}'
+    manager = SharedMemoryLockStateManager(name, directory=_make_temp_dir(test_case), **kwargs)
+    test_case.addCleanup(manager.close)
+    test_case.addCleanup(manager.unlink)
+    return manager
+
+
+def _make_temp_dir(test_case: TestCase) -> str:
+    directory = tempfile.TemporaryDirectory()
+    test_case.addCleanup(directory.cleanup)
+    return directory.name
+
+
+def _start_lock_server(test_case: TestCase) -> str:
+    """ Run a lock server on a Unix socket in a background thread and return the socket path. """
+    path = os.path.join(_make_temp_dir(test_case), 'dlock.sock')
+    loop = asyncio.new_event_loop()
+    server = LockServer()
+    loop.run_until_complete(server.start(path))
+    thread = Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+
+    def _stop():
+        asyncio.run_coroutine_threadsafe(server.close(), loop).result()
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        loop.close()
+
+    test_case.addCleanup(_stop)
+
+    return path
+
+
+class _CountingLockStateManager(LocalLockStateManager):
+    """ A stand-in for a remote state manager, counting the round trips """
+    def __init__(self):
+        super().__init__()
+        self.round_trips = 0
+
+    def acquire(self, lock_id, blocking=True, timeout=None):
+        self.round_trips += 1
+        return super().acquire(lock_id, blocking, timeout)
+
+    def release(self, lock_id):
+        self.round_trips += 1
+        super().release(lock_id)
+
+
+class _InterruptedLocalLockStateManager(LocalLockStateManager):
+    """ A local state manager whose waiters are interrupted right after the lock is handed over to them """
+    def _acquire(self, lock_id, limit, blocking, timeout):
+        if not blocking or not self.is_actively_locked(lock_id):
+            return super()._acquire(lock_id, limit, blocking, timeout)
+
+        super()._acquire(lock_id, limit, blocking, timeout)
+        # As an interrupted waiter does, give back the lock it never saw.
+        self._release(lock_id, limit)
+        raise KeyboardInterrupt()
 
 
 class TestUnit(TestCase):
     def test_tck(self):
         check(LocalLockStateManager())
 
+    def test_local_table_eviction(self):
+        manager = LocalLockStateManager(stripes=4)
+
+        self.assertFalse(manager.is_actively_locked('unknown'))
+
+        for i in range(1000):
+            manager.acquire(f'entity-{i}')
+            self.assertTrue(manager.is_actively_locked(f'entity-{i}'))
+            manager.release(f'entity-{i}')
+
+        self.assertEqual(len(manager), 0)
+
+    def test_local_fifo_handoff(self):
+        manager = LocalLockStateManager()
+        order = []
+        manager.acquire('fifo')
+
+        def _worker(i: int):
+            manager.acquire('fifo')
+            order.append(i)
+            manager.release('fifo')
+
+        threads = []
+
+        for i in range(5):
+            threads.append(Thread(target=_worker, args=(i,)))
+            threads[-1].start()
+
+            while manager.waiting('fifo') <= i:
+                sleep(0.001)
+
+        manager.release('fifo')
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(order, list(range(5)))
+
+    def test_shared_and_semaphore(self):
+        manager = LocalLockStateManager()
+
+        check_shared(manager)
+        check_semaphore(manager)
+
+        self.assertEqual(len(manager), 0)
+
+    def test_writer_holds_back_later_readers(self):
+        manager = LocalLockStateManager()
+        dlf = DLockFactory(manager=manager)
+        reader = dlf.shared_lock('rw')
+        writer_done = []
+
+        reader.acquire()
+
+        def _writer():
+            with dlf.lock('rw'):
+                writer_done.append(time())
+
+        thread = Thread(target=_writer)
+        thread.start()
+
+        while manager.waiting('rw') < 1:
+            sleep(0.001)
+
+        # A reader arriving after the writer must not overtake it.
+        self.assertFalse(dlf.shared_lock('rw').acquire(timeout=0.05))
+
+        reader.release()
+        thread.join()
+
+        self.assertEqual(len(writer_done), 1)
+        self.assertEqual(len(manager), 0)
+
+    def test_metrics(self):
+        metrics = DLockMetrics()
+        dlf = DLockFactory(manager=LocalLockStateManager(), listener=metrics)
+        lock = dlf.lock('hot')
+
+        with lock:
+            self.assertFalse(dlf.lock('hot').acquire(timeout=0.05))
+            self.assertEqual(metrics.stats('hot').holders, 1)
+            sleep(0.05)
+
+        with dlf.lock_many(['hot', 'cold']):
+            pass
+
+        hot = metrics.stats('hot')
+
+        self.assertEqual((hot.acquisitions, hot.contentions, hot.give_ups), (2, 1, 1))
+        self.assertEqual((hot.waiters, hot.holders), (0, 0))
+        self.assertEqual(hot.wait.count, 3)
+        self.assertGreaterEqual(hot.wait.max, 0.05)
+        self.assertGreaterEqual(hot.hold.max, 0.1)
+        self.assertEqual([lock_id for lock_id, _ in metrics.hottest(1)], ['hot'])
+
+        # Releasing a lock this instance does not hold records no hold time.
+        dlf.lock('idle').release()
+        lock.release()
+
+        self.assertEqual(metrics.stats('idle').hold.count, 0)
+        self.assertEqual((metrics.stats('hot').hold.count, metrics.stats('hot').holders), (2, 0))
+
+    def test_histogram_percentiles(self):
+        histogram = Histogram()
+
+        for i in range(1, 1001):
+            histogram.record(i / 1_000_000)
+
+        self.assertEqual(histogram.count, 1000)
+        self.assertAlmostEqual(histogram.mean, 500.5 / 1_000_000)
+        self.assertEqual(histogram.percentile(50), 512 / 1_000_000)
+        self.assertEqual(histogram.percentile(100), 1000 / 1_000_000)
+
+    def test_load(self):
+        profile = LoadProfile(number_of_ids=50, skew=1.2, workers=4, operations_per_worker=200)
+        schedules = profile.schedules()
+
+        self.assertEqual(schedules, profile.schedules(), 'The schedules are not reproducible.')
+        self.assertGreater(sum(s.count('load-0') for s in schedules), sum(s.count('load-49') for s in schedules))
+
+        result = load(LocalLockStateManager(), profile)
+
+        self.assertEqual(result.acquisitions, 800)
+        self.assertGreater(result.acquisitions_per_second, 0)
+        self.assertLessEqual(result.p50, result.p99)
+        self.assertLessEqual(result.p99, result.p999)
+        self.assertLessEqual(result.p999, result.max)
+
+    def test_bench(self):
+        profile = LoadProfile(number_of_ids=10_000, workers=4, operations_per_worker=100)
+        results = bench.run(['local-1', 'local-64', 'sqlite'], profile)
+
+        self.assertEqual([(name, remaining_entries) for name, _, remaining_entries in results],
+                         [('local-1', 0), ('local-64', 0), ('sqlite', None)])
+        self.assertTrue(all(result.acquisitions == 400 for _, result, _ in results))
+
+    def test_lock_many_rollback_on_error(self):
+        class _FailingManager(LocalLockStateManager):
+            def acquire(self, lock_id, blocking=True, timeout=None):
+                if lock_id == 'c':
+                    raise RuntimeError('Unavailable')
+
+                return super().acquire(lock_id, blocking, timeout)
+
+        manager = _FailingManager()
+        lock_set = DLockFactory(manager=manager).lock_many(['c', 'a', 'b', 'a'])
+
+        self.assertEqual(lock_set.ids, ('a', 'b', 'c'))
+
+        with self.assertRaises(RuntimeError):
+            lock_set.acquire()
+
+        self.assertEqual(len(manager), 0)
+
+    def test_tck_bridge(self):
+        manager = BridgeLockStateManager(AwaitableLocalLockStateManager())
+        self.addCleanup(manager.close)
+
+        check(manager, task_duration=0.2)
+        check_shared(manager)
+
+    def test_bridge_interrupted_after_acquisition(self):
+        awaitable_manager = AwaitableLocalLockStateManager()
+        manager = BridgeLockStateManager(awaitable_manager)
+        self.addCleanup(manager.close)
+
+        class InterruptedFuture(state_manager_bridge.Future):
+            """ The interruption lands just as the acquisition completes. """
+            def result(self, timeout=None):
+                super().result(timeout)
+                raise KeyboardInterrupt()
+
+        with patch.object(state_manager_bridge, 'Future', InterruptedFuture):
+            with self.assertRaises(KeyboardInterrupt):
+                manager.acquire('bridged')
+
+        deadline = time() + 5
+
+        while manager.is_actively_locked('bridged') and time() < deadline:
+            sleep(0.01)
+
+        self.assertTrue(manager.acquire('bridged', blocking=False))
+        manager.release('bridged')
+
+    def test_bridge_leases(self):
+        path = os.path.join(_make_temp_dir(self), 'locks.db')
+        manager = BridgeLockStateManager(_make_awaitable_sqlite_manager(self, path))
+        self.addCleanup(manager.close)
+        other = _make_sqlite_manager(self, path)
+
+        with DLockFactory(manager=manager).lock('bridged', ttl=0.15) as lock:
+            self.assertIsNotNone(lock.token)
+
+            # Renewed through the bridge beyond its TTL
+            sleep(0.4)
+            self.assertFalse(other.acquire('bridged', blocking=False))
+
+        self.assertTrue(other.acquire('bridged', blocking=False))
+
+    def test_tck_file(self):
+        directory = _make_temp_dir(self)
+        check(FileLockStateManager(directory), task_duration=0.2)
+
+    def test_file_across_processes(self):
+        directory = _make_temp_dir(self)
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        processes = [context.Process(target=_hold_file_lock, args=(directory, queue)) for _ in range(3)]
+
+        for process in processes:
+            process.start()
+
+        for process in processes:
+            process.join(timeout=5)
+
+        periods = sorted(queue.get(timeout=1) for _ in processes)
+
+        for (_, previous_end), (next_start, _) in zip(periods, periods[1:]):
+            self.assertLessEqual(previous_end, next_start)
+
+        self.assertFalse(FileLockStateManager(directory).is_actively_locked('shared'))
+
+    def test_tck_shm(self):
+        check(_make_shm_manager(self), task_duration=0.2)
+
+    def test_shm_across_processes(self):
+        directory = _make_temp_dir(self)
+        name = f'readables_test_{uuid4().hex[:12]}'
+        manager = SharedMemoryLockStateManager(name, directory=directory)
+        self.addCleanup(manager.close)
+        self.addCleanup(manager.unlink)
+
+        context = multiprocessing.get_context('fork')
+        queue = context.Queue()
+        processes = [context.Process(target=_hold_shm_lock, args=(name, directory, queue)) for _ in range(3)]
+
+        for process in processes:
+            process.start()
+
+        for process in processes:
+            process.join(timeout=5)
+
+        periods = sorted(queue.get(timeout=1) for _ in processes)
+
+        for (_, previous_end), (next_start, _) in zip(periods, periods[1:]):
+            self.assertLessEqual(previous_end, next_start)
+
+        self.assertFalse(manager.is_actively_locked('shared'))
+
+        # The lock of a dead owner is reclaimed.
+        process = context.Process(target=_die_holding_shm_lock, args=(name, directory))
+        process.start()
+        process.join(timeout=5)
+
+        self.assertFalse(manager.is_actively_locked('abandoned'))
+        self.assertTrue(manager.acquire('abandoned', blocking=False))
+        manager.release('abandoned')
+
+    def test_shm_full_bucket(self):
+        manager = _make_shm_manager(self, buckets=1, bucket_size=2)
+
+        self.assertTrue(manager.acquire('a'))
+        self.assertTrue(manager.acquire('b'))
+        self.assertFalse(manager.acquire('c', timeout=0.05))
+
+        manager.release('a')
+        self.assertTrue(manager.acquire('c', blocking=False))
+
+    def test_tck_sqlite(self):
+        path = os.path.join(_make_temp_dir(self), 'locks.db')
+        check(_make_sqlite_manager(self, path), task_duration=0.2)
+
+    def test_sqlite_lease_expiry(self):
+        path = os.path.join(_make_temp_dir(self), 'locks.db')
+        crashed = _make_sqlite_manager(self, path, ttl=0.2)
+        survivor = _make_sqlite_manager(self, path)
+
+        crashed.acquire('lease')
+        self.assertTrue(survivor.is_actively_locked('lease'))
+
+        start_time = time()
+        survivor.acquire('lease')
+        self.assertGreaterEqual(time() - start_time, 0.1)
+
+        # The expired holder must not release the lease of the new holder.
+        crashed.release('lease')
+        self.assertTrue(survivor.is_actively_locked('lease'))
+
+        survivor.release('lease')
+        self.assertFalse(survivor.is_actively_locked('lease'))
+
+    def test_sqlite_fencing_tokens(self):
+        path = os.path.join(_make_temp_dir(self), 'locks.db')
+        paused = _make_sqlite_manager(self, path)
+        survivor = _make_sqlite_manager(self, path)
+
+        first_token = paused.acquire_lease('fenced', ttl=0.1)
+        self.assertIsNotNone(first_token)
+        self.assertIsNone(survivor.acquire_lease('fenced', ttl=5, blocking=False))
+
+        # The first holder pauses for longer than its lease.
+        sleep(0.15)
+        second_token = survivor.acquire_lease('fenced', ttl=5, blocking=False)
+
+        self.assertGreater(second_token, first_token)
+        self.assertFalse(paused.renew_lease('fenced', first_token, ttl=5))
+
+        survivor.release_lease('fenced', second_token)
+        self.assertGreater(paused.acquire_lease('fenced', ttl=5), second_token)
+
+    def test_sqlite_close(self):
+        manager = _make_sqlite_manager(self, os.path.join(_make_temp_dir(self), 'locks.db'))
+        manager.acquire('closed')
+        manager.close()
+
+        with self.assertRaises(sqlite3.ProgrammingError):
+            manager.acquire('closed')
+
+        # Including from a thread which had no connection yet
+        errors = []
+
+        def acquire():
+            try:
+                manager.acquire('closed')
+            except sqlite3.ProgrammingError as e:
+                errors.append(e)
+
+        thread = Thread(target=acquire)
+        thread.start()
+        thread.join()
+
+        self.assertEqual(len(errors), 1)
+
+    def test_sqlite_stale_token_in_process(self):
+        path = os.path.join(_make_temp_dir(self), 'locks.db')
+        manager = _make_sqlite_manager(self, path)
+
+        stale_token = manager.acquire_lease('fenced', ttl=0.1)
+        sleep(0.15)
+        current_token = manager.acquire_lease('fenced', ttl=5, blocking=False)
+        self.assertGreater(current_token, stale_token)
+
+        # The stale holder shares the manager with the current one, but not the token.
+        self.assertFalse(manager.renew_lease('fenced', stale_token, ttl=5))
+        manager.release_lease('fenced', stale_token)
+        self.assertTrue(manager.is_actively_locked('fenced'))
+
+        self.assertTrue(manager.renew_lease('fenced', current_token, ttl=5))
+        manager.release_lease('fenced', current_token)
+        self.assertFalse(manager.is_actively_locked('fenced'))
+
+    def test_lease_renewal(self):
+        path = os.path.join(_make_temp_dir(self), 'locks.db')
+        dlf = DLockFactory(manager=_make_sqlite_manager(self, path))
+        other = _make_sqlite_manager(self, path)
+        lock = dlf.lock('renewed', ttl=0.15)
+
+        token = lock.acquire()
+        self.assertEqual(lock.token, token)
+
+        # The lease outlives its TTL as long as it is held.
+        sleep(0.4)
+        self.assertFalse(other.acquire('renewed', blocking=False))
+        self.assertFalse(lock.lost)
+
+        lock.release()
+        self.assertIsNone(lock.token)
+        self.assertTrue(other.acquire('renewed', blocking=False))
+
+    def test_lease_lost(self):
+        class _ForgetfulLockStateManager(LocalLockStateManager):
+            def renew_lease(self, lock_id, token, ttl):
+                return False
+
+        lock = DLockFactory(manager=_ForgetfulLockStateManager()).lock('forgotten', ttl=0.03)
+        lock.acquire()
+        deadline = time() + 5
+
+        while not lock.lost and time() < deadline:
+            sleep(0.01)
+
+        self.assertTrue(lock.lost)
+
+        # A released lock does not report the loss any longer, e.g., once acquired again.
+        lock.release()
+        self.assertFalse(lock.lost)
+
+        with self.assertRaises(TypeError):
+            DSharedLock(LocalLockStateManager(), 'shared', ttl=1)
+
+    def test_local_lease_tokens(self):
+        dlf = DLockFactory(manager=LocalLockStateManager())
+        tokens = []
+
+        for _ in range(3):
+            with dlf.lock('local', ttl=1) as lock:
+                tokens.append(lock.token)
+
+        self.assertEqual(tokens, sorted(set(tokens)))
+
+    def test_tck_tiered(self):
+        path = os.path.join(_make_temp_dir(self), 'locks.db')
+        check(TieredLockStateManager(_make_sqlite_manager(self, path)), task_duration=0.2)
+
+    def test_tiered_handoff(self):
+        remote = _CountingLockStateManager()
+        manager = TieredLockStateManager(remote, max_handoffs=16)
+        dlf = DLockFactory(manager=manager)
+        holders = []
+        inside = []
+
+        def _worker(i: int):
+            for _ in range(50):
+                with dlf.lock('hot'):
+                    inside.append(i)
+                    holders.append(len(inside))
+                    sleep(0)
+                    inside.remove(i)
+
+        threads = [Thread(target=_worker, args=(i,)) for i in range(8)]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(holders, [1] * 400, 'Two threads held the lock at the same time.')
+        self.assertLess(remote.round_trips, 400)
+        self.assertFalse(manager.remote_held('hot'))
+        self.assertFalse(remote.is_actively_locked('hot'))
+
+    def test_tiered_interrupted_after_handoff(self):
+        remote = LocalLockStateManager()
+        local = _InterruptedLocalLockStateManager()
+        manager = TieredLockStateManager(remote, local=local)
+        interruptions = []
+
+        def _wait():
+            try:
+                manager.acquire('hot')
+            except KeyboardInterrupt:
+                interruptions.append('hot')
+
+        self.assertTrue(manager.acquire('hot'))
+
+        waiter = Thread(target=_wait)
+        waiter.start()
+
+        while not local.waiting('hot'):
+            sleep(0.001)
+
+        manager.release('hot')
+        waiter.join()
+
+        self.assertEqual(interruptions, ['hot'])
+        self.assertFalse(manager.remote_held('hot'))
+        self.assertFalse(remote.is_actively_locked('hot'))
+        self.assertTrue(manager.acquire('hot', blocking=False))
+
+    def test_tiered_without_handoff(self):
+        remote = _CountingLockStateManager()
+        dlf = DLockFactory(manager=TieredLockStateManager(remote, max_handoffs=0))
+
+        for _ in range(10):
+            with dlf.lock('cold'):
+                pass
+
+        self.assertEqual(remote.round_trips, 20)
+
+    def test_tck_net(self):
+        manager = NetworkLockStateManager(_start_lock_server(self))
+        self.addCleanup(manager.close)
+
+        check(manager, task_duration=0.2)
+
+    def test_net_interrupted_acquisition(self):
+        path = _start_lock_server(self)
+        holder = NetworkLockStateManager(path, pool_size=1)
+        self.addCleanup(holder.close)
+        interrupted = NetworkLockStateManager(path, pool_size=1)
+        self.addCleanup(interrupted.close)
+
+        class InterruptedFuture(state_manager_net.Future):
+            """ The interruption lands while the acquisition waits for the lock. """
+            def result(self, timeout=None):
+                if not self.done():
+                    raise KeyboardInterrupt()
+
+                return super().result(timeout)
+
+        for acquire in (lambda: interrupted.acquire('net'), lambda: interrupted.acquire_many(['net', 'other'])):
+            holder.acquire('net')
+
+            with patch.object(state_manager_net, 'Future', InterruptedFuture):
+                with self.assertRaises(KeyboardInterrupt):
+                    acquire()
+
+            # The server grants the lock to the interrupted client, which gives it back right away.
+            holder.release('net')
+
+            self.assertTrue(holder.acquire_many(['net', 'other'], timeout=5))
+            holder.release_many(['net', 'other'])
+
+    def test_net_disconnection_releases_locks(self):
+        path = _start_lock_server(self)
+        crashed = NetworkLockStateManager(path, pool_size=1)
+        survivor = NetworkLockStateManager(path, pool_size=1)
+        self.addCleanup(survivor.close)
+
+        crashed.acquire('net')
+        self.assertTrue(survivor.is_actively_locked('net'))
+
+        crashed.close()
+        survivor.acquire('net')
+        survivor.release('net')
+        self.assertFalse(survivor.is_actively_locked('net'))
+
 
 class AwaitableTestUnit(IsolatedAsyncioTestCase):
     async def test_tck(self):
-        await check_awaitable(AwaitableLocalLockStateManager())
\ No newline at end of file
+        await check_awaitable(AwaitableLocalLockStateManager())
+
+    async def test_local_table_eviction(self):
+        manager = AwaitableLocalLockStateManager()
+
+        async def _worker(i: int):
+            async with AwaitableDLockFactory(manager=manager).lock(f'entity-{i % 10}'):
+                await asyncio.sleep(0)
+
+        await asyncio.gather(*[_worker(i) for i in range(100)])
+
+        self.assertFalse(await manager.is_actively_locked('entity-0'))
+        self.assertEqual(len(manager), 0)
+
+    async def test_local_fifo_handoff(self):
+        manager = AwaitableLocalLockStateManager()
+        order = []
+        await manager.acquire('fifo')
+
+        async def _worker(i: int):
+            await manager.acquire('fifo')
+            order.append(i)
+            await manager.release('fifo')
+
+        tasks = []
+
+        for i in range(5):
+            tasks.append(asyncio.ensure_future(_worker(i)))
+
+            while manager.waiting('fifo') <= i:
+                await asyncio.sleep(0)
+
+        await manager.release('fifo')
+        await asyncio.gather(*tasks)
+
+        self.assertEqual(order, list(range(5)))
+
+    async def test_shared_and_semaphore(self):
+        manager = AwaitableLocalLockStateManager()
+
+        await check_awaitable_shared(manager)
+        await check_awaitable_semaphore(manager)
+
+        self.assertEqual(len(manager), 0)
+
+    async def test_metrics(self):
+        metrics = DLockMetrics()
+        dlf = AwaitableDLockFactory(manager=AwaitableLocalLockStateManager(), listener=metrics)
+
+        async def _worker():
+            async with dlf.shared_lock('hot'):
+                await asyncio.sleep(0.01)
+
+            async with dlf.lock('hot'):
+                await asyncio.sleep(0.01)
+
+        await asyncio.gather(*[_worker() for _ in range(3)])
+
+        hot = metrics.stats('hot')
+
+        self.assertEqual(hot.acquisitions, 6)
+        self.assertGreater(hot.contentions, 0)
+        self.assertEqual((hot.waiters, hot.holders), (0, 0))
+        self.assertEqual(hot.hold.count, 6)
+
+        lock = dlf.lock('hot')
+        await lock.release()
+        await dlf.lock_many(['hot', 'cold']).release()
+
+        self.assertEqual((hot.hold.count, hot.holders), (6, 0))
+
+    async def test_load(self):
+        profile = LoadProfile(number_of_ids=5, workers=8, operations_per_worker=50)
+        result = await load_awaitable(AwaitableLocalLockStateManager(), profile)
+
+        self.assertEqual(result.acquisitions, 400)
+        self.assertLessEqual(result.p50, result.max)
+
+    async def test_tck_bridge(self):
+        manager = AwaitableBridgeLockStateManager(LocalLockStateManager())
+        self.addCleanup(manager.close)
+
+        await check_awaitable(manager, task_duration=0.2)
+        await check_awaitable_semaphore(manager)
+
+    async def test_bridge_cancellation(self):
+        blocking_manager = LocalLockStateManager()
+        manager = AwaitableBridgeLockStateManager(blocking_manager, poll_interval=0.01)
+        self.addCleanup(manager.close)
+        ticks = []
+
+        async def _ticker():
+            while True:
+                ticks.append(time())
+                await asyncio.sleep(0.01)
+
+        blocking_manager.acquire('bridged')
+        ticker = asyncio.ensure_future(_ticker())
+        waiter = asyncio.ensure_future(manager.acquire('bridged'))
+
+        await asyncio.sleep(0.2)
+
+        # The event loop keeps running while the acquisition waits.
+        self.assertGreater(len(ticks), 5)
+        self.assertFalse(waiter.done())
+
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        blocking_manager.release('bridged')
+        ticker.cancel()
+        await asyncio.gather(ticker, return_exceptions=True)
+        await asyncio.sleep(0.05)
+
+        self.assertTrue(await manager.acquire('bridged', blocking=False), 'The cancelled acquisition kept the lock.')
+        await manager.release('bridged')
+
+    async def test_bridge_leases(self):
+        path = os.path.join(_make_temp_dir(self), 'locks.db')
+        manager = AwaitableBridgeLockStateManager(_make_sqlite_manager(self, path))
+        self.addCleanup(manager.close)
+        other = _make_sqlite_manager(self, path)
+
+        token = await manager.acquire_lease('bridged', ttl=0.1)
+        self.assertIsNotNone(token)
+        self.assertIsNone(await manager.acquire_lease('bridged', ttl=5, timeout=0.01))
+
+        self.assertTrue(await manager.renew_lease('bridged', token, ttl=5))
+        await asyncio.sleep(0.15)
+        self.assertFalse(other.acquire('bridged', blocking=False))
+
+        await manager.release_lease('bridged', token)
+        self.assertTrue(other.acquire('bridged', blocking=False))
+
+    async def test_tck_file(self):
+        directory = _make_temp_dir(self)
+        await check_awaitable(AwaitableFileLockStateManager(directory), task_duration=0.2)
+
+    async def test_tck_sqlite(self):
+        path = os.path.join(_make_temp_dir(self), 'locks.db')
+        await check_awaitable(_make_awaitable_sqlite_manager(self, path), task_duration=0.2)
+
+    async def test_sqlite_cancelled_claim(self):
+        path = os.path.join(_make_temp_dir(self), 'locks.db')
+        manager = _make_awaitable_sqlite_manager(self, path)
+        self.addCleanup(manager.close)
+
+        for _ in range(10):
+            task = asyncio.create_task(manager.acquire('cancelled'))
+            await asyncio.sleep(0)  # The claim is running in its thread.
+            task.cancel()
+
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+            deadline = time() + 5
+
+            while await manager.is_actively_locked('cancelled') and time() < deadline:
+                await asyncio.sleep(0.01)
+
+            self.assertFalse(await manager.is_actively_locked('cancelled'))
+
+    async def test_sqlite_stale_token_in_process(self):
+        path = os.path.join(_make_temp_dir(self), 'locks.db')
+        manager = _make_awaitable_sqlite_manager(self, path)
+
+        stale_token = await manager.acquire_lease('fenced', ttl=0.1)
+        await asyncio.sleep(0.15)
+        current_token = await manager.acquire_lease('fenced', ttl=5, blocking=False)
+
+        self.assertFalse(await manager.renew_lease('fenced', stale_token, ttl=5))
+        await manager.release_lease('fenced', stale_token)
+        self.assertTrue(await manager.is_actively_locked('fenced'))
+
+        self.assertTrue(await manager.renew_lease('fenced', current_token, ttl=5))
+        await manager.release_lease('fenced', current_token)
+        self.assertFalse(await manager.is_actively_locked('fenced'))
+
+    async def test_lease_renewal(self):
+        path = os.path.join(_make_temp_dir(self), 'locks.db')
+        dlf = AwaitableDLockFactory(manager=_make_awaitable_sqlite_manager(self, path))
+        other = _make_awaitable_sqlite_manager(self, path)
+        lock = dlf.lock('renewed', ttl=0.15)
+
+        first_token = await lock.acquire()
+        await asyncio.sleep(0.4)
+
+        self.assertFalse(await other.acquire('renewed', blocking=False))
+        self.assertFalse(lock.lost)
+
+        await lock.release()
+        second_token = await lock.acquire()
+
+        self.assertGreater(second_token, first_token)
+        await lock.release()
+
+    async def test_lease_lost(self):
+        class _ForgetfulLockStateManager(AwaitableLocalLockStateManager):
+            async def renew_lease(self, lock_id, token, ttl):
+                return False
+
+        lock = AwaitableDLockFactory(manager=_ForgetfulLockStateManager()).lock('forgotten', ttl=0.03)
+        await lock.acquire()
+        await asyncio.sleep(0.05)
+
+        self.assertTrue(lock.lost)
+
+        await lock.release()
+        self.assertFalse(lock.lost)
+
+        with self.assertRaises(TypeError):
+            AwaitableDSharedLock(AwaitableLocalLockStateManager(), 'shared', ttl=1)
+
+    async def test_tck_tiered(self):
+        path = os.path.join(_make_temp_dir(self), 'locks.db')
+        manager = AwaitableTieredLockStateManager(_make_awaitable_sqlite_manager(self, path))
+        await check_awaitable(manager, task_duration=0.2)
+
+    async def test_tiered_handoff(self):
+        remote = AwaitableLocalLockStateManager()
+        manager = AwaitableTieredLockStateManager(remote, max_handoffs=4)
+        dlf = AwaitableDLockFactory(manager=manager)
+        remote_acquisitions = []
+        acquire = remote.acquire
+
+        async def _counting_acquire(lock_id, blocking=True, timeout=None):
+            remote_acquisitions.append(lock_id)
+            return await acquire(lock_id, blocking, timeout)
+
+        remote.acquire = _counting_acquire
+
+        async def _worker():
+            for _ in range(10):
+                async with dlf.lock('hot'):
+                    await asyncio.sleep(0)
+
+        await asyncio.gather(*[_worker() for _ in range(10)])
+
+        # At most one remote acquisition per five local holders (one plus four handoffs)
+        self.assertLessEqual(len(remote_acquisitions), 100 // 5 + 1)
+        self.assertFalse(await remote.is_actively_locked('hot'))
+
+    async def test_tiered_cancelled_after_handoff(self):
+        remote = AwaitableLocalLockStateManager()
+        local = AwaitableLocalLockStateManager()
+        manager = AwaitableTieredLockStateManager(remote, local=local)
+
+        self.assertTrue(await manager.acquire('hot'))
+
+        waiter = asyncio.create_task(manager.acquire('hot'))
+        await asyncio.sleep(0)
+        self.assertEqual(local.waiting('hot'), 1)
+
+        # The waiter is cancelled after the lock is handed over to it, but before it resumes.
+        await manager.release('hot')
+        waiter.cancel()
+
+        with self.assertRaises(asyncio.CancelledError):
+            await waiter
+
+        self.assertFalse(manager.remote_held('hot'))
+        self.assertFalse(await remote.is_actively_locked('hot'))
+        self.assertTrue(await manager.acquire('hot', blocking=False))
+
+    async def test_tck_net(self):
+        path = os.path.join(_make_temp_dir(self), 'dlock.sock')
+        server = LockServer()
+        await server.start(path)
+        self.addAsyncCleanup(server.close)
+
+        manager = AwaitableNetworkLockStateManager(path)
+        self.addAsyncCleanup(manager.close)
+
+        await check_awaitable(manager, task_duration=0.2)
+
+    async def test_server_close(self):
+        path = os.path.join(_make_temp_dir(self), 'dlock.sock')
+        server = LockServer()
+        await server.start(path)
+
+        holder = AwaitableNetworkLockStateManager(path)
+        self.addAsyncCleanup(holder.close)
+        waiter = AwaitableNetworkLockStateManager(path)
+        self.addAsyncCleanup(waiter.close)
+
+        self.assertTrue(await holder.acquire('net'))
+        waiting = asyncio.ensure_future(waiter.acquire('net'))
+        await asyncio.sleep(0.05)
+
+        await server.close()
+
+        with self.assertRaises(ConnectionError):
+            await waiting
+
+        with self.assertRaises(OSError):
+            await AwaitableNetworkLockStateManager(path).acquire('net')
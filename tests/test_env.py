@@ -1,8 +1,16 @@
+import io
+import json
 import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
 from textwrap import dedent
 from unittest import TestCase
 
-from readables.env import RequiredEnvironmentVariable, EnvironmentVariableManager, MarkdownExporter, EnvFileExporter
+from readables.env import RequiredEnvironmentVariable, EnvironmentVariableManager, MarkdownExporter, EnvFileExporter, \
+    InvalidEnvironmentVariables, parse_env_file, JSONSchemaExporter, KubernetesConfigMapExporter, \
+    KubernetesSecretExporter
+from readables.env_scanner import EnvironmentVariableScanner
 
 
 class TestUnit(TestCase):
@@ -36,6 +44,267 @@ class TestUnit(TestCase):
 
         self.assertEqual(evm.required_env('T_ALPHA', kind=int), expected_value)
 
+    def test_snapshot(self):
+        for env in ('T_SNAP_ALPHA', 'T_SNAP_BETA', 'T_SNAP_CHARLIE'):
+            self.addCleanup(self._revert_env_var_to_original, env, os.getenv(env))
+
+        os.environ['T_SNAP_ALPHA'] = '12'
+        os.environ.pop('T_SNAP_BETA', None)
+        os.environ['T_SNAP_CHARLIE'] = 'true'
+
+        evm = EnvironmentVariableManager()
+        evm.required_env('T_SNAP_ALPHA', kind=int)
+        evm.optional_env('T_SNAP_BETA', 'beta')
+        evm.flag('T_SNAP_CHARLIE')
+
+        snapshot = evm.snapshot()
+
+        self.assertEqual(snapshot.T_SNAP_ALPHA, 12)
+        self.assertEqual(snapshot['T_SNAP_BETA'], 'beta')
+        self.assertIs(snapshot.T_SNAP_CHARLIE, True)
+        self.assertIs(evm.snapshot(), snapshot)
+
+        with self.assertRaises(AttributeError):
+            snapshot.T_SNAP_ALPHA = 13
+
+        os.environ['T_SNAP_ALPHA'] = '13'
+
+        self.assertEqual(snapshot.T_SNAP_ALPHA, 12)
+        self.assertEqual(snapshot.refresh().T_SNAP_ALPHA, 13)
+        self.assertEqual(evm.snapshot().T_SNAP_ALPHA, 13)
+
+    def test_snapshot_names_and_declarations(self):
+        for env in ('refresh', 'as_dict', 'T_SNAP_ALPHA', 'T_SNAP_BETA'):
+            self.addCleanup(self._revert_env_var_to_original, env, os.getenv(env))
+
+        os.environ['refresh'] = 'yes'
+        os.environ['as_dict'] = 'no'
+        os.environ['T_SNAP_ALPHA'] = '12'
+        os.environ['T_SNAP_BETA'] = '13'
+
+        evm = EnvironmentVariableManager()
+        evm.flag('refresh')
+        evm.flag('as_dict')
+        evm.optional_env('T_SNAP_ALPHA', kind=int)
+
+        snapshot = evm.snapshot()
+
+        self.assertIs(snapshot['refresh'], True)
+        self.assertIs(snapshot['as_dict'], False)
+        self.assertEqual(snapshot.as_dict()['refresh'], True)
+        self.assertEqual(snapshot.refresh().T_SNAP_ALPHA, 12)
+
+        # The same number of declarations, but not the same ones
+        del evm.variables['T_SNAP_ALPHA']
+        evm.optional_env('T_SNAP_BETA', kind=int)
+
+        self.assertEqual(evm.snapshot().T_SNAP_BETA, 13)
+        self.assertNotIn('T_SNAP_ALPHA', evm.snapshot())
+
+    def test_snapshot_reports_every_error(self):
+        for env in ('T_SNAP_ALPHA', 'T_SNAP_BETA', 'T_SNAP_CHARLIE'):
+            self.addCleanup(self._revert_env_var_to_original, env, os.getenv(env))
+
+        os.environ['T_SNAP_ALPHA'] = 'alpha'
+        os.environ['T_SNAP_BETA'] = '1'
+        os.environ['T_SNAP_CHARLIE'] = 'yes'
+
+        evm = EnvironmentVariableManager()
+        evm.required_env('T_SNAP_ALPHA')
+        evm.optional_env('T_SNAP_BETA', kind=int)
+        evm.flag('T_SNAP_CHARLIE')
+
+        del os.environ['T_SNAP_ALPHA']
+        os.environ['T_SNAP_BETA'] = 'not a number'
+        os.environ['T_SNAP_CHARLIE'] = 'maybe'
+
+        with self.assertRaises(InvalidEnvironmentVariables) as context:
+            evm.snapshot()
+
+        self.assertEqual(sorted(context.exception.errors), ['T_SNAP_ALPHA', 'T_SNAP_BETA', 'T_SNAP_CHARLIE'])
+        self.assertIsInstance(context.exception.errors['T_SNAP_ALPHA'], RequiredEnvironmentVariable)
+
+    def _write_env_file(self, content: str) -> str:
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, '.env')
+
+        with open(path, 'w') as f:
+            f.write(dedent(content))
+
+        return path
+
+    def test_parse_env_file(self):
+        path = self._write_env_file("""
+            # A comment
+            ALPHA=alpha
+            export BETA = two words  # A trailing comment
+            CHARLIE='# Not a comment'
+            DELTA="line 1\\nline \\"2\\""
+            #ECHO=commented out
+            FOXTROT=
+            ALPHA=last
+        """)
+
+        self.assertEqual(
+            parse_env_file(path),
+            {
+                'ALPHA': 'last',
+                'BETA': 'two words',
+                'CHARLIE': '# Not a comment',
+                'DELTA': 'line 1\nline "2"',
+                'FOXTROT': '',
+            },
+        )
+
+    def test_load_env_files(self):
+        for env in ('T_FILE_ALPHA', 'T_FILE_BETA', 'T_FILE_CHARLIE'):
+            self.addCleanup(self._revert_env_var_to_original, env, os.getenv(env))
+            os.environ.pop(env, None)
+
+        base = self._write_env_file("""
+            T_FILE_ALPHA=base
+            T_FILE_BETA=1
+            T_FILE_CHARLIE=base
+        """)
+        local = self._write_env_file("""
+            T_FILE_BETA=2
+        """)
+        os.environ['T_FILE_CHARLIE'] = 'process'
+
+        evm = EnvironmentVariableManager()
+        evm.load_env_files(base, local, os.path.join(os.path.dirname(local), 'missing.env'))
+
+        self.assertEqual(evm.required_env('T_FILE_ALPHA'), 'base')
+        self.assertEqual(evm.optional_env('T_FILE_BETA', kind=int), 2)
+        self.assertEqual(evm.required_env('T_FILE_CHARLIE'), 'process')
+        self.assertNotIn('T_FILE_ALPHA', os.environ)
+
+        evm.load_env_files(base, local, override=True)
+
+        self.assertEqual(evm.snapshot().T_FILE_CHARLIE, 'base')
+
+    def test_poll(self):
+        for env in ('T_POLL_ALPHA', 'T_POLL_BETA'):
+            self.addCleanup(self._revert_env_var_to_original, env, os.getenv(env))
+            os.environ.pop(env, None)
+
+        path = self._write_env_file("""
+            T_POLL_ALPHA=1
+        """)
+
+        evm = EnvironmentVariableManager()
+        evm.load_env_files(path)
+        evm.required_env('T_POLL_ALPHA', kind=int)
+        evm.flag('T_POLL_BETA')
+
+        notifications = []
+        unsubscribe = evm.subscribe(notifications.append)
+
+        self.assertEqual(evm.poll(), {})
+
+        with open(path, 'w') as f:
+            f.write('T_POLL_ALPHA=22\n')
+
+        os.utime(path, ns=(time.time_ns(), time.time_ns() + 1_000_000_000))
+        os.environ['T_POLL_BETA'] = 'yes'
+
+        self.assertEqual(evm.poll(), {'T_POLL_ALPHA': (1, 22), 'T_POLL_BETA': (False, True)})
+        self.assertEqual(evm.snapshot().T_POLL_ALPHA, 22)
+        self.assertEqual(notifications, [{'T_POLL_ALPHA': (1, 22), 'T_POLL_BETA': (False, True)}])
+
+        # An invalid value is reported, and the last valid values are kept.
+        os.environ['T_POLL_BETA'] = 'maybe'
+
+        with self.assertRaises(InvalidEnvironmentVariables):
+            evm.poll()
+
+        self.assertIs(evm.snapshot().T_POLL_BETA, True)
+
+        unsubscribe()
+        os.environ['T_POLL_BETA'] = 'no'
+
+        self.assertEqual(evm.poll(), {'T_POLL_BETA': (True, False)})
+        self.assertEqual(len(notifications), 1)
+
+    def test_watch(self):
+        self.addCleanup(self._revert_env_var_to_original, 'T_WATCH_ALPHA', os.getenv('T_WATCH_ALPHA'))
+        os.environ['T_WATCH_ALPHA'] = 'false'
+
+        evm = EnvironmentVariableManager()
+        evm.flag('T_WATCH_ALPHA')
+
+        notifications = []
+        evm.subscribe(notifications.append)
+        evm.watch(interval=0.01)
+        self.addCleanup(evm.unwatch)
+
+        os.environ['T_WATCH_ALPHA'] = 'true'
+        deadline = time.monotonic() + 5
+
+        while not notifications and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+        self.assertEqual(notifications, [{'T_WATCH_ALPHA': (False, True)}])
+        self.assertIs(evm.snapshot().T_WATCH_ALPHA, True)
+
+    def test_scan(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        package = os.path.join(directory.name, 'your_app')
+        os.makedirs(os.path.join(package, '__pycache__'))
+
+        with open(os.path.join(package, 'constants.py'), 'w') as f:
+            f.write(dedent("""
+                from decimal import Decimal
+
+                from readables import env
+                from readables.env import required_env as required, optional_env
+
+                ALPHA = required('T_SCAN_ALPHA', kind=Decimal, help='Alpha')
+                BETA = optional_env('T_SCAN_BETA', 'beta', kind=int)
+
+
+                def charlie():
+                    return env.flag('T_SCAN_CHARLIE', help='Charlie ' 'flag')
+
+
+                ALPHA_AGAIN = optional_env('T_SCAN_ALPHA')
+                NOT_A_LITERAL = optional_env(ALPHA)
+                NOT_FROM_ENV = parser.flag('T_SCAN_PARSER'), settings.optional_env('T_SCAN_SETTINGS')
+            """))
+
+        with open(os.path.join(package, 'broken.py'), 'w') as f:
+            f.write('optional_env(\'T_SCAN_BROKEN\'')
+
+        cache_path = os.path.join(directory.name, 'cache.json')
+        scanner = EnvironmentVariableScanner(cache_path=cache_path, max_workers=1)
+
+        for _ in range(2):  # Without, then with the cache
+            variables = scanner.scan(package)
+
+            self.assertEqual(list(variables), ['T_SCAN_ALPHA', 'T_SCAN_BETA', 'T_SCAN_CHARLIE'])
+
+            alpha = variables['T_SCAN_ALPHA']
+            self.assertEqual((alpha.required, alpha.help, alpha.variable_type), (True, 'Alpha', 'variable'))
+            self.assertEqual(
+                (alpha.interpreted_type.__module__, alpha.interpreted_type.__qualname__),
+                ('decimal', 'Decimal'),
+            )
+
+            beta = variables['T_SCAN_BETA']
+            self.assertEqual((beta.required, beta.default, beta.interpreted_type), (False, 'beta', int))
+
+            charlie = variables['T_SCAN_CHARLIE']
+            self.assertEqual((charlie.variable_type, charlie.help), ('flag', 'Charlie flag'))
+
+        self.assertTrue(os.path.exists(cache_path))
+
+        with open(os.path.join(package, 'broken.py'), 'w') as f:
+            f.write('from readables.env import flag\n\nDELTA = flag(\'T_SCAN_DELTA\')\n')
+
+        self.assertIn('T_SCAN_DELTA', scanner.scan(package))
+
     def test_markdown_export(self):
         os.environ['READABLES_ENV_ALLOW_UNSET_REQUIRED'] = 'true'
 
@@ -89,3 +358,144 @@ MOCK_ALPHA=
             """.strip()),
             output
         )
+
+    def _declare_exported_variables(self) -> EnvironmentVariableManager:
+        os.environ['READABLES_ENV_ALLOW_UNSET_REQUIRED'] = 'true'
+
+        evm = EnvironmentVariableManager()
+        evm.required_env('MOCK_ALPHA', help='Alpha')
+        evm.optional_env('MOCK_BETA', 5, kind=int)
+        evm.flag('MOCK_CHARLIE')
+
+        return evm
+
+    def test_export_modes(self):
+        evm = self._declare_exported_variables()
+
+        self.assertEqual(
+            MarkdownExporter.export(evm.variables, mode='minimal'),
+            dedent("""
+                # MOCK_ALPHA
+
+                | Variable Type | Interpreted as | Required? | Default Value |
+                | ------------- | -------------- | --------- | ------------- |
+                | variable | builtins.str | **Yes** | `None` |
+
+                Alpha
+            """).strip(),
+        )
+
+        stream = io.StringIO()
+        MarkdownExporter.write(evm.variables, stream)
+
+        self.assertEqual(stream.getvalue(), MarkdownExporter.export(evm.variables, mode='all'))
+        self.assertEqual(''.join(MarkdownExporter.iter_export(evm.variables)), stream.getvalue())
+        self.assertTrue(EnvFileExporter.export(evm.variables, mode='all').endswith('\nMOCK_CHARLIE=false'))
+
+        schema = json.loads(JSONSchemaExporter.export(evm.variables, mode='all'))
+
+        self.assertEqual(list(schema['properties']), ['MOCK_ALPHA', 'MOCK_BETA', 'MOCK_CHARLIE'])
+        self.assertEqual(schema['properties']['MOCK_BETA']['default'], '5')
+        self.assertEqual(schema['required'], ['MOCK_ALPHA'])
+        self.assertEqual(list(json.loads(JSONSchemaExporter.export(evm.variables))['properties']), ['MOCK_ALPHA'])
+
+        self.assertEqual(
+            KubernetesSecretExporter.export(evm.variables, mode='all', name='app'),
+            dedent("""
+                apiVersion: v1
+                kind: Secret
+                metadata:
+                  name: "app"
+                type: Opaque
+                stringData:
+                  # Alpha
+                  MOCK_ALPHA: ""
+                  MOCK_BETA: "5"
+                  MOCK_CHARLIE: "false"
+            """).lstrip(),
+        )
+
+    def test_export_all_loads_back(self):
+        for env in ('T_EXPORT_PORT', 'T_EXPORT_RETRIES', 'T_EXPORT_DEBUG'):
+            self.addCleanup(self._revert_env_var_to_original, env, os.getenv(env))
+            os.environ.pop(env, None)
+
+        evm = EnvironmentVariableManager()
+        evm.optional_env('T_EXPORT_PORT', kind=int)
+        evm.optional_env('T_EXPORT_RETRIES', 0, kind=int)
+        evm.flag('T_EXPORT_DEBUG')
+
+        path = self._write_env_file(EnvFileExporter.export(evm.variables, mode='all'))
+
+        loaded = EnvironmentVariableManager()
+        loaded.load_env_files(path)
+
+        self.assertIsNone(loaded.optional_env('T_EXPORT_PORT', kind=int))
+        self.assertEqual(loaded.environ.get('T_EXPORT_RETRIES'), '0')
+        self.assertIs(loaded.flag('T_EXPORT_DEBUG'), False)
+
+        properties = json.loads(JSONSchemaExporter.export(evm.variables, mode='all'))['properties']
+        self.assertNotIn('default', properties['T_EXPORT_PORT'])
+        self.assertEqual(properties['T_EXPORT_RETRIES']['default'], '0')
+        self.assertNotIn('T_EXPORT_PORT', KubernetesConfigMapExporter.export(evm.variables, mode='all'))
+
+    def test_export_special_values_load_back(self):
+        values = {
+            'T_EXPORT_HASH': 'has #hash',
+            'T_EXPORT_SPACES': '  padded  ',
+            'T_EXPORT_QUOTES': 'say "hi" and \'bye\'',
+            'T_EXPORT_ESCAPES': 'C:\\temp\\new\tline\nnext',
+            'T_EXPORT_PLAIN': 'plain-value',
+        }
+        evm = EnvironmentVariableManager()
+
+        for name, value in values.items():
+            evm.optional_env(name, value)
+
+        output = EnvFileExporter.export(evm.variables, mode='all')
+
+        self.assertIn('\nT_EXPORT_PLAIN=plain-value', output)
+        self.assertEqual(parse_env_file(self._write_env_file(output)), values)
+
+    def test_write_file(self):
+        evm = self._declare_exported_variables()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'configmap.yaml')
+
+        stream = io.StringIO()
+        KubernetesConfigMapExporter.write(evm.variables, stream)
+
+        self.assertTrue(KubernetesConfigMapExporter.write_file(evm.variables, path))
+
+        with open(path) as f:
+            self.assertEqual(f.read(), stream.getvalue())
+
+        os.utime(path, ns=(0, 0))
+
+        self.assertFalse(KubernetesConfigMapExporter.write_file(evm.variables, path))
+        self.assertEqual(os.stat(path).st_mtime_ns, 0)
+        self.assertTrue(KubernetesConfigMapExporter.write_file(evm.variables, path, mode='all'))
+        self.assertEqual(os.listdir(directory.name), ['configmap.yaml'])
+
+    def test_write_file_concurrently(self):
+        evm = self._declare_exported_variables()
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, 'configmap.yaml')
+
+        mask = os.umask(0o027)
+        self.addCleanup(os.umask, mask)
+
+        KubernetesConfigMapExporter.write_file(evm.variables, path)
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+
+        os.chmod(path, 0o604)
+
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            for _ in executor.map(lambda mode: KubernetesConfigMapExporter.write_file(evm.variables, path, mode=mode),
+                                  ['all', 'minimal'] * 8):
+                pass
+
+        self.assertEqual(os.listdir(directory.name), ['configmap.yaml'])
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o604)
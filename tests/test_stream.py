@@ -0,0 +1,234 @@
+import asyncio
+import os
+import re
+import tempfile
+from typing import get_type_hints
+from unittest import TestCase, IsolatedAsyncioTestCase, skipIf
+
+from readables.stream import bench
+from readables.stream.aio import AsyncStream
+from readables.stream.sync import Stream, FlatMap, numpy, T, R
+
+
+class TestUnit(TestCase):
+    def test_empty_chain(self):
+        self.assertEqual(list(Stream(range(3))), [0, 1, 2])
+
+    def test_fluent_chain(self):
+        stream = Stream(range(10)).filter(lambda x: x % 2 == 0).map(lambda x: x * 10)
+
+        self.assertEqual(list(stream.observe()), [0, 20, 40, 60, 80])
+
+    def test_type_parameters(self):
+        words = Stream[int, int](range(3)).map(str)
+
+        self.assertEqual(list(words), ['0', '1', '2'])
+        self.assertEqual(get_type_hints(Stream.map)['return'], Stream[T, R])
+
+    def test_flat_map(self):
+        stream = (
+            Stream(['a b', '', 'c d e'])
+            .flat_map(str.split)
+            .filter(lambda w: w != 'd')
+            .map(str.upper)
+        )
+
+        self.assertEqual(list(stream), ['A', 'B', 'C', 'E'])
+        self.assertEqual(list(FlatMap(lambda x: [x, x])(1)), [1, 1])
+
+    def test_branching(self):
+        base = Stream(range(5)).map(lambda x: x + 1)
+
+        self.assertEqual(list(base.filter(lambda x: x > 3)), [4, 5])
+        self.assertEqual(list(base), [1, 2, 3, 4, 5])
+
+    def test_batches(self):
+        chunk_sizes = []
+
+        def double(chunk):
+            chunk_sizes.append(len(chunk))
+            return [x * 2 for x in chunk]
+
+        stream = (
+            Stream(iter(range(10)))
+            .map_batch(double, 4)
+            .filter_batch(lambda chunk: [x % 4 == 0 for x in chunk], 4)
+            .map(lambda x: x + 1)
+        )
+
+        self.assertEqual(list(stream), [1, 5, 9, 13, 17])
+        self.assertEqual(chunk_sizes, [4, 4, 2])
+
+    def test_batches_on_sequence(self):
+        stream = Stream([1, 2, 3]).map(lambda x: x * 3).map_batch(lambda chunk: [sum(chunk)], 2)
+
+        self.assertEqual(list(stream), [9, 9])
+        self.assertEqual(list(Stream((1, 2, 3)).filter_batch(lambda chunk: [False, True], 2)), [2])
+
+    @skipIf(numpy is None, 'NumPy is not installed.')
+    def test_batches_as_arrays(self):
+        stream = (
+            Stream(range(10))
+            .map_batch(lambda chunk: chunk * 2, 4, array=True)
+            .filter_batch(lambda chunk: chunk > 10, 4, array=True)
+        )
+
+        self.assertEqual([int(x) for x in stream], [12, 14, 16, 18])
+
+    def test_parallel_map(self):
+        pulled = []
+
+        def source():
+            for i in range(100):
+                pulled.append(i)
+                yield i
+
+        stream = Stream(source()).parallel_map(lambda x: x * 2, workers=4).filter(lambda x: x % 3 == 0)
+        iterator = iter(stream)
+
+        self.assertEqual(next(iterator), 0)
+        self.assertLessEqual(len(pulled), 9)  # Only up to twice the number of workers are in flight.
+        self.assertEqual(list(iterator), [x * 2 for x in range(1, 100) if x * 2 % 3 == 0])
+
+    def test_parallel_map_unordered_chunks(self):
+        stream = Stream(range(50)).parallel_map(abs, workers=2, ordered=False, chunk_size=8)
+
+        self.assertEqual(sorted(stream), list(range(50)))
+
+    def test_parallel_map_on_processes(self):
+        stream = Stream(range(20)).parallel_map(abs, workers=2, executor='process', chunk_size=5)
+
+        self.assertEqual(list(stream), list(range(20)))
+
+    def test_terminal_operations(self):
+        pulled = []
+
+        def source():
+            for i in range(1000):
+                pulled.append(i)
+                yield i
+
+        self.assertEqual(Stream(source()).filter(lambda x: x > 2).first(), 3)
+        self.assertEqual(len(pulled), 4)
+        self.assertIsNone(Stream([]).first())
+        self.assertEqual(Stream(range(100)).map(lambda x: x * x).take(3), [0, 1, 4])
+        self.assertTrue(Stream(range(100)).any(lambda x: x == 5))
+        self.assertFalse(Stream(range(100)).all(lambda x: x < 5))
+        self.assertEqual(Stream(range(5)).reduce(lambda a, b: a + b), 10)
+        self.assertEqual(Stream(range(5)).reduce(lambda a, b: a + b, 10), 20)
+        self.assertEqual(Stream(range(10)).filter(lambda x: x % 3 == 0).count(), 4)
+        self.assertEqual(Stream([]).count(), 0)
+
+    def test_windows(self):
+        self.assertEqual(list(Stream(range(7)).window(3)), [(0, 1, 2), (3, 4, 5)])
+        self.assertEqual(list(Stream(range(7)).window(3, partial=True)), [(0, 1, 2), (3, 4, 5), (6,)])
+        self.assertEqual(list(Stream(range(7)).window(2, 3)), [(0, 1), (3, 4)])
+        self.assertEqual(list(Stream(range(5)).window(3, 1)), [(0, 1, 2), (1, 2, 3), (2, 3, 4)])
+        self.assertEqual(list(Stream(range(6)).window(3, 2)), [(0, 1, 2), (2, 3, 4)])
+
+    def test_group_by(self):
+        logs = ['a:1', 'a:2', 'b:3', 'a:4']
+
+        self.assertEqual(
+            list(Stream(logs).map(lambda l: l.split(':')).group_by(lambda p: p[0], lambda g: sum(int(p[1]) for p in g))),
+            [('a', 3), ('b', 3), ('a', 4)],
+        )
+        self.assertEqual(list(Stream('aab').group_by(str.upper)), [('A', ['a', 'a']), ('B', ['b'])])
+
+    def test_file_sources(self):
+        content = b'alpha\r\nERROR beta\r\n\r\ngamma ERROR\r\ndelta'
+        expected = ['alpha', 'ERROR beta', '', 'gamma ERROR', 'delta']
+
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            f.write(content)
+
+        self.addCleanup(os.unlink, f.name)
+
+        for chunk_size in (1, 2, 3, 5, 7, 1024):
+            self.assertEqual(
+                list(Stream.from_file(f.name, chunk_size, delimiter=b'\r\n').decode()),
+                expected,
+                f'chunk size: {chunk_size}',
+            )
+
+        pattern = re.compile(b'ERROR')
+        stream = Stream.from_mmap(f.name, delimiter=b'\r\n').filter(pattern.search).decode()
+
+        self.assertEqual(list(stream), ['ERROR beta', 'gamma ERROR'])
+        self.assertEqual(list(stream), ['ERROR beta', 'gamma ERROR'])
+        self.assertIsInstance(Stream.from_mmap(f.name).first(), memoryview)
+
+    def test_empty_file_sources(self):
+        with tempfile.NamedTemporaryFile(delete=False) as f:
+            pass
+
+        self.addCleanup(os.unlink, f.name)
+
+        self.assertEqual(Stream.from_file(f.name).count(), 0)
+        self.assertEqual(Stream.from_mmap(f.name).count(), 0)
+
+    def test_bench(self):
+        results = bench.run(sizes=[100], chain_lengths=[1, 2], selectivities=[0.5], repeat=1)
+
+        self.assertEqual(len(results), 2 * len(bench.IMPLEMENTATIONS))
+        self.assertTrue(all(r.items_per_second > 0 for r in results))
+
+
+class AsyncTestUnit(IsolatedAsyncioTestCase):
+    async def test_sequential_chain(self):
+        async def source():
+            for i in range(6):
+                yield i
+
+        async def triple(x):
+            return x * 3
+
+        stream = (
+            AsyncStream(source())
+            .filter(lambda x: x % 2 == 1)
+            .map(triple)
+            .flat_map(lambda x: [x, -x])
+        )
+
+        self.assertEqual([x async for x in stream], [3, -3, 9, -9, 15, -15])
+
+    async def test_concurrency(self):
+        running = 0
+        peak = 0
+
+        async def fetch(x):
+            nonlocal running, peak
+            running += 1
+            peak = max(peak, running)
+            await asyncio.sleep(0.01 * (5 - x % 5))
+            running -= 1
+            return x
+
+        ordered = [x async for x in AsyncStream(range(20)).map(fetch, concurrency=5)]
+        unordered = [x async for x in AsyncStream(range(20)).map(fetch, concurrency=5, ordered=False)]
+
+        self.assertEqual(ordered, list(range(20)))
+        self.assertNotEqual(unordered, list(range(20)))
+        self.assertEqual(sorted(unordered), list(range(20)))
+        self.assertEqual(peak, 5)
+
+    async def test_early_exit(self):
+        started = []
+        cancelled = []
+
+        async def fetch(x):
+            started.append(x)
+            try:
+                await asyncio.sleep(x)
+            except asyncio.CancelledError:
+                cancelled.append(x)
+                raise
+            return x
+
+        iterator = AsyncStream(range(100)).map(fetch, concurrency=3).observe()
+
+        self.assertEqual(await iterator.__anext__(), 0)
+        await iterator.aclose()
+
+        self.assertEqual(started[:3], [0, 1, 2])
+        self.assertEqual(cancelled, started[1:])